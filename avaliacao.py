@@ -0,0 +1,139 @@
+import os
+import numpy as np
+from instrumentacao import timed
+
+
+DEFAULT_K_VALUES = [2, 4, 6, 8, 10]
+
+
+def doc_key(name):
+    # Consultas e documentos são comparados pelo nome do arquivo sem
+    # diretório nem extensão: "part1/suspicious-document00001.txt" e
+    # "suspicious-document00001.json" viram a mesma chave.
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def encode_qrels(relevant_documents):
+    # Converte o gabarito em arrays de inteiros: cada par (consulta, fonte)
+    # relevante vira query_id * num_docs + doc_id.
+    query_index = {}
+    doc_index = {}
+    pairs = []
+    for doc in relevant_documents:
+        query_id = query_index.setdefault(doc_key(doc['filename']), len(query_index))
+        for src_file in doc['src_file']:
+            doc_id = doc_index.setdefault(doc_key(src_file), len(doc_index))
+            pairs.append((query_id, doc_id))
+
+    pairs = np.unique(np.array(pairs, dtype=np.int64).reshape(-1, 2), axis=0)
+    relevant_counts = np.bincount(pairs[:, 0], minlength=len(query_index)) if len(pairs) else \
+        np.zeros(len(query_index), dtype=np.int64)
+    return query_index, doc_index, pairs, relevant_counts
+
+
+def encode_run(retrieved_documents, query_index, doc_index, max_k):
+    # Matriz (consultas x max_k) com os ids dos documentos recuperados, em
+    # ordem de ranqueamento; -1 marca posições vazias. Documentos que não
+    # aparecem no gabarito recebem ids novos (nunca são relevantes).
+    run = np.full((len(query_index), max_k), -1, dtype=np.int64)
+    for doc in retrieved_documents:
+        query_id = query_index.get(doc_key(doc['file']))
+        if query_id is None:
+            continue
+        ranked = [doc_index.setdefault(doc_key(hit['filename']), len(doc_index))
+                  for hit in doc['retrieved_documents'][:max_k]]
+        run[query_id, :len(ranked)] = ranked
+    return run
+
+
+@timed("evaluate")
+def evaluate(relevant_documents, retrieved_documents, k_values=DEFAULT_K_VALUES):
+    # Calcula P@k, R@k e nDCG@k por consulta para todos os k de uma vez, além
+    # do AP (sobre o ranking completo até max(k_values)) e das médias macro.
+    k_values = list(k_values)
+    max_k = max(k_values)
+    query_index, doc_index, pairs, relevant_counts = encode_qrels(relevant_documents)
+    run = encode_run(retrieved_documents, query_index, doc_index, max_k)
+    num_docs = len(doc_index)
+    num_queries = len(query_index)
+
+    query_ids = np.repeat(np.arange(num_queries, dtype=np.int64), max_k).reshape(num_queries, max_k)
+    run_pairs = query_ids * num_docs + run
+    qrel_pairs = pairs[:, 0] * num_docs + pairs[:, 1] if len(pairs) else np.empty(0, dtype=np.int64)
+    relevant = np.isin(run_pairs, qrel_pairs) & (run >= 0)
+
+    hits = np.cumsum(relevant, axis=1)
+    ranks = np.arange(1, max_k + 1)
+    k_columns = np.array(k_values) - 1
+    safe_counts = np.maximum(relevant_counts, 1)[:, None]
+
+    precision = hits[:, k_columns] / np.array(k_values)
+    recall = hits[:, k_columns] / safe_counts
+
+    precision_at_rank = hits / ranks
+    average_precision = (precision_at_rank * relevant).sum(axis=1) / safe_counts[:, 0]
+
+    discounts = 1 / np.log2(ranks + 1)
+    dcg = np.cumsum(relevant * discounts, axis=1)[:, k_columns]
+    ideal_cumulative = np.concatenate(([0], np.cumsum(discounts)))
+    ideal_hits = np.minimum(relevant_counts[:, None], np.array(k_values))
+    idcg = ideal_cumulative[ideal_hits]
+    ndcg = np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+
+    # Consultas sem nenhum documento relevante no gabarito ficam fora das médias.
+    judged = relevant_counts > 0
+    queries = sorted(query_index, key=query_index.get)
+    return {
+        "k": k_values,
+        "queries": queries,
+        "per_query": {
+            "precision": precision,
+            "recall": recall,
+            "ndcg": ndcg,
+            "average_precision": average_precision,
+        },
+        "macro": {
+            "precision": precision[judged].mean(axis=0).tolist() if judged.any() else [0] * len(k_values),
+            "recall": recall[judged].mean(axis=0).tolist() if judged.any() else [0] * len(k_values),
+            "ndcg": ndcg[judged].mean(axis=0).tolist() if judged.any() else [0] * len(k_values),
+            "map": float(average_precision[judged].mean()) if judged.any() else 0,
+        },
+    }
+
+
+def save_metric_plot(k_values, curves, ylabel, title, output_path):
+    # Usa o backend Agg: grava o arquivo sem abrir janela, então execuções
+    # em lote sem interface gráfica não ficam bloqueadas.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    colors = ['b', 'g', 'r', 'c', 'm', 'y', 'k']
+    fig = plt.figure(figsize=(10, 6))
+    for (label, values), color in zip(curves.items(), colors):
+        plt.plot(k_values, values, marker='o', label=label, color=color)
+    plt.xlabel('k')
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.legend()
+    plt.grid(True)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    fig.savefig(output_path)
+    plt.close(fig)
+    return output_path
+
+
+def save_evaluation_plots(evaluations, output_dir, k_values=DEFAULT_K_VALUES):
+    # evaluations: {rótulo: resultado de evaluate}. Grava um gráfico por métrica.
+    names = " e ".join(evaluations)
+    metrics = [
+        ("precision", "Precision at k (P@k)", "precision_at_k.png"),
+        ("recall", "Recall at k (R@k)", "recall_at_k.png"),
+        ("ndcg", "nDCG at k", "ndcg_at_k.png"),
+    ]
+    paths = []
+    for metric, label, filename in metrics:
+        curves = {name: evaluation["macro"][metric] for name, evaluation in evaluations.items()}
+        paths.append(save_metric_plot(k_values, curves, label, f"{label} para {names}",
+                                      os.path.join(output_dir, filename)))
+    return paths
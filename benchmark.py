@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from benchmarks.comparacao import compare_results
+from benchmarks.corpus import generate_corpus
+from benchmarks.elastic import bench_elasticsearch, bench_experiments
+from benchmarks.inicializacao import bench_service, bench_startup
+from benchmarks.medicoes import K_VALUES
+from benchmarks.nativo import bench_native, bench_tfidf
+from benchmarks.tokenizadores import bench_tokenizers
+from benchmarks.woosh import bench_sharded, bench_whoosh, bench_writer_profiles
+
+# Ponto de entrada do benchmark: gera o corpus sintético, roda as medições
+# escolhidas em --engines (uma por módulo do pacote benchmarks) e compara com
+# uma execução anterior.
+
+
+def run_benchmark(args):
+    import gabarito
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="benchmark-")
+    corpus_dir = os.path.join(work_dir, "corpus")
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    start_time = time.perf_counter()
+    corpus = generate_corpus(corpus_dir, num_sources=args.sources, num_suspicious=args.suspicious,
+                             doc_words=args.doc_words, vocabulary_size=args.vocabulary,
+                             zipf_exponent=args.zipf, seed=args.seed)
+    print(f"Corpus sintético gerado em {time.perf_counter() - start_time:.2f} segundos "
+          f"({corpus['total_words']} palavras)")
+
+    # O corpus é gerado a cada execução: o índice do gabarito fica no
+    # diretório de trabalho, não no cache compartilhado.
+    relevant_documents = gabarito.get_suspicious_documents(
+        corpus["ground_truth_dir"], limit=args.suspicious,
+        index_path=gabarito.index_path_for(corpus["ground_truth_dir"], cache_dir=work_dir))
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "corpus": {"total_words": corpus["total_words"]},
+    }
+    if "tokenizer" in args.engines:
+        print("Executando o benchmark dos tokenizadores...")
+        results["tokenizer"] = bench_tokenizers(corpus)
+    if "whoosh" in args.engines:
+        print("Executando o benchmark do Whoosh...")
+        results["whoosh"] = bench_whoosh(corpus, work_dir, relevant_documents, mode=args.whoosh_mode,
+                                         num_workers=args.workers, top_n=max(K_VALUES))
+    if "native" in args.engines:
+        print("Executando o benchmark do motor nativo...")
+        results["native"] = bench_native(corpus, work_dir, relevant_documents, num_workers=args.workers,
+                                         top_n=max(K_VALUES))
+    if "tfidf" in args.engines:
+        print("Executando a avaliação em lote por TF-IDF esparso...")
+        results["tfidf"] = bench_tfidf(corpus, relevant_documents, num_workers=args.workers, top_n=max(K_VALUES))
+    if "shards" in args.engines:
+        print("Comparando o índice único com o índice em shards...")
+        results["shards"] = bench_sharded(corpus, work_dir, relevant_documents, num_shards=args.workers,
+                                          top_n=max(K_VALUES))
+    if "writer" in args.engines:
+        print("Comparando os perfis do writer do Whoosh...")
+        results["writer"] = bench_writer_profiles(corpus, work_dir, num_workers=args.workers,
+                                                  top_n=max(K_VALUES))
+    if "experiments" in args.engines:
+        print("Executando a varredura de parâmetros com artefatos em cache...")
+        results["experiments"] = bench_experiments(corpus, relevant_documents, work_dir, num_workers=args.workers)
+    if "elasticsearch" in args.engines:
+        print("Executando o benchmark do Elasticsearch (cluster de ELASTICSEARCH_URL)...")
+        results["elasticsearch"] = bench_elasticsearch(corpus, relevant_documents, work_dir,
+                                                       thread_count=args.es_threads)
+
+    if "startup" in args.engines:
+        print("Medindo o tempo de inicialização...")
+        results["startup"] = bench_startup(corpus, work_dir)
+    if "service" in args.engines:
+        print("Executando o benchmark do serviço de busca...")
+        results["service"] = bench_service(corpus, work_dir)
+
+    if not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de indexação e busca do Whoosh e do Elasticsearch")
+    parser.add_argument("--sources", type=int, default=500, help="número de documentos-fonte")
+    parser.add_argument("--suspicious", type=int, default=100, help="número de documentos suspeitos")
+    parser.add_argument("--doc-words", type=int, default=2000, help="tamanho médio dos documentos em palavras")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="tamanho do vocabulário sintético")
+    parser.add_argument("--zipf", type=float, default=1.1, help="expoente da distribuição de Zipf")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engines", nargs="+",
+                        default=["tokenizer", "whoosh", "startup", "service"],
+                        choices=["tokenizer", "whoosh", "elasticsearch", "startup", "service", "writer",
+                                 "shards", "native", "tfidf", "experiments"],
+                        help="startup e service usam o índice criado pelo benchmark do Whoosh; "
+                             "elasticsearch e experiments precisam de um cluster em ELASTICSEARCH_URL")
+    parser.add_argument("--whoosh-mode", default="processes", choices=["threads", "processes", "shards"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--es-threads", type=int, default=1)
+    parser.add_argument("--work-dir", default=None, help="mantém corpus e índices neste diretório")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="resultado anterior para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    return parser.parse_args(argv)
+
+
+def main_benchmark(argv=None):
+    args = parse_args(argv)
+    results = run_benchmark(args)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Resultados gravados em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regressão em {regression['metric']}: {regression['baseline']:.4f} -> "
+                  f"{regression['current']:.4f} ({regression['change']:+.1%})")
+        if regressions:
+            return 1
+        print("Nenhuma regressão acima da tolerância.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark())
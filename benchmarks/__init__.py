@@ -0,0 +1,4 @@
+# Medições de benchmark.py, uma área por módulo: corpus sintético, métricas
+# comuns, Whoosh, motor nativo e TF-IDF em lote, Elasticsearch (só contra um
+# cluster de verdade), tokenizadores, inicialização e serviço, e a comparação
+# com uma execução anterior.
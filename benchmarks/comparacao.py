@@ -0,0 +1,30 @@
+# Comparação com uma execução anterior.
+
+# Métricas em que um valor maior é pior; as demais são "quanto maior, melhor".
+LOWER_IS_BETTER = ("seconds", "_ms", "size_mb")
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_results(current, baseline, tolerance=0.10):
+    regressions = []
+    current_flat = flatten(current)
+    for name, old_value in flatten(baseline).items():
+        if name not in current_flat or not old_value or "peak_rss" in name or name.startswith("config") \
+                or "slowest_imports" in name or ".profile." in name:
+            continue
+        new_value = current_flat[name]
+        change = (new_value - old_value) / abs(old_value)
+        lower_is_better = any(marker in name for marker in LOWER_IS_BETTER)
+        if (lower_is_better and change > tolerance) or (not lower_is_better and change < -tolerance):
+            regressions.append({"metric": name, "baseline": old_value, "current": new_value, "change": change})
+    return regressions
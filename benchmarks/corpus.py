@@ -0,0 +1,99 @@
+import json
+import os
+import numpy as np
+
+# Corpus sintético com distribuição de Zipf: fontes, suspeitos com trechos
+# copiados de fontes conhecidas e o gabarito no formato do PAN.
+
+
+def make_vocabulary(size, rng):
+    # Pseudo-palavras só com letras, para passarem pela limpeza [^a-z\s] e
+    # não colidirem com stopwords nem com o WordNet.
+    letters = np.array(list("bcdfghjklmnpqrstvwxz"))
+    vowels = np.array(list("aeiouy"))
+    words = set()
+    while len(words) < size:
+        length = rng.integers(2, 5)
+        syllables = [rng.choice(letters) + rng.choice(vowels) for _ in range(length)]
+        words.add("".join(syllables) + "q")
+    return sorted(words)
+
+
+def zipf_sampler(vocabulary, exponent, rng):
+    ranks = np.arange(1, len(vocabulary) + 1)
+    probabilities = 1.0 / ranks ** exponent
+    probabilities /= probabilities.sum()
+    words = np.array(vocabulary)
+
+    def sample(count):
+        return list(words[rng.choice(len(words), size=count, p=probabilities)])
+
+    return sample
+
+
+def write_text(path, words, words_per_line=15):
+    # Uma frase por linha, com maiúscula e ponto final, para que os
+    # tokenizadores também lidem com pontuação.
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(0, len(words), words_per_line):
+            sentence = " ".join(words[i:i + words_per_line])
+            f.write(sentence[:1].upper() + sentence[1:] + ".\n")
+
+
+def generate_corpus(output_dir, num_sources=500, num_suspicious=100, doc_words=2000, vocabulary_size=20000,
+                    zipf_exponent=1.1, max_sources_per_suspicious=3, passage_words=200, seed=42):
+    # Gera documentos-fonte, documentos suspeitos com trechos copiados de
+    # fontes conhecidas e o gabarito no formato lido por get_suspicious_documents.
+    rng = np.random.default_rng(seed)
+    sample = zipf_sampler(make_vocabulary(vocabulary_size, rng), zipf_exponent, rng)
+
+    source_dir = os.path.join(output_dir, "source-document", "part1")
+    suspicious_dir = os.path.join(output_dir, "suspicious-document", "part1")
+    ground_truth_dir = os.path.join(output_dir, "ground-truth")
+    for directory in (source_dir, suspicious_dir, ground_truth_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    sources = []
+    for i in range(num_sources):
+        words = sample(int(rng.integers(doc_words // 2, doc_words * 3 // 2)))
+        filename = f"source-document{i:05d}.txt"
+        write_text(os.path.join(source_dir, filename), words)
+        sources.append((filename, words))
+
+    total_words = sum(len(words) for _, words in sources)
+    for i in range(num_suspicious):
+        words = sample(int(rng.integers(doc_words // 2, doc_words * 3 // 2)))
+        num_copied = int(rng.integers(1, max_sources_per_suspicious + 1))
+        chosen = rng.choice(num_sources, size=num_copied, replace=False)
+        src_files = []
+        for source_id in chosen:
+            filename, source_words = sources[source_id]
+            start = int(rng.integers(0, max(1, len(source_words) - passage_words)))
+            insert_at = int(rng.integers(0, len(words) + 1))
+            words[insert_at:insert_at] = source_words[start:start + passage_words]
+            src_files.append(filename)
+        write_text(os.path.join(suspicious_dir, f"suspicious-document{i:05d}.txt"), words)
+        total_words += len(words)
+
+        with open(os.path.join(ground_truth_dir, f"suspicious-document{i:05d}.json"), 'w', encoding='utf-8') as f:
+            json.dump({"type": "suspicious-document", "src_file": src_files}, f)
+
+    return {
+        "source_dir": os.path.dirname(source_dir),
+        "suspicious_dir": os.path.dirname(suspicious_dir),
+        "ground_truth_dir": ground_truth_dir,
+        "total_words": total_words,
+    }
+
+
+def list_files(directory, suffix=".txt"):
+    paths = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith(suffix):
+                paths.append(os.path.join(root, file))
+    return sorted(paths)
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(path) for path in list_files(directory, suffix=""))
@@ -0,0 +1,160 @@
+import os
+import shutil
+import sys
+import time
+from benchmarks.corpus import directory_size, list_files
+from benchmarks.medicoes import latency_summary, peak_rss_mb, quality_summary
+
+# Medições do Elasticsearch contra o cluster de ELASTICSEARCH_URL. Sem um
+# cluster acessível as seções ficam de fora do resultado: o servidor
+# substituto dos testes (tests/es_stub.py) só confere o caminho, e números
+# medidos contra ele não dizem nada sobre o desempenho.
+
+
+def cluster_unavailable():
+    # Motivo para pular a seção, ou None se o cluster responde.
+    import elasticsearch_busca
+
+    if elasticsearch_busca.get_es().ping():
+        return None
+    reason = f"Elasticsearch inacessível em {elasticsearch_busca.ES_URL}"
+    print(f"Aviso: {reason}; defina ELASTICSEARCH_URL para medir o Elasticsearch", file=sys.stderr)
+    return reason
+
+
+def bench_elasticsearch(corpus, relevant_documents, work_dir, thread_count=1, top_n_terms=10):
+    import elasticsearch_indexacao
+    import elasticsearch_busca
+    import woosh_Indexacao
+    from preprocessamento import get_stop_words
+
+    skipped = cluster_unavailable()
+    if skipped:
+        return {"skipped": skipped}
+    client = elasticsearch_busca.get_es()
+    index_name = "benchmark"
+
+    source_paths = list_files(corpus["source_dir"])
+    source_bytes = sum(os.path.getsize(path) for path in source_paths)
+    start_time = time.perf_counter()
+    # Carga num índice novo atrás do alias, como em elasticsearch_indexacao.
+    elasticsearch_indexacao.index_documents(corpus["source_dir"], index_name, thread_count=thread_count,
+                                            alias=index_name)
+    indexing_time = time.perf_counter() - start_time
+    documents = client.count(index=index_name)["count"]
+    indexing = {
+        "documents": documents,
+        "seconds": indexing_time,
+        "docs_per_second": documents / indexing_time if indexing_time else 0,
+        "mb_per_second": source_bytes / 1024 / 1024 / indexing_time if indexing_time else 0,
+        "peak_rss_mb": peak_rss_mb(),
+        "bulk_profile": {
+            "alias_indices": sorted(client.indices.get_alias(name=index_name)),
+            # As configurações da carga (BULK_SETTINGS) não podem ficar no índice.
+            "settings_after_load": {
+                name: {key: settings["settings"].get(key) for key in elasticsearch_indexacao.BULK_SETTINGS}
+                for name, settings in client.indices.get_settings(index=index_name, flat_settings=True).items()
+            },
+        },
+    }
+
+    suspicious_paths = list_files(corpus["suspicious_dir"])
+    results = {}
+    # client: só a montagem da consulta (leitura, tokenização, sinônimos);
+    # search: a consulta inteira, incluindo o servidor.
+    approaches = list(elasticsearch_busca.PREPROCESSORS) + [elasticsearch_busca.MLT_APPROACH]
+    field = elasticsearch_busca.filename_field(index_name)
+    for approach in approaches:
+        latencies = []
+        client_latencies = []
+        for doc_path in suspicious_paths:
+            start_time = time.perf_counter()
+            with open(doc_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            if approach == elasticsearch_busca.MLT_APPROACH:
+                body = elasticsearch_busca.build_mlt_body([content], field=field)
+            else:
+                preprocess = elasticsearch_busca.PREPROCESSORS[approach]
+                expanded_terms = preprocess(content, get_stop_words(), top_n_terms)
+                body = elasticsearch_busca.build_query_body(expanded_terms, field=field)
+            client_latencies.append(time.perf_counter() - start_time)
+            client.search(index=index_name, body=body)
+            latencies.append(time.perf_counter() - start_time)
+        results[approach] = {"search": latency_summary(latencies), "client": latency_summary(client_latencies)}
+
+    start_time = time.perf_counter()
+    batch_results = elasticsearch_busca.search_documents_batch(suspicious_paths, index_name,
+                                                               approaches=approaches, top_n_terms=top_n_terms)
+    batch_time = time.perf_counter() - start_time
+    for approach, retrieved_documents in batch_results.items():
+        results[approach]["quality"] = quality_summary(relevant_documents, retrieved_documents)
+        results[approach]["batch_queries_per_second"] = len(suspicious_paths) / batch_time if batch_time else 0
+
+    # Mesma busca em lote, mas restrita aos candidatos do MinHash/LSH.
+    lsh_dir = os.path.join(work_dir, "elasticsearch-lsh")
+    woosh_Indexacao.build_lsh_index(corpus["source_dir"], lsh_dir)
+    start_time = time.perf_counter()
+    batch_results = elasticsearch_busca.search_documents_batch(suspicious_paths, index_name,
+                                                               approaches=approaches, top_n_terms=top_n_terms,
+                                                               lsh_dir=lsh_dir)
+    batch_time = time.perf_counter() - start_time
+    for approach, retrieved_documents in batch_results.items():
+        results[f"{approach}+lsh"] = {
+            "quality": quality_summary(relevant_documents, retrieved_documents),
+            "batch_queries_per_second": len(suspicious_paths) / batch_time if batch_time else 0,
+        }
+
+    return {
+        "indexing": indexing,
+        "approaches": {str(approach): result for approach, result in results.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_experiments(corpus, relevant_documents, work_dir, num_workers=None):
+    # Grade pequena de experimentos.run_grid, duas vezes: a primeira cria os
+    # artefatos, a segunda só os lê. "per_config_tokenization_seconds" é o
+    # custo do caminho antigo, que retokeniza tudo a cada configuração.
+    import elasticsearch_indexacao
+    import elasticsearch_busca
+    import experimentos
+
+    skipped = cluster_unavailable()
+    if skipped:
+        return {"skipped": skipped}
+    index_name = "experimentos"
+    cache_dir = os.path.join(work_dir, "artefatos")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    grid = {"approach": [4, 6], "lemmatize": [False, True], "top_n_terms": [5, 10, 20], "max_synonyms": [0, 5]}
+    elasticsearch_indexacao.index_documents(corpus["source_dir"], index_name, alias=index_name)
+    suspicious_paths = list_files(corpus["suspicious_dir"])
+    runs = {}
+    for name in ("cold", "warm"):
+        start_time = time.perf_counter()
+        summary = experimentos.run_grid(suspicious_paths, index_name, relevant_documents, grid, cache_dir,
+                                        num_workers)
+        runs[name] = {
+            "seconds": time.perf_counter() - start_time,
+            "artifacts_seconds": summary["artifacts"]["seconds"],
+            "artifacts_created": summary["artifacts"]["created"],
+            "query_build_seconds": sum(result["query_build_seconds"] for result in summary["results"]),
+            "search_seconds": sum(result["search_seconds"] for result in summary["results"]),
+        }
+    best = max(summary["results"], key=lambda result: result["map"])
+
+    start_time = time.perf_counter()
+    for config in experimentos.iter_grid(grid):
+        for doc_path in suspicious_paths:
+            with open(doc_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            elasticsearch_busca.query_terms(content, config["approach"], config["top_n_terms"],
+                                            config["lemmatize"])
+    per_config_tokenization = time.perf_counter() - start_time
+
+    return {
+        "configs": len(summary["results"]),
+        "runs": runs,
+        "per_config_tokenization_seconds": per_config_tokenization,
+        "artifacts_size_mb": directory_size(cache_dir) / 1024 / 1024,
+        "best": {"config": best["config"], "map": best["map"]},
+    }
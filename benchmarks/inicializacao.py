@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from benchmarks.corpus import list_files
+from benchmarks.medicoes import latency_summary
+
+# Os módulos medidos ficam na raiz do repositório, acima deste pacote.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_MODULES = ("woosh_busca", "elasticsearch_busca", "woosh_Indexacao", "elasticsearch_indexacao",
+                   "motor_nativo")
+HEAVY_MODULES = ("nltk", "matplotlib", "elasticsearch", "numpy")
+
+
+def repo_env(**overrides):
+    env = dict(os.environ, **overrides)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_DIR, env.get("PYTHONPATH")]))
+    return env
+
+
+def import_time_report(module, top=10):
+    # Equivale a "python -X importtime -c 'import módulo'" num processo novo:
+    # devolve o tempo total e os imports diretos mais lentos (tempo acumulado).
+    check = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", check], capture_output=True,
+                               text=True, env=repo_env(), cwd=REPO_DIR)
+    total_us = 0
+    children = []
+    pending = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Um espaço após a barra e dois por nível; os filhos vêm antes do pai.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((name.strip(), int(cumulative_us)))
+        elif depth == 0:
+            if name.strip() == module:
+                total_us = int(cumulative_us)
+                children = pending
+            pending = []
+
+    children.sort(key=lambda child: -child[1])
+    return {
+        "import_ms": total_us / 1000,
+        "slowest_imports_ms": {name: cumulative / 1000 for name, cumulative in children[:top]},
+        "heavy_modules": completed.stdout.strip().split(",") if completed.stdout.strip() else [],
+    }
+
+
+def bench_service(corpus, work_dir):
+    # Consultas pelo serviço persistente (HTTP com keep-alive): a primeira
+    # passada encontra o cache vazio, a segunda repete as mesmas consultas.
+    import asyncio
+    import http.client
+    import servico_busca
+
+    index_dir = os.path.join(work_dir, "whoosh-index")
+    if not os.path.isdir(index_dir):
+        return {}
+    service = servico_busca.SearchService(index_dir)
+    service.warm_up()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(servico_busca.start_server(service, "127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    results = {}
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        suspicious_paths = list_files(corpus["suspicious_dir"])
+        for name in ("cold", "cached"):
+            latencies = []
+            for doc_path in suspicious_paths:
+                start_time = time.perf_counter()
+                connection.request("POST", "/search", json.dumps({"path": doc_path}),
+                                   {"Content-Type": "application/json"})
+                connection.getresponse().read()
+                latencies.append(time.perf_counter() - start_time)
+            results[name] = latency_summary(latencies)
+        connection.close()
+        results["cache_hit_rate"] = service.cache.stats()["hit_rate"]
+    finally:
+        asyncio.run_coroutine_threadsafe(servico_busca.stop_server(server), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        service.close()
+    return results
+
+
+def build_query_synonym_table(corpus, index_dir, table_path):
+    # Tabela do Whoosh restrita às palavras dos documentos suspeitos, que é
+    # tudo o que as consultas do benchmark procuram nela.
+    import preprocessamento
+    import sinonimos
+
+    words = set()
+    for doc_path in list_files(corpus["suspicious_dir"]):
+        with open(doc_path, 'r', encoding='utf-8') as f:
+            words.update(preprocessamento.tokenize(f.read()))
+    vocabulary, normalize = sinonimos.whoosh_vocabulary(index_dir)
+    return sinonimos.build_synonym_table(table_path, words=words, vocabulary=vocabulary, normalize=normalize,
+                                         keep_empty=True)
+
+
+def single_query_latencies(query_path, index_dir, work_dir, table_path, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(REPO_DIR, "woosh_busca.py"), query_path, "--index", index_dir],
+                       capture_output=True, env=repo_env(SYNONYM_TABLE=table_path), cwd=work_dir)
+        latencies.append(time.perf_counter() - start_time)
+    return latency_summary(latencies)
+
+
+def bench_startup(corpus, work_dir, repeat=3):
+    # Tempo de import de cada ponto de entrada e tempo de parede de uma
+    # consulta isolada pela linha de comando de woosh_busca, com a tabela de
+    # sinônimos e sem ela (cada sinônimo vai ao WordNet, que carrega o NLTK).
+    results = {module: import_time_report(module) for module in STARTUP_MODULES}
+
+    index_dir = os.path.join(work_dir, "whoosh-index")
+    if os.path.isdir(index_dir):
+        query_path = list_files(corpus["suspicious_dir"])[0]
+        table_path = os.path.join(work_dir, "synonym_table")
+        try:
+            results["synonym_table_terms"] = build_query_synonym_table(corpus, index_dir, table_path)
+            results["single_query_cli"] = single_query_latencies(query_path, index_dir, work_dir, table_path,
+                                                                 repeat)
+        except LookupError:
+            print("Aviso: sem o WordNet do NLTK não há tabela de sinônimos; só a consulta sem tabela foi medida",
+                  file=sys.stderr)
+        results["single_query_cli_without_table"] = single_query_latencies(
+            query_path, index_dir, work_dir, os.path.join(work_dir, "sem-tabela"), repeat)
+    return results
@@ -0,0 +1,45 @@
+import os
+import sys
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+K_VALUES = [1, 2, 4, 6, 8, 10]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {"self": own / scale, "children": children / scale}
+
+
+def latency_summary(latencies):
+    if not latencies:
+        return {"queries": 0}
+    values = np.array(latencies) * 1000
+    return {
+        "queries": len(latencies),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+    }
+
+
+def base_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def quality_summary(relevant_documents, retrieved_documents):
+    import avaliacao
+
+    evaluation = avaliacao.evaluate(relevant_documents, retrieved_documents, K_VALUES)
+    return dict(evaluation["macro"], k=K_VALUES)
@@ -0,0 +1,79 @@
+import os
+import shutil
+import time
+from benchmarks.corpus import directory_size, list_files
+from benchmarks.medicoes import latency_summary, peak_rss_mb, quality_summary
+
+
+def bench_native(corpus, work_dir, relevant_documents, num_workers=None, top_n=10):
+    # Mesmas medições e modos de consulta de bench_whoosh, no motor nativo
+    # (índice em arrays NumPy, BM25 vetorizado e MaxScore).
+    import motor_nativo
+    import minhash
+    import registro
+
+    index_dir = os.path.join(work_dir, "native-index")
+    lsh_dir = os.path.join(work_dir, "native-lsh")
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+    source_paths = list_files(corpus["source_dir"])
+    source_bytes = sum(os.path.getsize(path) for path in source_paths)
+    start_time = time.perf_counter()
+    _, _, doc_count = motor_nativo.create_index(index_dir, corpus["source_dir"], num_workers=num_workers,
+                                                lsh_dir=lsh_dir)
+    indexing_time = time.perf_counter() - start_time
+    indexing = {
+        "documents": doc_count,
+        "seconds": indexing_time,
+        "docs_per_second": doc_count / indexing_time if indexing_time else 0,
+        "mb_per_second": source_bytes / 1024 / 1024 / indexing_time if indexing_time else 0,
+        "index_size_mb": directory_size(index_dir) / 1024 / 1024,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    index = motor_nativo.open_index(index_dir)
+    lsh = minhash.MinHashLSH.load(lsh_dir)
+    queries = {}
+    for name, query_mode, query_lsh in (("truncate_or", "truncate_or", None), ("idf", "idf", None),
+                                        ("idf+lsh", "idf", lsh)):
+        latencies = []
+        retrieved_documents = []
+        for doc_path in list_files(corpus["suspicious_dir"]):
+            with open(doc_path, 'r', encoding='utf-8') as f:
+                query_doc = f.read()
+            start_time = time.perf_counter()
+            hits = motor_nativo.run_query(index, query_doc, top_n, query_mode, lsh=query_lsh)
+            latencies.append(time.perf_counter() - start_time)
+            retrieved_documents.append({
+                "file": doc_path,
+                "retrieved_documents": registro.retrieved_documents(index.registry, hits),
+            })
+        queries[name] = {
+            "search": latency_summary(latencies),
+            "quality": quality_summary(relevant_documents, retrieved_documents),
+        }
+
+    return {
+        "indexing": indexing,
+        "queries": queries,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_tfidf(corpus, relevant_documents, num_workers=None, top_n=10):
+    # Todos os suspeitos contra todas as fontes de uma vez (tfidf_lote): o
+    # tempo por consulta é o total dividido pelo número de suspeitos, para
+    # comparar com a latência das consultas uma a uma dos outros motores.
+    import tfidf_lote
+
+    source_paths = list_files(corpus["source_dir"])
+    suspicious_paths = list_files(corpus["suspicious_dir"])
+    start_time = time.perf_counter()
+    retrieved_documents = tfidf_lote.search_all(source_paths, suspicious_paths, top_n, num_workers)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "seconds": elapsed,
+        "seconds_per_query": elapsed / len(suspicious_paths) if suspicious_paths else 0,
+        "quality": quality_summary(relevant_documents, retrieved_documents),
+        "peak_rss_mb": peak_rss_mb(),
+    }
@@ -0,0 +1,61 @@
+import re
+import sys
+import time
+from benchmarks.corpus import list_files
+
+
+def reference_tokenize_alnum(text):
+    # Caminho original de elasticsearch_busca: word_tokenize + isalnum.
+    from nltk.tokenize import word_tokenize
+    return [word for word in word_tokenize(text.lower()) if word.isalnum()]
+
+
+def reference_tokenize(text):
+    # Caminho original de woosh_busca.tokenize.
+    from nltk.tokenize import word_tokenize
+    return word_tokenize(re.sub(r'[^a-z\s]', '', text.lower()))
+
+
+def tokens_per_second(tokenizer, texts):
+    start_time = time.perf_counter()
+    token_count = sum(len(tokenizer(text)) for text in texts)
+    elapsed = time.perf_counter() - start_time
+    return token_count / elapsed if elapsed else 0, token_count
+
+
+def bench_tokenizers(corpus, repeat=3):
+    import preprocessamento
+
+    texts = []
+    for doc_path in list_files(corpus["suspicious_dir"]):
+        with open(doc_path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+
+    pairs = {
+        "tokenize": (reference_tokenize, preprocessamento.tokenize),
+        "tokenize_alnum": (reference_tokenize_alnum, preprocessamento.tokenize_alnum),
+    }
+    results = {}
+    for name, (reference, fast) in pairs.items():
+        result = {}
+        try:
+            fast_rate = result["tokens_per_second"] = max(tokens_per_second(fast, texts)[0] for _ in range(repeat))
+            reference_rate, _ = tokens_per_second(reference, texts)
+        except LookupError:
+            # Sem o modelo punkt não há como rodar o caminho original (nem
+            # tokenize_alnum, que usa o mesmo Punkt): a equivalência fica sem
+            # verificação, e o resultado diz isso.
+            print(f"Aviso: {name} sem comparação com o word_tokenize (modelo punkt do NLTK ausente)",
+                  file=sys.stderr)
+            result.update({"equivalent": None, "reference_error": "modelo punkt do NLTK ausente"})
+            results[name] = result
+            continue
+        mismatches = [i for i, text in enumerate(texts) if reference(text) != fast(text)]
+        result.update({
+            "reference_tokens_per_second": reference_rate,
+            "speedup": fast_rate / reference_rate if reference_rate else 0,
+            "equivalent": not mismatches,
+            "mismatched_documents": len(mismatches),
+        })
+        results[name] = result
+    return results
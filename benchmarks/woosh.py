@@ -0,0 +1,159 @@
+import os
+import shutil
+import time
+from benchmarks.corpus import directory_size, list_files
+from benchmarks.medicoes import latency_summary, peak_rss_mb, quality_summary
+
+
+def bench_whoosh(corpus, work_dir, relevant_documents, mode="processes", num_workers=None, top_n=10):
+    import woosh_Indexacao
+    import woosh_busca
+    import minhash
+    import registro
+    from whoosh.index import open_dir
+
+    index_dir = os.path.join(work_dir, "whoosh-index")
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+    source_paths = list_files(corpus["source_dir"])
+    source_bytes = sum(os.path.getsize(path) for path in source_paths)
+    start_time = time.perf_counter()
+    _, _, doc_count = woosh_Indexacao.create_index(index_dir, corpus["source_dir"], mode=mode,
+                                                  num_workers=num_workers)
+    indexing_time = time.perf_counter() - start_time
+    indexing = {
+        "documents": doc_count,
+        "seconds": indexing_time,
+        "docs_per_second": doc_count / indexing_time if indexing_time else 0,
+        "mb_per_second": source_bytes / 1024 / 1024 / indexing_time if indexing_time else 0,
+        "index_size_mb": directory_size(index_dir) / 1024 / 1024,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    lsh_dir = os.path.join(work_dir, "whoosh-lsh")
+    start_time = time.perf_counter()
+    woosh_Indexacao.build_lsh_index(corpus["source_dir"], lsh_dir, num_workers=num_workers)
+    indexing["lsh_build_seconds"] = time.perf_counter() - start_time
+    lsh = minhash.MinHashLSH.load(lsh_dir)
+
+    registry = registro.DocRegistry.for_index(index_dir)
+    indexing["registry_kb"] = os.path.getsize(registry.path) / 1024
+    ix = open_dir(index_dir)
+    query_parser = woosh_busca.content_query_parser(ix.schema)
+    queries = {}
+    with ix.searcher() as searcher:
+        # "truncate" é a consulta original (AND); "truncate_or" usa os mesmos
+        # termos em OR; "idf" seleciona termos por tf x idf; "idf+lsh" só
+        # ranqueia os candidatos do MinHash/LSH. Comparar os modos mostra o
+        # ganho de latência e o custo em recall.
+        for name, query_mode, query_lsh in (("truncate", "truncate", None), ("truncate_or", "truncate_or", None),
+                                            ("idf", "idf", None), ("idf+lsh", "idf", lsh)):
+            latencies = []
+            retrieved_documents = []
+            for doc_path in list_files(corpus["suspicious_dir"]):
+                with open(doc_path, 'r', encoding='utf-8') as f:
+                    query_doc = f.read()
+                start_time = time.perf_counter()
+                hits = woosh_busca.run_query(searcher, query_parser, query_doc, top_n, query_mode, lsh=query_lsh,
+                                             registry=registry)
+                latencies.append(time.perf_counter() - start_time)
+                retrieved_documents.append({
+                    "file": doc_path,
+                    "retrieved_documents": registro.retrieved_documents(registry, woosh_busca.hits_array(hits)),
+                })
+            queries[name] = {
+                "search": latency_summary(latencies),
+                "quality": quality_summary(relevant_documents, retrieved_documents),
+            }
+
+    return {
+        "indexing": indexing,
+        "queries": queries,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_writer_profiles(corpus, work_dir, num_workers=None, top_n=10):
+    # Cada perfil do writer (e o build em shards com o perfil padrão) gera um
+    # índice novo; mede o tempo de build, o número de segmentos e a latência
+    # das consultas "idf" sobre o resultado.
+    import woosh_Indexacao
+    import woosh_busca
+    from whoosh.index import open_dir
+
+    query_docs = []
+    for doc_path in list_files(corpus["suspicious_dir"]):
+        with open(doc_path, 'r', encoding='utf-8') as f:
+            query_docs.append(f.read())
+
+    builds = [(name, "processes", name) for name in woosh_Indexacao.WRITER_PROFILES]
+    builds.append(("shards", "shards", woosh_Indexacao.DEFAULT_WRITER_PROFILE))
+    results = {}
+    for name, mode, profile in builds:
+        index_dir = os.path.join(work_dir, f"whoosh-writer-{name}")
+        shutil.rmtree(index_dir, ignore_errors=True)
+        start_time = time.perf_counter()
+        _, _, doc_count = woosh_Indexacao.create_index(index_dir, corpus["source_dir"], mode=mode,
+                                                      num_workers=num_workers, profile=profile)
+        build_time = time.perf_counter() - start_time
+
+        ix = open_dir(index_dir)
+        query_parser = woosh_busca.content_query_parser(ix.schema)
+        latencies = []
+        with ix.searcher() as searcher:
+            for query_doc in query_docs:
+                start_time = time.perf_counter()
+                woosh_busca.run_query(searcher, query_parser, query_doc, top_n)
+                latencies.append(time.perf_counter() - start_time)
+        results[name] = {
+            "profile": woosh_Indexacao.writer_profile(profile),
+            "documents": doc_count,
+            "build_seconds": build_time,
+            "segments": woosh_Indexacao.segment_count(ix),
+            "index_size_mb": directory_size(index_dir) / 1024 / 1024,
+            "search": latency_summary(latencies),
+        }
+        shutil.rmtree(index_dir, ignore_errors=True)
+    return results
+
+
+def bench_sharded(corpus, work_dir, relevant_documents, num_shards=None, top_n=10):
+    # Índice único (processos no pré-processamento) contra N shards
+    # construídos em paralelo e buscados em scatter-gather com estatísticas
+    # globais: tempo de build, latência por consulta e P@k/R@k (que devem
+    # coincidir).
+    import woosh_Indexacao
+    import woosh_busca
+    import registro
+
+    num_shards = num_shards or os.cpu_count() or 1
+    suspicious_paths = list_files(corpus["suspicious_dir"])
+    results = {}
+    for name, mode in (("single", "processes"), ("sharded", "shards")):
+        index_dir = os.path.join(work_dir, f"whoosh-{name}")
+        shutil.rmtree(index_dir, ignore_errors=True)
+        start_time = time.perf_counter()
+        woosh_Indexacao.create_index(index_dir, corpus["source_dir"], mode=mode, num_workers=num_shards,
+                                     num_shards=num_shards, combine_shards=False)
+        build_time = time.perf_counter() - start_time
+
+        latencies = []
+        retrieved_documents = []
+        registry = registro.DocRegistry.for_index(index_dir)
+        for doc_path, hits, elapsed, error in woosh_busca.search_documents_batch(index_dir, suspicious_paths, top_n,
+                                                                                 num_workers=num_shards):
+            latencies.append(elapsed)
+            retrieved_documents.append({
+                "file": doc_path,
+                "retrieved_documents": registro.retrieved_documents(registry, hits),
+            })
+        # No índice único, as consultas rodam em paralelo (uma por processo);
+        # nos shards, cada consulta é dividida entre os processos.
+        results[name] = {
+            "build_seconds": build_time,
+            "search": latency_summary(latencies),
+            "quality": quality_summary(relevant_documents, retrieved_documents),
+        }
+        shutil.rmtree(index_dir, ignore_errors=True)
+    results["num_shards"] = num_shards
+    return results
@@ -1,102 +1,207 @@
 import os
+import sys
 import time
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords, wordnet
 from collections import Counter
-from elasticsearch import Elasticsearch
-import matplotlib.pyplot as plt
-import json
+import preprocessamento
+import sinonimos
+import instrumentacao
+from instrumentacao import timer
 import glob
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 
-es = Elasticsearch("http://localhost:9200")
+ES_URL = os.environ.get("ELASTICSEARCH_URL", "http://localhost:9200")
+# Criado no primeiro uso (get_es): importar o cliente já custa ~0,3 s.
+es = None
 
 
-def get_suspicious_documents(directory_path, limit=64):
-    relevant_documents = []
-    count = 0
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.json'):
-            file_path = os.path.join(directory_path, filename)
+def get_es():
+    global es
+    if es is None:
+        from elasticsearch import Elasticsearch
+        es = Elasticsearch(ES_URL)
+    return es
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
 
-                if isinstance(data, list):
-                    for item in data:
-                        if item.get('type') == "suspicious-document":
-                            src_file = item.get('src_file', [])
-                            relevant_documents.append({'filename': filename, 'src_file': src_file})
-                            count += 1
+def get_suspicious_documents(directory_path, limit=None):
+    # O gabarito é lido de um índice em disco, reconstruído apenas para os
+    # arquivos de anotação que mudaram.
+    import gabarito
 
-                        if count >= limit:
-                            return relevant_documents
-
-                elif isinstance(data, dict):
-                    if data.get('type') == "suspicious-document":
-                        src_file = data.get('src_file', [])
-                        relevant_documents.append({'filename': filename, 'src_file': src_file})
-                        count += 1
-
-                    if count >= limit:
-                        return relevant_documents
-
-    return relevant_documents
+    return gabarito.get_suspicious_documents(directory_path, limit=limit)
 
 
 def expand_with_synonyms(word, max_synonyms=5):
-    synonyms = set()
-    count = 0
-    for syn in wordnet.synsets(word):
-        for lemma in syn.lemmas():
-            synonyms.add(lemma.name())
-            count += 1
-            if count >= max_synonyms:
-                break
-        if count >= max_synonyms:
-            break
-    return synonyms
+    return sinonimos.get_synonyms(word, max_synonyms, engine="elasticsearch")
 
 
-def preprocess_approach_4(content, stop_words, top_n_terms):
-    tokens = word_tokenize(content.lower())
+def expand_terms(ranked_terms, top_n_terms, max_synonyms=5, synonyms=expand_with_synonyms):
+    # Os top_n_terms primeiros termos de ranked_terms, sempre todos, e depois
+    # os sinônimos de cada um (até max_synonyms por termo, fora da conta de
+    # top_n_terms), sem repetições. A ordem é fixa (ao contrário da de um set),
+    # então o mesmo texto dá a mesma consulta em qualquer processo.
+    base_terms = list(ranked_terms[:top_n_terms])
+    expanded = dict.fromkeys(base_terms)
+    if max_synonyms:
+        for term in base_terms:
+            for synonym in synonyms(term, max_synonyms):
+                expanded.setdefault(synonym, None)
+    return list(expanded)
 
-    tokens = [word for word in tokens if word.isalnum()]
 
-    term_frequencies = Counter(tokens)
+def preprocess_approach_4(content, stop_words, top_n_terms, lemmatize_flag=False):
+    tokens = preprocessamento.tokenize_alnum(content)
+    if lemmatize_flag:
+        with timer("lemmatize"):
+            tokens = [preprocessamento.lemmatize(word) for word in tokens]
 
-    most_frequent_terms = [term for term, freq in term_frequencies.most_common(top_n_terms)]
+    with timer("expand"):
+        term_frequencies = Counter(tokens)
 
-    expanded_terms = set(most_frequent_terms)
-    for term in most_frequent_terms:
-        expanded_terms.update(expand_with_synonyms(term))
+        most_frequent_terms = [term for term, freq in term_frequencies.most_common(top_n_terms)]
 
-    return expanded_terms
+        expanded_terms = expand_terms(most_frequent_terms, top_n_terms)
 
+    return expanded_terms
 
-def preprocess_approach_6(content, stop_words, top_n_terms):
-    tokens = word_tokenize(content.lower())
-    tokens = [word for word in tokens if word.isalnum() and word not in stop_words]
 
-    term_frequencies = Counter(tokens)
+def preprocess_approach_6(content, stop_words, top_n_terms, lemmatize_flag=False):
+    tokens = preprocessamento.tokenize_alnum(content, stop_words)
+    if lemmatize_flag:
+        with timer("lemmatize"):
+            tokens = [preprocessamento.lemmatize(word) for word in tokens]
 
-    most_frequent_terms = [term for term, freq in term_frequencies.most_common(top_n_terms)]
+    with timer("expand"):
+        term_frequencies = Counter(tokens)
 
+        most_frequent_terms = [term for term, freq in term_frequencies.most_common(top_n_terms)]
 
-    expanded_terms = set(most_frequent_terms)
-    for term in most_frequent_terms:
-        expanded_terms.update(expand_with_synonyms(term))
+        expanded_terms = expand_terms(most_frequent_terms, top_n_terms)
 
     return expanded_terms
 
 
-def search_documents(file_paths, index_name, approach, top_n_terms=10):
+FILENAME_FIELD = "filename"
+# Índices criados antes do mapeamento explícito de elasticsearch_indexacao
+# (mapeamento dinâmico) têm filename como text, com o keyword em
+# filename.keyword; o filtro terms e o collapse precisam do keyword. Reindexar
+# com elasticsearch_indexacao elimina o caso.
+LEGACY_FILENAME_FIELD = "filename.keyword"
+# O campo de cada índice (ou alias) é consultado de novo depois disso, já que
+# um alias pode passar para um índice com o mapeamento novo.
+FILENAME_FIELD_TTL = 60
+filename_fields = {}
+
+
+def filename_field(index_name):
+    now = time.monotonic()
+    cached = filename_fields.get(index_name)
+    if cached is None or now - cached[1] >= FILENAME_FIELD_TTL:
+        response = get_es().indices.get_field_mapping(index=index_name, fields=[FILENAME_FIELD,
+                                                                                LEGACY_FILENAME_FIELD])
+        legacy = any(LEGACY_FILENAME_FIELD in index_mapping.get("mappings", {})
+                     for index_mapping in response.values())
+        cached = filename_fields[index_name] = (LEGACY_FILENAME_FIELD if legacy else FILENAME_FIELD, now)
+    return cached[0]
+
+
+def build_query_body(expanded_terms, size=10, candidate_filenames=None, field=FILENAME_FIELD):
+    query = {
+        "bool": {
+            "should": [
+                {"match": {"content": term}} for term in expanded_terms
+            ]
+        }
+    }
+    if candidate_filenames is not None:
+        # Restringe o BM25 aos candidatos do MinHash/LSH.
+        query["bool"]["filter"] = [{"terms": {field: candidate_filenames}}]
+        query["bool"]["minimum_should_match"] = 1
+    # Num índice por trechos, cada arquivo aparece uma vez só (o trecho mais
+    # bem pontuado) e size conta arquivos distintos. Sem trechos, não muda nada.
+    # Só o nome do arquivo volta em cada hit, mesmo que o índice guarde o texto.
+    # field: o campo keyword do nome do arquivo (ver filename_field).
+    return {
+        "query": query,
+        "size": size,
+        "collapse": {"field": field},
+        "_source": ["filename"],
+    }
+
+
+# Abordagem "mlt": o documento suspeito vai inteiro (ou pelo seu _id) numa
+# consulta more_like_this, e o servidor escolhe os termos pelo tf-idf com o
+# analisador do campo. O cliente só lê o arquivo. min_doc_freq fica em 1: um
+# termo que aparece numa única fonte é justamente o que aponta a cópia.
+MLT_APPROACH = "mlt"
+MLT_PARAMS = {"max_query_terms": 25, "min_doc_freq": 1, "min_term_freq": 2}
+
+
+def mlt_like(file_path, content, like_index=None, like_root=None):
+    # Com like_index, o documento é referenciado pelo _id com que
+    # elasticsearch_indexacao o indexou (caminho relativo a like_root; ver
+    # check_like_index). Sem ele, o texto já lido segue na própria consulta.
+    if like_index:
+        return [{"_index": like_index, "_id": os.path.relpath(file_path, like_root)}]
+    return [content]
+
+
+def check_like_index(like_index):
+    # O _id de mlt_like só existe num índice com um documento por arquivo (um
+    # índice por trechos usa "<caminho>#<n>"), e o more_like_this só acha o
+    # texto se ele estiver no _source (store_content=True).
+    client = get_es()
+    for name, index in client.indices.get_mapping(index=like_index).items():
+        source = index["mappings"].get("_source", {})
+        if source.get("enabled") is False or "content" in source.get("excludes", []):
+            raise ValueError(f"O índice {name} não guarda o texto dos documentos. "
+                             f"Indexe os suspeitos com store_content=True para usar like_index.")
+    if client.count(index=like_index, query={"exists": {"field": "passage"}})["count"]:
+        raise ValueError(f"O índice {like_index} foi indexado por trechos. "
+                         f"Indexe os suspeitos sem passage_size para usar like_index.")
+
+
+def build_mlt_body(like, size=10, candidate_filenames=None, mlt_params=None, field=FILENAME_FIELD):
+    # mlt_params só ajusta os parâmetros de MLT_PARAMS: fields e like são
+    # sempre os daqui.
+    query = {
+        "bool": {
+            "must": [
+                {"more_like_this": {**MLT_PARAMS, **(mlt_params or {}), "fields": ["content"], "like": like}}
+            ]
+        }
+    }
+    if candidate_filenames is not None:
+        query["bool"]["filter"] = [{"terms": {field: candidate_filenames}}]
+    return {
+        "query": query,
+        "size": size,
+        "collapse": {"field": field},
+        "_source": ["filename"],
+    }
+
+
+def parse_hits(response):
+    seen_files = set()
+    retrieved_docs = []
+    with timer("dedupe"):
+        for hit in response['hits']['hits']:
+            doc_file_name = hit['_source']['filename']
+            score = hit['_score']
+            if doc_file_name not in seen_files:
+                retrieved_docs.append({'filename': doc_file_name, 'score': score})
+                seen_files.add(doc_file_name)
+    return retrieved_docs
+
+
+def search_documents(file_paths, index_name, approach, top_n_terms=10, lemmatize_flag=False, mlt_params=None):
     total_preprocessing_time = 0
     total_queries = 0
     total_documents_found = 0
     results = []
 
-    stop_words = set(stopwords.words("english"))
+    stop_words = preprocessamento.get_stop_words()
+    field = filename_field(index_name)
 
     for file_path in file_paths:
         if not os.path.exists(file_path):
@@ -109,58 +214,44 @@ def search_documents(file_paths, index_name, approach, top_n_terms=10):
 
 
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            with timer("read"):
+                content = f.read()
 
 
         if approach == 4:
-            expanded_terms = preprocess_approach_4(content, stop_words, top_n_terms)
+            expanded_terms = preprocess_approach_4(content, stop_words, top_n_terms, lemmatize_flag)
         elif approach == 6:
-            expanded_terms = preprocess_approach_6(content, stop_words, top_n_terms)
+            expanded_terms = preprocess_approach_6(content, stop_words, top_n_terms, lemmatize_flag)
+        elif approach == MLT_APPROACH:
+            expanded_terms = None
         else:
-            raise ValueError("Abordagem inválida. Escolha 4 ou 6.")
+            raise ValueError("Abordagem inválida. Escolha 4, 6 ou mlt.")
 
         preprocessing_time = time.time() - start_preprocessing_time
         total_preprocessing_time += preprocessing_time
 
-        expanded_terms = list(expanded_terms)[:top_n_terms]
-
-        query_body = {
-            "query": {
-                "bool": {
-                    "should": [
-                        {"match": {"content": term}} for term in expanded_terms
-                    ]
-                }
-            },
-            "size": 10
-        }
+        if expanded_terms is None:
+            query_body = build_mlt_body([content], mlt_params=mlt_params, field=field)
+        else:
+            query_body = build_query_body(expanded_terms, field=field)
 
         start_search_time = time.time()
         try:
-            response = es.options(request_timeout=100).search(index=index_name, body=query_body)  # Ajustando timeout
+            with timer("search"):
+                response = get_es().options(request_timeout=100).search(index=index_name, body=query_body)  # Ajustando timeout
         except Exception as e:
             print(f"Erro ao realizar a busca: {e}")
             continue
 
         search_time = time.time() - start_search_time
-        seen_files = set()
-        total_hits = 0
-
-
-        retrieved_docs = []
-        for hit in response['hits']['hits']:
-            doc_file_name = hit['_source']['filename']
-            score = hit['_score']
-            if doc_file_name not in seen_files:
-                retrieved_docs.append({'filename': doc_file_name, 'score': score})
-                seen_files.add(doc_file_name)
-                total_hits += 1
+        retrieved_docs = parse_hits(response)
+        total_hits = len(retrieved_docs)
 
         total_documents_found += total_hits
 
         results.append({
             "file": file_path,
-            "expanded_terms": list(expanded_terms),
+            "expanded_terms": expanded_terms,
             "retrieved_documents": retrieved_docs,
             "search_time": search_time,
             "total_hits": total_hits
@@ -174,74 +265,208 @@ def search_documents(file_paths, index_name, approach, top_n_terms=10):
     return results
 
 
-def calculate_precision_recall_at_k(relevant_documents, retrieved_documents, k_values):
-    relevant_files = []
+PREPROCESSORS = {
+    4: preprocess_approach_4,
+    6: preprocess_approach_6,
+}
 
 
-    for doc in relevant_documents:
-        relevant_files.extend(doc['src_file'])
+def query_terms(content, approach, top_n_terms=10, lemmatize_flag=False):
+    if approach not in PREPROCESSORS:
+        raise ValueError("Abordagem inválida. Escolha 4 ou 6.")
+    return PREPROCESSORS[approach](content, preprocessamento.get_stop_words(), top_n_terms, lemmatize_flag)
 
 
-    precision_results = []
-    recall_results = []
+worker_lsh = {}
 
-    for k in k_values:
-        retrieved_files_at_k = []
-        for doc in retrieved_documents:
-            retrieved_files_at_k.extend([doc['filename'] for doc in doc['retrieved_documents']][:k])
 
-        relevant_retrieved = set(relevant_files).intersection(set(retrieved_files_at_k))
-        relevant_retrieved_count = len(relevant_retrieved)
+def find_candidates(content, lsh_dir, max_candidates=100):
+    # O índice LSH é aberto uma vez por processo (arrays com mmap).
+    if lsh_dir not in worker_lsh:
+        import minhash
 
-        precision = relevant_retrieved_count / len(retrieved_files_at_k) if len(retrieved_files_at_k) > 0 else 0
+        worker_lsh[lsh_dir] = minhash.MinHashLSH.load(lsh_dir)
+    candidates = worker_lsh[lsh_dir].query(preprocessamento.preprocess_text(content), max_candidates)
+    return [os.path.basename(path) for path, _ in candidates]
 
-        recall = relevant_retrieved_count / len(relevant_files) if len(relevant_files) > 0 else 0
 
-        precision_results.append(precision)
-        recall_results.append(recall)
+def preprocess_file(file_path, approaches, top_n_terms, lemmatize_flag=False, lsh_dir=None, like_index=None,
+                    like_root=None):
+    # Executado nos processos de trabalho: o arquivo é lido uma única vez e
+    # todas as abordagens são calculadas sobre o mesmo conteúdo. As medições
+    # do processo de trabalho voltam junto (instrumentacao.drain).
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            with timer("read"):
+                content = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Erro ao ler o arquivo {file_path}: {e}")
+        return file_path, {}, None, instrumentacao.drain()
+
+    candidates = find_candidates(content, lsh_dir) if lsh_dir else None
+    queries = {}
+    for approach in approaches:
+        if approach == MLT_APPROACH:
+            # No lugar dos termos vai o "like" do more_like_this: o texto já
+            # lido aqui, ou só a referência ao _id com like_index.
+            queries[approach] = (mlt_like(file_path, content, like_index, like_root), 0)
+            continue
+        start_preprocessing_time = time.time()
+        expanded_terms = query_terms(content, approach, top_n_terms, lemmatize_flag)
+        preprocessing_time = time.time() - start_preprocessing_time
+        queries[approach] = (expanded_terms, preprocessing_time)
+    return file_path, queries, candidates, instrumentacao.drain()
+
+
+def run_msearch(index_name, batch, mlt_params=None):
+    field = filename_field(index_name)
+    searches = []
+    for file_path, approach, expanded_terms, candidates in batch:
+        searches.append({})
+        if approach == MLT_APPROACH:
+            searches.append(build_mlt_body(expanded_terms, candidate_filenames=candidates, mlt_params=mlt_params,
+                                           field=field))
+        else:
+            searches.append(build_query_body(expanded_terms, candidate_filenames=candidates, field=field))
+    with timer("search"):
+        response = get_es().options(request_timeout=100).msearch(index=index_name, searches=searches)
+    instrumentacao.count("msearch_requests")
+    return batch, response['responses']
+
+
+def search_documents_batch(file_paths, index_name, approaches=(4, 6), top_n_terms=10, lemmatize_flag=False,
+                           num_workers=None, batch_size=50, max_in_flight=4, lsh_dir=None, mlt_params=None,
+                           like_index=None, like_root=None):
+    for approach in approaches:
+        if approach not in PREPROCESSORS and approach != MLT_APPROACH:
+            raise ValueError("Abordagem inválida. Escolha 4, 6 ou mlt.")
+    if like_index and MLT_APPROACH in approaches:
+        check_like_index(like_index)
+
+    file_paths = [file_path for file_path in file_paths if os.path.exists(file_path)]
+    results = {approach: [] for approach in approaches}
+    total_preprocessing_time = {approach: 0 for approach in approaches}
+
+    def collect(future):
+        try:
+            batch, responses = future.result()
+        except Exception as e:
+            print(f"Erro ao realizar a busca: {e}")
+            return
+        for (file_path, approach, expanded_terms, _), response in zip(batch, responses):
+            if 'error' in response:
+                print(f"Erro ao realizar a busca para {file_path}: {response['error']}")
+                continue
+            retrieved_docs = parse_hits(response)
+            results[approach].append({
+                "file": file_path,
+                "expanded_terms": None if approach == MLT_APPROACH else expanded_terms,
+                "retrieved_documents": retrieved_docs,
+                "search_time": response.get('took', 0) / 1000,
+                "total_hits": len(retrieved_docs)
+            })
+
+    num_workers = num_workers or os.cpu_count() or 1
+    # O pré-processamento usa processos (limitado pela CPU) e as buscas usam
+    # threads, com no máximo max_in_flight requisições _msearch pendentes.
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=preprocessamento.init_worker) as process_pool, \
+            ThreadPoolExecutor(max_workers=max_in_flight) as search_pool:
+        pending = set()
+        batch = []
+        preprocessed = process_pool.map(preprocess_file, file_paths, [approaches] * len(file_paths),
+                                        [top_n_terms] * len(file_paths), [lemmatize_flag] * len(file_paths),
+                                        [lsh_dir] * len(file_paths), [like_index] * len(file_paths),
+                                        [like_root] * len(file_paths), chunksize=max(1, batch_size // num_workers))
+        for file_path, queries, candidates, worker_metrics in preprocessed:
+            instrumentacao.merge(worker_metrics)
+            if candidates == []:
+                # Nenhum candidato: não há o que ranquear para este arquivo.
+                continue
+            for approach, (expanded_terms, preprocessing_time) in queries.items():
+                total_preprocessing_time[approach] += preprocessing_time
+                batch.append((file_path, approach, expanded_terms, candidates))
+
+            if len(batch) >= batch_size:
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+                pending.add(search_pool.submit(run_msearch, index_name, batch, mlt_params))
+                batch = []
+
+        if batch:
+            pending.add(search_pool.submit(run_msearch, index_name, batch, mlt_params))
+        for future in pending:
+            collect(future)
+
+    total_queries = len(file_paths)
+    for approach in approaches:
+        avg_preprocessing_time = total_preprocessing_time[approach] / total_queries if total_queries else 0
+        total_documents_found = sum(result["total_hits"] for result in results[approach])
+        avg_search_time = (sum(result["search_time"] for result in results[approach]) / len(results[approach])
+                           if results[approach] else 0)
+        print(f"\nAbordagem {approach}: tempo médio de pré-processamento por consulta: {avg_preprocessing_time:.4f} segundos")
+        print(f"Abordagem {approach}: tempo médio de busca no servidor por consulta: {avg_search_time:.4f} segundos")
+        print(f"Abordagem {approach}: total de documentos encontrados em todas as consultas: {total_documents_found}")
+
+    return results
 
-    return precision_results, recall_results
 
+def calculate_precision_recall_at_k(relevant_documents, retrieved_documents, k_values):
+    # Média macro por consulta: cada documento suspeito é avaliado contra as
+    # suas próprias fontes no gabarito.
+    import avaliacao
 
-def calculoPrecision(relevant_documents, retrieved_documents_approach4, retrieved_documents_approach6):
-    k_values = [2, 4, 6, 8, 10]
+    evaluation = avaliacao.evaluate(relevant_documents, retrieved_documents, k_values)
+    return evaluation["macro"]["precision"], evaluation["macro"]["recall"]
 
-    precision_results_4, recall_results_4 = calculate_precision_recall_at_k(relevant_documents, retrieved_documents_approach4, k_values)
-    precision_results_6, recall_results_6 = calculate_precision_recall_at_k(relevant_documents, retrieved_documents_approach6, k_values)
 
+def calculoPrecision(relevant_documents, retrieved_documents_approach4, retrieved_documents_approach6,
+                     output_dir="graficos", retrieved_documents_mlt=None):
+    import avaliacao
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(k_values, precision_results_4, marker='o', label='Abordagem 4', color='b')
-    plt.plot(k_values, precision_results_6, marker='o', label='Abordagem 6', color='g')
-    plt.xlabel('k')
-    plt.ylabel('Precision at k (P@k)')
-    plt.title('Precision at k (P@k) para as abordagens 4 e 6')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+    k_values = [2, 4, 6, 8, 10]
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(k_values, recall_results_4, marker='o', label='Abordagem 4', color='b')
-    plt.plot(k_values, recall_results_6, marker='o', label='Abordagem 6', color='g')
-    plt.xlabel('k')
-    plt.ylabel('Recall at k (R@k)')
-    plt.title('Recall at k (R@k) para as abordagens 4 e 6')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+    evaluations = {
+        "Abordagem 4": avaliacao.evaluate(relevant_documents, retrieved_documents_approach4, k_values),
+        "Abordagem 6": avaliacao.evaluate(relevant_documents, retrieved_documents_approach6, k_values),
+    }
+    if retrieved_documents_mlt is not None:
+        evaluations["more_like_this"] = avaliacao.evaluate(relevant_documents, retrieved_documents_mlt, k_values)
+    for name, evaluation in evaluations.items():
+        print(f"{name}: MAP = {evaluation['macro']['map']:.4f}")
 
+    for path in avaliacao.save_evaluation_plots(evaluations, output_dir, k_values):
+        print(f"Gráfico salvo em {path}")
 
 
 if __name__ == "__main__":
 
-	base_path = "C:\\Users\\zin\\Downloads\\pan-plagiarism-corpus-2011\\external-detection-corpus\\suspicious-document"
-	file_paths = glob.glob(os.path.join(base_path, "part*", "*.txt"))
+    base_path = "C:\\Users\\zin\\Downloads\\pan-plagiarism-corpus-2011\\external-detection-corpus\\suspicious-document"
+    file_paths = glob.glob(os.path.join(base_path, "part*", "*.txt"))
     index_name = "index"
-   
-    retrieved_documents_approach4 = search_documents(file_paths, index_name, approach=4, top_n_terms=10)
-    retrieved_documents_approach6 = search_documents(file_paths, index_name, approach=6, top_n_terms=10)
-   
-    directory = r'C:\Users\zin\Downloads\pan-plagiarism-corpus-2011'
-    relevant_documents = get_suspicious_documents(directory, limit=64)
-
-    calculoPrecision(relevant_documents, retrieved_documents_approach4, retrieved_documents_approach6)
+
+    with instrumentacao.session("elasticsearch_busca"):
+        directory = r'C:\Users\zin\Downloads\pan-plagiarism-corpus-2011'
+        relevant_documents = get_suspicious_documents(directory)
+
+        if "--lote" in sys.argv[1:]:
+            # Avaliação sem o Elasticsearch: cosseno TF-IDF de todos os
+            # suspeitos contra todas as fontes em matrizes esparsas.
+            import avaliacao
+            import tfidf_lote
+
+            source_paths = glob.glob(os.path.join(directory, "external-detection-corpus", "source-document",
+                                                  "part*", "*.txt"))
+            retrieved_documents = tfidf_lote.search_all(source_paths, file_paths)
+            evaluation = avaliacao.evaluate(relevant_documents, retrieved_documents)
+            print(f"TF-IDF em lote: MAP = {evaluation['macro']['map']:.4f}")
+        else:
+            # --mlt inclui a abordagem more_like_this na mesma execução.
+            approaches = (4, 6, MLT_APPROACH) if "--mlt" in sys.argv[1:] else (4, 6)
+            results = search_documents_batch(file_paths, index_name, approaches=approaches, top_n_terms=10)
+            retrieved_documents_approach4 = results[4]
+            retrieved_documents_approach6 = results[6]
+
+            calculoPrecision(relevant_documents, retrieved_documents_approach4, retrieved_documents_approach6,
+                             retrieved_documents_mlt=results.get(MLT_APPROACH))
@@ -1,63 +1,289 @@
 import os
+import sys
 import time
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk, BulkIndexError
+import preprocessamento
+import instrumentacao
+from instrumentacao import timer
+
+ES_URL = os.environ.get("ELASTICSEARCH_URL", "http://localhost:9200")
+# Criado no primeiro uso (get_es): importar o cliente já custa ~0,3 s.
+es = None
+
+
+def get_es():
+    global es
+    if es is None:
+        from elasticsearch import Elasticsearch
+        es = Elasticsearch(ES_URL)
+    return es
+
+
+# Análise no servidor: minúsculas, stopwords e stemming em inglês são feitos
+# pelo Elasticsearch ao indexar "content" e ao analisar o texto das consultas
+# "match", sem depender do pré-processamento em Python.
+ANALYSIS_SETTINGS = {
+    "analysis": {
+        "filter": {
+            "english_stop": {"type": "stop", "stopwords": "_english_"},
+            "english_stemmer": {"type": "stemmer", "language": "english"},
+            "english_possessive_stemmer": {"type": "stemmer", "language": "possessive_english"},
+        },
+        "analyzer": {
+            "texto": {
+                "tokenizer": "standard",
+                "filter": ["english_possessive_stemmer", "lowercase", "english_stop", "english_stemmer"],
+            },
+        },
+    },
+}
+# Durante a carga em massa: sem refresh (nada é buscado antes do fim) e sem
+# réplicas (cada documento é escrito uma vez só). Os valores anteriores
+# voltam ao final, seguidos de um force merge.
+BULK_SETTINGS = {"index.refresh_interval": "-1", "index.number_of_replicas": 0}
+FORCEMERGE_SEGMENTS = 1
+# O force merge de um índice grande passa fácil do timeout padrão do cliente.
+FORCEMERGE_TIMEOUT = 3600
+
+
+# O texto fica só no índice invertido: as buscas precisam apenas do nome do
+# arquivo, então "content" é retirado do _source (que é o maior pedaço do
+# índice em disco e das respostas). store_content=True mantém o texto para
+# reindexar ou destacar trechos. O nome do arquivo é keyword: só é usado em
+# filtros, collapse e nas respostas.
+def index_mappings(store_content=False):
+    mappings = {
+        "properties": {
+            "filename": {"type": "keyword"},
+            "content": {"type": "text", "analyzer": "texto"},
+            "passage": {"type": "integer"},
+        }
+    }
+    if not store_content:
+        mappings["_source"] = {"excludes": ["content"]}
+    return mappings
+
+
+def put_index_template(alias, store_content=False):
+    # Todo índice "<alias>-*" nasce com a análise e o mapeamento acima, mesmo
+    # que seja criado implicitamente por um bulk.
+    get_es().indices.put_index_template(name=f"{alias}-template", index_patterns=[f"{alias}-*"], priority=100,
+                                        template={"settings": ANALYSIS_SETTINGS,
+                                                  "mappings": index_mappings(store_content)})
+
+
+def create_index(index_name, store_content=False):
+    # Não mexe num índice que já existe (o mapeamento não pode ser trocado).
+    client = get_es()
+    if client.indices.exists(index=index_name):
+        return False
+    client.indices.create(index=index_name, settings=ANALYSIS_SETTINGS, mappings=index_mappings(store_content))
+    return True
+
+
+def start_bulk_load(index_name):
+    # Aplica BULK_SETTINGS e devolve os valores anteriores (None quando o
+    # índice usa o padrão do cluster).
+    client = get_es()
+    response = client.indices.get_settings(index=index_name, flat_settings=True)
+    current = next(iter(response.values()), {}).get("settings", {})
+    previous = {name: current.get(name) for name in BULK_SETTINGS}
+    client.indices.put_settings(index=index_name, settings=BULK_SETTINGS)
+    return previous
+
+
+def restore_settings(index_name, previous):
+    # Desfaz start_bulk_load, tenha a carga terminado bem ou não.
+    get_es().indices.put_settings(index=index_name, settings=previous)
+
+
+def optimize_index(index_name, max_num_segments=FORCEMERGE_SEGMENTS):
+    # Só depois de uma carga completa: torna os documentos visíveis e junta
+    # os segmentos criados por ela. Um forcemerge num índice pela metade
+    # custaria caro para nada.
+    client = get_es()
+    with timer("merge"):
+        client.indices.refresh(index=index_name)
+        if max_num_segments:
+            client.options(request_timeout=FORCEMERGE_TIMEOUT).indices.forcemerge(
+                index=index_name, max_num_segments=max_num_segments)
+
+
+def new_index_name(alias):
+    return f"{alias}-{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def alias_indices(alias):
+    # Índices atrás do alias. Um índice comum com o nome do alias (criado
+    # antes dos aliases) ocupa o nome e é devolvido em separado.
+    client = get_es()
+    if client.indices.exists_alias(name=alias):
+        return sorted(client.indices.get_alias(name=alias)), None
+    if client.indices.exists(index=alias):
+        return [], alias
+    return [], None
+
+
+def swap_alias(alias, index_name, delete_old=False):
+    # Uma única chamada a _aliases: as buscas pelo alias passam do índice
+    # antigo para o novo de uma vez, sem nunca ver um índice pela metade.
+    old_indices, concrete_index = alias_indices(alias)
+    if concrete_index and not delete_old:
+        raise ValueError(f"Já existe um índice chamado {alias}. Use delete_old=True para substituí-lo pelo alias.")
+    old_indices = [name for name in old_indices if name != index_name]
+    actions = [{"remove": {"index": name, "alias": alias}} for name in old_indices]
+    if concrete_index:
+        actions.append({"remove_index": {"index": concrete_index}})
+    actions.append({"add": {"index": index_name, "alias": alias}})
+    client = get_es()
+    client.indices.update_aliases(actions=actions)
+    if delete_old:
+        for name in old_indices:
+            client.indices.delete(index=name)
+    return old_indices
 
-es = Elasticsearch("http://localhost:9200")
 
 def read_large_file(file_path):
 
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = ""
-        for line in f:
-            content += line
-        return content
+        with timer("read"):
+            return f.read()
 
 
-def index_documents(folder_path, index_name):
-    actions = []
-    total_preprocessing_time = 0
-    total_indexing_time = 0
-    total_documents = 0
-
+def iter_document_paths(folder_path):
     for root, dirs, files in os.walk(folder_path):
         for file in files:
             if file.endswith(".txt"):
+                yield os.path.join(root, file)
 
-                start_preprocessing_time = time.time()
-                content = read_large_file(os.path.join(root, file))
-                preprocessing_time = time.time() - start_preprocessing_time
-                total_preprocessing_time += preprocessing_time
 
-                action = {
+def iter_passages(file_path, preprocess=False, stream_params=None):
+    # Gera (número do trecho, texto). Com passage_size em stream_params, o
+    # arquivo é lido em blocos e cada trecho sobreposto vira um documento, então
+    # só um trecho por vez fica na memória; sem ele, o arquivo sai inteiro.
+    stream_params = stream_params or {}
+    passage_size = stream_params.get("passage_size")
+    if not passage_size:
+        content = read_large_file(file_path)
+        if preprocess:
+            content = " ".join(preprocessamento.preprocess_text(content))
+        yield None, content
+        return
+
+    tokenize = preprocessamento.preprocess_text if preprocess else str.split
+    tokens = preprocessamento.stream_tokens(file_path, stream_params.get("read_chunk_size")
+                                            or preprocessamento.DEFAULT_READ_CHUNK_SIZE, tokenize)
+    passages = preprocessamento.iter_passages(tokens, passage_size, stream_params.get("passage_overlap", 0))
+    for passage, words in enumerate(passages):
+        yield passage, " ".join(words)
+
+
+def passage_path(doc_id):
+    # "dir/arquivo.txt#3" -> "dir/arquivo.txt"
+    path, _, passage = doc_id.rpartition("#")
+    return path if path and passage.isdigit() else doc_id
+
+
+def generate_actions(file_paths, folder_path, index_name, stats, preprocess=False, stream_params=None):
+    # O _id é o caminho relativo do arquivo (mais "#n" para o trecho n):
+    # reenviar um documento após uma falha sobrescreve a versão anterior em
+    # vez de duplicá-la.
+    for file_path in file_paths:
+        relative_path = os.path.relpath(file_path, folder_path)
+        start_preprocessing_time = time.time()
+        try:
+            for passage, content in iter_passages(file_path, preprocess, stream_params):
+                stats["preprocessing_time"] += time.time() - start_preprocessing_time
+                source = {"filename": os.path.basename(file_path), "content": content}
+                doc_id = relative_path
+                if passage is not None:
+                    source["passage"] = passage
+                    doc_id = f"{relative_path}#{passage}"
+                yield {
                     "_index": index_name,
-                    "_source": {
-                        "filename": file,
-                        "content": content
-                    }
+                    "_id": doc_id,
+                    "_source": source
                 }
-                actions.append(action)
-                total_documents += 1
-
-                if len(actions) >= 50:
-                    try:
-                        start_indexing_time = time.time()
-                        bulk(es, actions)
-                        indexing_time = time.time() - start_indexing_time
-                        total_indexing_time += indexing_time
-                        actions = []  # Limpar ações
-                    except BulkIndexError as e:
-                        print(f"Erro durante a indexação em massa: {e}")
-                        continue  #
-
-    if actions:
-        try:
-            start_indexing_time = time.time()
-            bulk(es, actions)
-            indexing_time = time.time() - start_indexing_time
-            total_indexing_time += indexing_time
-        except BulkIndexError as e:
-            print(f"Erro durante a indexação final: {e}")
+                start_preprocessing_time = time.time()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Erro ao ler o arquivo {file_path}: {e}")
+
+
+def send_actions(actions, thread_count=1, max_chunk_bytes=10 * 1024 * 1024, chunk_size=10000):
+    # chunk_size fica alto para que os lotes sejam limitados pelo tamanho em bytes.
+    from elasticsearch.helpers import streaming_bulk, parallel_bulk
+
+    if thread_count > 1:
+        return parallel_bulk(get_es(), actions, thread_count=thread_count, chunk_size=chunk_size,
+                             max_chunk_bytes=max_chunk_bytes, queue_size=thread_count * 2,
+                             raise_on_error=False, raise_on_exception=False)
+    return streaming_bulk(get_es(), actions, chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes,
+                          raise_on_error=False, raise_on_exception=False)
+
+
+def index_documents(folder_path, index_name, preprocess=False, thread_count=1,
+                    max_chunk_bytes=10 * 1024 * 1024, max_retries=3, initial_backoff=2, max_backoff=60,
+                    stream_params=None, store_content=False, alias=None, bulk_profile=True, delete_old=False):
+    # Com alias, index_name é ignorado: a carga vai para um índice novo
+    # "<alias>-<data>" e o alias só passa para ele se nenhum documento falhar.
+    if alias:
+        _, concrete_index = alias_indices(alias)
+        if concrete_index and not delete_old:
+            raise ValueError(f"Já existe um índice chamado {alias}. Use delete_old=True para substituí-lo pelo alias.")
+        put_index_template(alias, store_content)
+        index_name = new_index_name(alias)
+    create_index(index_name, store_content)
+    stats = {"preprocessing_time": 0}
+    total_documents = 0
+    failed_documents = []
+
+    start_time = time.time()
+    previous_settings = start_bulk_load(index_name) if bulk_profile else None
+    try:
+        pending_paths = iter_document_paths(folder_path)
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                backoff = min(max_backoff, initial_backoff * 2 ** (attempt - 1))
+                print(f"Reenviando {len(failed_documents)} documentos em {backoff} segundos "
+                      f"(tentativa {attempt} de {max_retries})")
+                time.sleep(backoff)
+
+            actions = generate_actions(pending_paths, folder_path, index_name, stats, preprocess, stream_params)
+            failed_documents = []
+            for ok, item in send_actions(actions, thread_count, max_chunk_bytes):
+                if ok:
+                    total_documents += 1
+                    instrumentacao.count("documents")
+                else:
+                    op_type, info = item.popitem()
+                    failed_documents.append((info.get("_id"), info.get("status"), info.get("error")))
+
+            if not failed_documents:
+                break
+            # Um trecho com falha faz o arquivo inteiro ser reenviado; os _ids
+            # fixos evitam duplicar os trechos que já tinham entrado.
+            pending_paths = sorted({os.path.join(folder_path, passage_path(doc_id))
+                                    for doc_id, _, _ in failed_documents})
+    finally:
+        if previous_settings is not None:
+            restore_settings(index_name, previous_settings)
+    if previous_settings is not None and not failed_documents:
+        optimize_index(index_name)
+
+    if alias:
+        if failed_documents:
+            print(f"O alias {alias} continua no índice anterior: {index_name} ficou incompleto")
+        else:
+            old_indices = swap_alias(alias, index_name, delete_old)
+            print(f"Alias {alias} -> {index_name}" + (f" (antes: {', '.join(old_indices)})" if old_indices else ""))
+
+    for doc_id, status, error in failed_documents:
+        print(f"Erro durante a indexação em massa de {doc_id} (status {status}): {error}")
+
+    elapsed_time = time.time() - start_time
+    total_preprocessing_time = stats["preprocessing_time"]
+    # A leitura acontece dentro do gerador consumido pelo bulk, então o tempo de
+    # indexação é o restante do tempo total.
+    total_indexing_time = max(elapsed_time - total_preprocessing_time, 0)
 
     avg_preprocessing_time = total_preprocessing_time / total_documents if total_documents else 0
     avg_indexing_time = total_indexing_time / total_documents if total_documents else 0
@@ -65,6 +291,12 @@ def index_documents(folder_path, index_name):
     # Exibir os resultados
     print(f"Tempo médio de pré-processamento por documento: {avg_preprocessing_time:.4f} segundos")
     print(f"Tempo médio de indexação por documento: {avg_indexing_time:.4f} segundos")
+    print(f"Documentos por segundo: {total_documents / elapsed_time if elapsed_time else 0:.2f}")
+    if failed_documents:
+        print(f"Documentos não indexados após {max_retries} tentativas: {len(failed_documents)}")
+    if preprocess:
+        cache_stats = preprocessamento.cache_stats()
+        print(f"Taxa de acerto do cache de lemas: {cache_stats['hit_rate']:.2%}")
 
     return avg_preprocessing_time, avg_indexing_time
 
@@ -74,7 +306,12 @@ if __name__ == "__main__":
     folder_path = r'C:\Users\zin\Downloads\pan-plagiarism-corpus-2011\external-detection-corpus\source-document' 
     index_name = 'index'
 
-    index_documents(folder_path, index_name)
+    stream_params = preprocessamento.STREAMING_PARAMS if "--streaming" in sys.argv else None
+    # As buscas usam o alias "index"; cada execução constrói um índice novo
+    # atrás dele. --apagar-antigo remove os índices substituídos.
+    with instrumentacao.session("elasticsearch_indexacao"):
+        index_documents(folder_path, index_name, thread_count=4, stream_params=stream_params, alias=index_name,
+                        delete_old="--apagar-antigo" in sys.argv)
     end_time = time.time()
 
     execution_time = end_time - start_time
@@ -0,0 +1,270 @@
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import preprocessamento
+import avaliacao
+import gabarito
+import sinonimos
+import instrumentacao
+from instrumentacao import timer
+
+# Varredura de parâmetros das abordagens 4 e 6 do Elasticsearch. Cada
+# documento suspeito é tokenizado uma única vez: os tokens (IDs num
+# vocabulário local, na ordem do texto) e o vetor de frequências ficam num
+# .npz identificado pelo hash do conteúdo e por TOKENIZER_VERSION, e valem
+# para todas as configurações e para as próximas execuções. Stopwords e
+# lematização são aplicadas sobre o vocabulário já contado.
+
+ARTIFACTS_DIR = "artefatos"
+DEFAULT_GRID = {
+    "approach": [4, 6],
+    "lemmatize": [False],
+    "top_n_terms": [10],
+    "max_synonyms": [5],
+}
+
+
+def artifact_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"v{preprocessamento.TOKENIZER_VERSION}", digest[:2], f"{digest}.npz")
+
+
+def build_artifact(text):
+    # Vocabulário na ordem da primeira ocorrência: é a ordem de desempate do
+    # Counter.most_common usado por preprocess_approach_4/6.
+    vocabulary = {}
+    token_ids = [vocabulary.setdefault(token, len(vocabulary)) for token in preprocessamento.tokenize_alnum(text)]
+    dtype = np.uint16 if len(vocabulary) <= np.iinfo(np.uint16).max + 1 else np.uint32
+    token_ids = np.array(token_ids, dtype=dtype)
+    counts = np.bincount(token_ids, minlength=len(vocabulary)).astype(np.uint32)
+    return list(vocabulary), token_ids, counts
+
+
+def save_artifact(path, vocabulary, token_ids, counts):
+    # Termos num único bloco UTF-8 separado por "\n" (os tokens não têm
+    # espaços), sem arrays de strings de largura fixa nem pickle.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, vocabulary=np.frombuffer("\n".join(vocabulary).encode('utf-8'), dtype=np.uint8),
+             tokens=token_ids, counts=counts)
+    os.replace(tmp_path, path)
+
+
+def load_artifact(path):
+    with np.load(path) as data:
+        blob = data["vocabulary"].tobytes().decode('utf-8')
+        return (blob.split("\n") if blob else []), data["tokens"], data["counts"]
+
+
+def ensure_artifact(file_path, cache_dir):
+    # Executado nos processos de trabalho: só tokeniza se o artefato do
+    # conteúdo atual ainda não existe. Devolve (arquivo, artefato, criado).
+    try:
+        with open(file_path, 'rb') as f:
+            with timer("read"):
+                data = f.read()
+        path = artifact_path(cache_dir, hashlib.sha1(data).hexdigest())
+        if os.path.exists(path):
+            return file_path, path, False, instrumentacao.drain()
+        save_artifact(path, *build_artifact(data.decode('utf-8')))
+        return file_path, path, True, instrumentacao.drain()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Erro ao ler o arquivo {file_path}: {e}")
+        return file_path, None, False, instrumentacao.drain()
+
+
+def ensure_artifacts(file_paths, cache_dir, num_workers=None, chunk_size=16):
+    # {arquivo: artefato} e quantos artefatos foram criados nesta chamada.
+    num_workers = num_workers or os.cpu_count() or 1
+    artifacts = {}
+    created = 0
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=preprocessamento.init_worker) as executor:
+        for file_path, path, new, worker_metrics in executor.map(ensure_artifact, file_paths,
+                                                                 [cache_dir] * len(file_paths),
+                                                                 chunksize=chunk_size):
+            instrumentacao.merge(worker_metrics)
+            if path:
+                artifacts[file_path] = path
+                created += new
+    return artifacts, created
+
+
+class DocumentTerms:
+    # Termos de um documento ordenados como Counter.most_common, calculados
+    # uma vez por (abordagem, lematização) e reaproveitados por todos os
+    # top_n_terms e max_synonyms da grade.
+
+    def __init__(self, vocabulary, counts):
+        self.vocabulary = vocabulary
+        self.counts = counts
+        self.ranked = {}
+
+    def ranked_terms(self, approach, lemmatize_flag, stop_words):
+        key = (approach, lemmatize_flag)
+        if key not in self.ranked:
+            terms = self.vocabulary
+            counts = self.counts
+            if approach == 6:
+                keep = [i for i, term in enumerate(terms) if term not in stop_words]
+                terms = [terms[i] for i in keep]
+                counts = counts[keep]
+            if lemmatize_flag:
+                with timer("lemmatize"):
+                    merged = {}
+                    for term, count in zip(terms, counts.tolist()):
+                        lemma = preprocessamento.lemmatize(term)
+                        merged[lemma] = merged.get(lemma, 0) + count
+                terms = list(merged)
+                counts = np.fromiter(merged.values(), dtype=np.int64, count=len(merged))
+            order = np.argsort(-np.asarray(counts, dtype=np.int64), kind='stable')
+            self.ranked[key] = [terms[i] for i in order]
+        return self.ranked[key]
+
+
+synonym_memo = {}
+
+
+def memo_synonyms(term, max_synonyms):
+    key = (term, max_synonyms)
+    if key not in synonym_memo:
+        synonym_memo[key] = sinonimos.get_synonyms(term, max_synonyms, engine="elasticsearch")
+    return synonym_memo[key]
+
+
+def expand_terms(ranked_terms, top_n_terms, max_synonyms):
+    # A expansão de preprocess_approach_4/6 (elasticsearch_busca.expand_terms),
+    # com os sinônimos guardados entre as configurações da grade.
+    import elasticsearch_busca
+
+    with timer("expand"):
+        return elasticsearch_busca.expand_terms(ranked_terms, top_n_terms, max_synonyms, memo_synonyms)
+
+
+def iter_grid(grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def run_config(documents, index_name, config, stop_words, batch_size=50, max_in_flight=4):
+    # Consultas de uma configuração, enviadas em _msearch como em
+    # elasticsearch_busca.search_documents_batch.
+    import elasticsearch_busca
+
+    start_time = time.perf_counter()
+    batch = []
+    for file_path, terms in documents.items():
+        ranked = terms.ranked_terms(config["approach"], config["lemmatize"], stop_words)
+        batch.append((file_path, config["approach"], expand_terms(ranked, config["top_n_terms"],
+                                                                    config["max_synonyms"]), None))
+    build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    retrieved_documents = []
+    batches = [batch[i:i + batch_size] for i in range(0, len(batch), batch_size)]
+    with ThreadPoolExecutor(max_workers=max_in_flight) as search_pool:
+        for sent, responses in search_pool.map(lambda part: elasticsearch_busca.run_msearch(index_name, part),
+                                               batches):
+            for (file_path, _, expanded_terms, _), response in zip(sent, responses):
+                if 'error' in response:
+                    print(f"Erro ao realizar a busca para {file_path}: {response['error']}")
+                    continue
+                retrieved_documents.append({
+                    "file": file_path,
+                    "expanded_terms": expanded_terms,
+                    "retrieved_documents": elasticsearch_busca.parse_hits(response),
+                })
+    return retrieved_documents, build_time, time.perf_counter() - start_time
+
+
+def run_grid(file_paths, index_name, relevant_documents, grid=None, cache_dir=ARTIFACTS_DIR, num_workers=None,
+             k_values=avaliacao.DEFAULT_K_VALUES):
+    grid = grid or DEFAULT_GRID
+    start_time = time.perf_counter()
+    artifacts, created = ensure_artifacts(file_paths, cache_dir, num_workers)
+    documents = {}
+    for file_path, path in artifacts.items():
+        vocabulary, _, counts = load_artifact(path)
+        documents[file_path] = DocumentTerms(vocabulary, counts)
+    artifacts_time = time.perf_counter() - start_time
+    print(f"Artefatos: {len(artifacts)} documentos, {created} tokenizados agora, "
+          f"{len(artifacts) - created} reaproveitados ({artifacts_time:.2f} segundos)")
+
+    stop_words = preprocessamento.get_stop_words()
+    results = []
+    for config in iter_grid(grid):
+        retrieved_documents, build_time, search_time = run_config(documents, index_name, config, stop_words)
+        with timer("evaluate"):
+            evaluation = avaliacao.evaluate(relevant_documents, retrieved_documents, k_values)
+        results.append({
+            "config": config,
+            "precision": evaluation["macro"]["precision"],
+            "recall": evaluation["macro"]["recall"],
+            "map": evaluation["macro"]["map"],
+            "query_build_seconds": build_time,
+            "search_seconds": search_time,
+        })
+        print(f"{config}: MAP = {evaluation['macro']['map']:.4f}, montagem {build_time:.2f} s, "
+              f"busca {search_time:.2f} s")
+    return {
+        "k_values": list(k_values),
+        "artifacts": {"documents": len(artifacts), "created": created, "seconds": artifacts_time},
+        "results": results,
+    }
+
+
+def parse_flag(value):
+    if value.lower() in ("1", "true", "sim"):
+        return True
+    if value.lower() in ("0", "false", "nao", "não"):
+        return False
+    raise ValueError(f"Valor inválido: {value}. Use 0 ou 1.")
+
+
+def parse_args(argv=None):
+    import argparse
+
+    base_path = r"C:\Users\zin\Downloads\pan-plagiarism-corpus-2011"
+    parser = argparse.ArgumentParser(description="Varredura de parâmetros das abordagens 4 e 6 com os documentos "
+                                                 "suspeitos tokenizados uma única vez.")
+    parser.add_argument("--suspicious", default=os.path.join(base_path, "external-detection-corpus",
+                                                             "suspicious-document"),
+                        help="diretório dos documentos suspeitos")
+    parser.add_argument("--ground-truth", default=base_path, help="diretório com as anotações (gabarito)")
+    parser.add_argument("--index", default="index", help="índice (ou alias) do Elasticsearch")
+    parser.add_argument("--approaches", type=int, nargs="+", choices=[4, 6], default=DEFAULT_GRID["approach"])
+    parser.add_argument("--lemmatize", type=parse_flag, nargs="+", default=DEFAULT_GRID["lemmatize"],
+                        help="0 e/ou 1")
+    parser.add_argument("--top-n", type=int, nargs="+", default=DEFAULT_GRID["top_n_terms"])
+    parser.add_argument("--max-synonyms", type=int, nargs="+", default=DEFAULT_GRID["max_synonyms"])
+    parser.add_argument("--artifacts", default=ARTIFACTS_DIR, help="diretório dos artefatos (.npz)")
+    parser.add_argument("--workers", type=int, default=None, help="processos de tokenização")
+    parser.add_argument("--output", default="experimentos.json")
+    return parser.parse_args(argv)
+
+
+def main_experimentos(args):
+    import glob
+
+    file_paths = sorted(glob.glob(os.path.join(args.suspicious, "**", "*.txt"), recursive=True))
+    relevant_documents = gabarito.get_suspicious_documents(args.ground_truth)
+    grid = {
+        "approach": args.approaches,
+        "lemmatize": args.lemmatize,
+        "top_n_terms": args.top_n,
+        "max_synonyms": args.max_synonyms,
+    }
+    results = run_grid(file_paths, args.index, relevant_documents, grid, args.artifacts, args.workers)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    with instrumentacao.session("experimentos"):
+        main_experimentos(parse_args())
+    sys.exit(0)
@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+
+INDEX_VERSION = 2
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Os índices do gabarito ficam fora do corpus, um por diretório de anotações.
+CACHE_DIR = os.environ.get("GROUND_TRUTH_CACHE", os.path.join(MODULE_DIR, "cache", "gabarito"))
+OFFSET_FIELDS = ("this_offset", "this_length", "source_offset", "source_length")
+# Abaixo disso não compensa iniciar um pool de processos.
+PARALLEL_THRESHOLD = 64
+
+
+def parse_offsets(item):
+    offsets = {}
+    for field in OFFSET_FIELDS:
+        if field in item:
+            offsets[field] = int(item[field])
+    return offsets
+
+
+def parse_json_annotations(file_path):
+    filename = os.path.basename(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    items = data if isinstance(data, list) else [data]
+    entries = []
+    for item in items:
+        if isinstance(item, dict) and item.get('type') == "suspicious-document":
+            offsets = parse_offsets(item)
+            entries.append({
+                'filename': filename,
+                'src_file': item.get('src_file', []),
+                'offsets': [offsets] if offsets else [],
+            })
+    return entries
+
+
+def parse_xml_annotations(file_path):
+    # Formato do PAN: <document reference="suspicious-documentNNNNN.txt"> com
+    # um <feature name="plagiarism" source_reference=... /> por trecho copiado.
+    root = ET.parse(file_path).getroot()
+    if not root.get('reference', '').startswith('suspicious-document'):
+        return []
+
+    src_files = []
+    offsets = []
+    for feature in root.iter('feature'):
+        source_reference = feature.get('source_reference')
+        if not source_reference:
+            continue
+        if source_reference not in src_files:
+            src_files.append(source_reference)
+        passage = parse_offsets(feature.attrib)
+        passage['source_reference'] = source_reference
+        offsets.append(passage)
+    return [{'filename': os.path.basename(file_path), 'src_file': src_files, 'offsets': offsets}]
+
+
+def parse_annotation_file(file_path):
+    try:
+        if file_path.endswith('.json'):
+            return file_path, parse_json_annotations(file_path)
+        return file_path, parse_xml_annotations(file_path)
+    except (OSError, ValueError, ET.ParseError) as e:
+        print(f"Erro ao ler o arquivo de anotação {file_path}: {e}")
+        return file_path, []
+
+
+def scan_annotation_tree(directory_path, recursive=True):
+    # Arquivos de anotação e o mtime de cada diretório percorrido (relativo a
+    # directory_path). O mtime é lido antes da listagem, então um arquivo
+    # criado durante a varredura aparece na próxima.
+    annotation_files = []
+    directories = {}
+    pending = [directory_path]
+    while pending:
+        current = pending.pop()
+        directories[os.path.relpath(current, directory_path)] = os.stat(current).st_mtime
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(entry.path)
+                elif entry.name.endswith(('.json', '.xml')):
+                    annotation_files.append(entry.path)
+    return annotation_files, directories
+
+
+def list_annotation_files(directory_path, recursive=True):
+    return scan_annotation_tree(directory_path, recursive)[0]
+
+
+def index_path_for(directory_path, recursive=True, cache_dir=None):
+    key = hashlib.sha1(f"{os.path.abspath(directory_path)}|{recursive}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir or CACHE_DIR, f"gabarito-{key}.json.gz")
+
+
+def directories_unchanged(directory_path, directories):
+    # Criar, apagar ou renomear um arquivo muda o mtime do diretório que o
+    # contém; se nenhum mudou, a lista de anotações é a mesma.
+    if not directories:
+        return False
+    try:
+        return all(os.stat(os.path.join(directory_path, relative_dir)).st_mtime == mtime
+                   for relative_dir, mtime in directories.items())
+    except OSError:
+        return False
+
+
+def load_index(index_path):
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with gzip.open(index_path, 'rt', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index
+
+
+def save_index(index_path, files, directories):
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    tmp_path = index_path + ".tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump({"version": INDEX_VERSION, "directories": directories, "files": files}, f,
+                  separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+
+
+def build_ground_truth_index(directory_path, index_path=None, num_workers=None, recursive=True, rescan=False):
+    # Lê o índice salvo em CACHE_DIR. Se nenhum diretório do gabarito mudou
+    # desde a última leitura, ele vale como está, sem percorrer a árvore;
+    # senão só voltam a ser analisados os arquivos novos ou alterados (mtime
+    # ou tamanho diferentes), e os removidos saem do índice. Uma anotação
+    # reescrita no lugar não muda o diretório: rescan=True força a verificação
+    # de cada arquivo.
+    index_path = index_path or index_path_for(directory_path, recursive)
+    index = load_index(index_path)
+    cached_files = index.get("files", {})
+    if not rescan and directories_unchanged(directory_path, index.get("directories")):
+        return cached_files
+
+    annotation_files, directories = scan_annotation_tree(directory_path, recursive)
+    files = {}
+    stale = []
+    for file_path in annotation_files:
+        relative_path = os.path.relpath(file_path, directory_path)
+        stat = os.stat(file_path)
+        cached = cached_files.get(relative_path)
+        if cached and cached["mtime"] == stat.st_mtime and cached["size"] == stat.st_size:
+            files[relative_path] = cached
+        else:
+            files[relative_path] = {"mtime": stat.st_mtime, "size": stat.st_size, "entries": []}
+            stale.append(file_path)
+
+    if stale:
+        if len(stale) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                parsed = list(executor.map(parse_annotation_file, stale, chunksize=64))
+        else:
+            parsed = [parse_annotation_file(file_path) for file_path in stale]
+        for file_path, entries in parsed:
+            files[os.path.relpath(file_path, directory_path)]["entries"] = entries
+
+    if stale or len(files) != len(cached_files) or directories != index.get("directories"):
+        save_index(index_path, files, directories)
+    return files
+
+
+def get_suspicious_documents(directory_path, limit=None, index_path=None, recursive=True, with_offsets=False,
+                             rescan=False):
+    files = build_ground_truth_index(directory_path, index_path, recursive=recursive, rescan=rescan)
+
+    relevant_documents = []
+    for relative_path in sorted(files):
+        for entry in files[relative_path]["entries"]:
+            if with_offsets:
+                relevant_documents.append(entry)
+            else:
+                relevant_documents.append({'filename': entry['filename'], 'src_file': entry['src_file']})
+            if limit is not None and len(relevant_documents) >= limit:
+                return relevant_documents
+    return relevant_documents
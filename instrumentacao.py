@@ -0,0 +1,328 @@
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# Etapas medidas e o passo correspondente do README (leitura e
+# pré-processamento aparecem tanto na consulta quanto na indexação).
+STAGE_STEPS = {
+    "read": "1/6 Leitura",
+    "tokenize": "2/7 Pré-processamento",
+    "stopword": "2/7 Pré-processamento",
+    "lemmatize": "2/7 Pré-processamento",
+    "expand": "3 Extração de termos",
+    "parse": "3 Extração de termos",
+    "search": "4 Busca",
+    "dedupe": "5 Ranqueamento",
+    "index": "8 Representação e indexação",
+    "merge": "8 Representação e indexação",
+    "evaluate": "9 Avaliação",
+}
+PREPROCESS_STAGES = ("read", "tokenize", "stopword", "lemmatize")
+
+# Histograma em potências de 2 de microssegundos: o balde k conta as
+# medições entre 2^(k-1) e 2^k us.
+HISTOGRAM_BUCKETS = 40
+
+enabled = os.environ.get("INSTRUMENTACAO", "1") != "0"
+
+
+class Metrics:
+    # Tempos e contadores por etapa. Seguro entre threads; entre processos,
+    # cada processo de trabalho devolve drain() e o principal faz merge().
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = Counter()
+
+    def record(self, stage, elapsed):
+        bucket = min(HISTOGRAM_BUCKETS - 1, max(0, math.ceil(math.log2(elapsed * 1e6)))) if elapsed > 0 else 0
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = {"count": 0, "total": 0.0, "min": elapsed, "max": elapsed,
+                                              "histogram": [0] * HISTOGRAM_BUCKETS}
+            stats["count"] += 1
+            stats["total"] += elapsed
+            stats["min"] = min(stats["min"], elapsed)
+            stats["max"] = max(stats["max"], elapsed)
+            stats["histogram"][bucket] += 1
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {stage: dict(stats, histogram=list(stats["histogram"]))
+                           for stage, stats in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def drain(self):
+        # Snapshot seguido de reset, sem perder medições entre os dois.
+        with self._lock:
+            snapshot = {"stages": self.stages, "counters": dict(self.counters)}
+            self.stages = {}
+            self.counters = Counter()
+        return snapshot
+
+    def merge(self, snapshot):
+        with self._lock:
+            for stage, other in snapshot["stages"].items():
+                stats = self.stages.get(stage)
+                if stats is None:
+                    self.stages[stage] = dict(other, histogram=list(other["histogram"]))
+                    continue
+                stats["count"] += other["count"]
+                stats["total"] += other["total"]
+                stats["min"] = min(stats["min"], other["min"])
+                stats["max"] = max(stats["max"], other["max"])
+                stats["histogram"] = [a + b for a, b in zip(stats["histogram"], other["histogram"])]
+            self.counters.update(snapshot["counters"])
+
+
+metrics = Metrics()
+
+
+class timer:
+    # with timer("search"): ...  (classe em vez de @contextmanager: é usada
+    # várias vezes por documento e o gerador custaria mais.)
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if enabled:
+            metrics.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def timed(stage):
+    # Decorador: mede cada chamada da função como a etapa stage.
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    # Contadores continuam ativos com INSTRUMENTACAO=0: a indexação usa
+    # "documents" para o total de documentos processados.
+    metrics.count(name, value)
+
+
+def snapshot():
+    return metrics.snapshot()
+
+
+def drain():
+    return metrics.drain()
+
+
+def merge(other):
+    metrics.merge(other)
+
+
+def stage_total(snapshot_data, *stages):
+    return sum(snapshot_data["stages"][stage]["total"] for stage in stages if stage in snapshot_data["stages"])
+
+
+def difference(after, before):
+    # Medições feitas entre dois snapshots (para médias de uma única execução).
+    stages = {}
+    for stage, stats in after["stages"].items():
+        old = before["stages"].get(stage)
+        if old is None:
+            stages[stage] = stats
+        elif stats["count"] > old["count"]:
+            stages[stage] = dict(stats, count=stats["count"] - old["count"], total=stats["total"] - old["total"],
+                                 histogram=[a - b for a, b in zip(stats["histogram"], old["histogram"])])
+    counters = {name: value - before["counters"].get(name, 0) for name, value in after["counters"].items()}
+    return {"stages": stages, "counters": {name: value for name, value in counters.items() if value}}
+
+
+def histogram_percentile(histogram, fraction):
+    # Limite superior (em ms) do balde que contém o percentil.
+    target = fraction * sum(histogram)
+    seen = 0
+    for bucket, bucket_count in enumerate(histogram):
+        seen += bucket_count
+        if bucket_count and seen >= target:
+            return 2 ** bucket / 1000
+    return 0
+
+
+def summarize(snapshot_data):
+    grand_total = sum(stats["total"] for stats in snapshot_data["stages"].values()) or 1
+    summary = {}
+    for stage, stats in snapshot_data["stages"].items():
+        summary[stage] = {
+            "step": STAGE_STEPS.get(stage, "-"),
+            "count": stats["count"],
+            "total_seconds": stats["total"],
+            "share": stats["total"] / grand_total,
+            "mean_ms": stats["total"] / stats["count"] * 1000 if stats["count"] else 0,
+            "min_ms": stats["min"] * 1000,
+            "max_ms": stats["max"] * 1000,
+            "p50_ms": histogram_percentile(stats["histogram"], 0.50),
+            "p95_ms": histogram_percentile(stats["histogram"], 0.95),
+            "p99_ms": histogram_percentile(stats["histogram"], 0.99),
+        }
+    steps = Counter()
+    for stage, stats in summary.items():
+        steps[stats["step"]] += stats["total_seconds"]
+    return summary, dict(steps)
+
+
+def report(snapshot_data=None):
+    snapshot_data = snapshot_data or snapshot()
+    summary, steps = summarize(snapshot_data)
+    if not summary:
+        return
+    print(f"{'etapa':<10} {'passo':<28} {'n':>8} {'total s':>9} {'%':>6} {'média ms':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage, stats in sorted(summary.items(), key=lambda item: -item[1]["total_seconds"]):
+        print(f"{stage:<10} {stats['step']:<28} {stats['count']:>8} {stats['total_seconds']:>9.3f} "
+              f"{stats['share']:>6.1%} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>8.3f} "
+              f"{stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f}")
+    dominant = max(steps, key=steps.get)
+    print(f"Passo dominante: {dominant} ({steps[dominant]:.3f} s)")
+    for name, value in sorted(snapshot_data["counters"].items()):
+        print(f"{name}: {value}")
+
+
+def dump_trace(path, name, wall_seconds=None, snapshot_data=None):
+    snapshot_data = snapshot_data or snapshot()
+    summary, steps = summarize(snapshot_data)
+    trace = {
+        "name": name,
+        "pid": os.getpid(),
+        "created": time.time(),
+        "wall_seconds": wall_seconds,
+        "argv": sys.argv,
+        "stages": summary,
+        "steps": steps,
+        "histograms": {stage: stats["histogram"] for stage, stats in snapshot_data["stages"].items()},
+        "histogram_unit": "balde k: até 2^k microssegundos",
+        "counters": snapshot_data["counters"],
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+class SamplingProfiler:
+    # Amostra a pilha de todas as threads deste processo a cada interval
+    # segundos e grava as pilhas no formato "collapsed" (flamegraph.pl,
+    # speedscope). Custa bem menos que o cProfile em execuções longas.
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, samples in self.samples.most_common():
+                f.write(f"{stack} {samples}\n")
+        return path
+
+    def top_functions(self, limit=15):
+        leaves = Counter()
+        for stack, samples in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += samples
+        return leaves.most_common(limit)
+
+
+class session:
+    # Envolve um ponto de entrada. Variáveis de ambiente:
+    #   INSTRUMENTACAO_TRACE=arquivo.json   grava o trace JSON ao final
+    #   INSTRUMENTACAO_PROFILE=cprofile|sample   liga um profiler (só o
+    #     processo principal; os processos de trabalho ficam de fora)
+    #   INSTRUMENTACAO=0   desliga os temporizadores
+
+    def __init__(self, name, trace_path=None, profile=None):
+        self.name = name
+        self.trace_path = trace_path or os.environ.get("INSTRUMENTACAO_TRACE")
+        self.profile = profile or os.environ.get("INSTRUMENTACAO_PROFILE")
+        if self.profile not in (None, "", "cprofile", "sample"):
+            raise ValueError("Profiler inválido. Escolha 'cprofile' ou 'sample'.")
+        self.profiler = None
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        if self.profile == "cprofile":
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profile == "sample":
+            self.profiler = SamplingProfiler()
+            self.profiler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall_seconds = time.perf_counter() - self.start_time
+        if self.profile == "cprofile":
+            import pstats
+            self.profiler.disable()
+            output = f"{self.name}.prof"
+            self.profiler.dump_stats(output)
+            pstats.Stats(self.profiler).sort_stats("cumulative").print_stats(20)
+            print(f"Perfil do cProfile gravado em {output}")
+        elif self.profile == "sample":
+            self.profiler.stop()
+            output = self.profiler.save(f"{self.name}.folded")
+            for function, samples in self.profiler.top_functions():
+                print(f"{samples:>8}  {function}")
+            print(f"Pilhas amostradas gravadas em {output}")
+
+        if enabled:
+            report()
+            if self.trace_path:
+                dump_trace(self.trace_path, self.name, wall_seconds)
+                print(f"Trace gravado em {self.trace_path}")
+        return False
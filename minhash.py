@@ -0,0 +1,194 @@
+import json
+import os
+import zlib
+import numpy as np
+
+
+MERSENNE_PRIME = (1 << 31) - 1
+SHINGLE_BASE = np.uint64(1000003)
+BAND_BASE = np.uint64(0x9E3779B1)
+
+
+class MinHashLSH:
+    # Recuperação de candidatos por MinHash com LSH em bandas. Cada documento
+    # é dividido em trechos de passage_size tokens (com sobreposição de
+    # metade), porque o plágio costuma copiar um trecho e não o documento
+    # inteiro: a similaridade de Jaccard entre documentos inteiros seria
+    # baixa demais para o LSH.
+    #
+    # Para cada banda, os hashes de todos os trechos indexados ficam num
+    # array ordenado, então a busca é um searchsorted (O(log n)) por banda.
+
+    def __init__(self, num_perm=64, bands=32, shingle_size=3, passage_size=100, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.passage_size = passage_size
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self.doc_keys = []
+        self._pending_hashes = []
+        self._pending_docs = []
+        self.sorted_hashes = None
+        self.order = None
+        self.passage_docs = None
+
+    def params(self):
+        return {
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+            "passage_size": self.passage_size,
+            "seed": self.seed,
+        }
+
+    def shingle_hashes(self, tokens):
+        hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens),
+                             dtype=np.uint64, count=len(tokens))
+        size = min(self.shingle_size, len(hashes))
+        if size == 0:
+            return hashes
+        count = len(hashes) - size + 1
+        combined = np.zeros(count, dtype=np.uint64)
+        for offset in range(size):
+            combined = combined * SHINGLE_BASE + hashes[offset:offset + count]
+        return combined % np.uint64(MERSENNE_PRIME)
+
+    def passage_signatures(self, tokens, max_block_shingles=1 << 16):
+        # Calcula o mínimo de cada permutação por blocos de stride shingles;
+        # cada trecho cobre dois blocos vizinhos. Os shingles são processados
+        # em fatias para limitar a memória em documentos grandes.
+        shingles = self.shingle_hashes(tokens)
+        if len(shingles) == 0:
+            return np.empty((0, self.num_perm), dtype=np.uint64)
+
+        stride = max(1, self.passage_size // 2)
+        blocks = []
+        blocks_per_slice = max(1, max_block_shingles // stride)
+        for start in range(0, len(shingles), stride * blocks_per_slice):
+            piece = shingles[start:start + stride * blocks_per_slice]
+            permuted = (self.a[:, None] * piece[None, :] + self.b[:, None]) % np.uint64(MERSENNE_PRIME)
+            block_starts = np.arange(0, len(piece), stride)
+            blocks.append(np.minimum.reduceat(permuted, block_starts, axis=1))
+        blocks = np.concatenate(blocks, axis=1).T
+        if len(blocks) == 1:
+            return blocks
+        return np.minimum(blocks[:-1], blocks[1:])
+
+    def band_hashes(self, tokens):
+        signatures = self.passage_signatures(tokens)
+        banded = signatures.reshape(len(signatures), self.bands, self.rows)
+        combined = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for row in range(self.rows):
+            combined = combined * BAND_BASE + banded[:, :, row]
+        return (combined % np.uint64(1 << 32)).astype(np.uint32)
+
+    def add(self, doc_key, band_hashes):
+        doc_id = len(self.doc_keys)
+        self.doc_keys.append(doc_key)
+        self._pending_hashes.append(band_hashes)
+        self._pending_docs.append(np.full(len(band_hashes), doc_id, dtype=np.int32))
+
+    def remove(self, doc_keys):
+        # Tira documentos de um índice já finalizado (ou carregado). Os hashes
+        # de cada trecho são reconstruídos a partir da ordenação por banda e o
+        # índice volta ao estado pendente, pronto para add e finalize.
+        self.finalize()
+        removed = set(doc_keys)
+        hashes = np.empty((len(self.passage_docs), self.bands), dtype=np.uint32)
+        for band in range(self.bands):
+            hashes[np.asarray(self.order[band]), band] = self.sorted_hashes[band]
+        kept_docs = [doc_id for doc_id, doc_key in enumerate(self.doc_keys) if doc_key not in removed]
+        new_ids = np.full(len(self.doc_keys), -1, dtype=np.int32)
+        new_ids[kept_docs] = np.arange(len(kept_docs), dtype=np.int32)
+        passage_ids = new_ids[np.asarray(self.passage_docs)]
+        kept = passage_ids >= 0
+        count = len(self.doc_keys) - len(kept_docs)
+        self.doc_keys = [self.doc_keys[doc_id] for doc_id in kept_docs]
+        self._pending_hashes = [hashes[kept]]
+        self._pending_docs = [passage_ids[kept]]
+        self.sorted_hashes = None
+        self.order = None
+        self.passage_docs = None
+        return count
+
+    def finalize(self):
+        if not self._pending_hashes:
+            if self.sorted_hashes is None:
+                self.sorted_hashes = np.empty((self.bands, 0), dtype=np.uint32)
+                self.order = np.empty((self.bands, 0), dtype=np.int32)
+                self.passage_docs = np.empty(0, dtype=np.int32)
+            return
+        if self.passage_docs is not None and len(self.passage_docs):
+            raise ValueError("Não é possível adicionar documentos a um índice LSH já carregado.")
+        hashes = np.concatenate(self._pending_hashes)
+        self.passage_docs = np.concatenate(self._pending_docs)
+        self.order = np.argsort(hashes, axis=0, kind='stable').T.astype(np.int32)
+        self.sorted_hashes = np.take_along_axis(hashes.T, self.order, axis=1)
+        self._pending_hashes = []
+        self._pending_docs = []
+
+    def save(self, path):
+        self.finalize()
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "sorted_hashes.npy"), self.sorted_hashes)
+        np.save(os.path.join(path, "order.npy"), self.order)
+        np.save(os.path.join(path, "passage_docs.npy"), self.passage_docs)
+        with open(os.path.join(path, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump({"params": self.params(), "doc_keys": self.doc_keys}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        lsh = cls(**meta["params"])
+        lsh.doc_keys = meta["doc_keys"]
+        lsh.sorted_hashes = np.load(os.path.join(path, "sorted_hashes.npy"), mmap_mode='r')
+        lsh.order = np.load(os.path.join(path, "order.npy"), mmap_mode='r')
+        lsh.passage_docs = np.load(os.path.join(path, "passage_docs.npy"), mmap_mode='r')
+        return lsh
+
+    def query(self, tokens, max_candidates=100, max_bucket_size=1000):
+        # Devolve [(doc_key, votos)], onde votos é o número de colisões de
+        # banda entre os trechos da consulta e os trechos do documento.
+        # Baldes maiores que max_bucket_size (shingles muito comuns) são ignorados.
+        self.finalize()
+        query_hashes = self.band_hashes(tokens)
+        if len(query_hashes) == 0 or len(self.passage_docs) == 0:
+            return []
+
+        matched = []
+        for band in range(self.bands):
+            band_sorted = self.sorted_hashes[band]
+            values = query_hashes[:, band]
+            low = np.searchsorted(band_sorted, values, side='left')
+            high = np.searchsorted(band_sorted, values, side='right')
+            for start, end in zip(low, high):
+                if 0 < end - start <= max_bucket_size:
+                    matched.append(self.order[band, start:end])
+        if not matched:
+            return []
+
+        passage_ids = np.concatenate(matched)
+        votes = np.bincount(self.passage_docs[passage_ids], minlength=len(self.doc_keys))
+        candidates = np.flatnonzero(votes)
+        ranked = candidates[np.argsort(-votes[candidates], kind='stable')][:max_candidates]
+        return [(self.doc_keys[doc_id], int(votes[doc_id])) for doc_id in ranked]
+
+
+hashers = {}
+
+
+def compute_band_hashes(tokens, params):
+    # Usado nos processos de trabalho, que recebem apenas os parâmetros.
+    key = tuple(sorted(params.items()))
+    if key not in hashers:
+        hashers[key] = MinHashLSH(**params)
+    return hashers[key].band_hashes(tokens)
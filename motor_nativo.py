@@ -0,0 +1,628 @@
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import preprocessamento
+import sinonimos
+import minhash
+import registro
+import instrumentacao
+from instrumentacao import timer, PREPROCESS_STAGES
+
+# Motor de busca próprio, em processo: dicionário de termos ordenado e listas
+# invertidas comprimidas (delta + varint) em arrays NumPy abertos com mmap,
+# BM25 vetorizado e parada antecipada do top-k no estilo MaxScore com
+# máximos por bloco. Não importa o Whoosh nem o cliente do Elasticsearch na
+# busca; a indexação reaproveita o pré-processamento em processos de
+# woosh_Indexacao. Um índice nativo é sempre reconstruído por inteiro.
+
+FORMAT_VERSION = 1
+META_FILE = "nativo.json"
+INDEX_ARRAYS = ("term_strings", "term_offsets", "doc_freqs", "term_blocks", "term_max_scores", "block_last_unit",
+                "block_max_scores", "block_unit_offsets", "block_tf_offsets", "unit_postings", "tf_postings",
+                "unit_lengths", "unit_docs")
+
+# Postings por bloco: a busca só descomprime os blocos que podem conter
+# documentos ainda candidatos ao top-k.
+BLOCK_SIZE = 128
+# A parada antecipada só compensa com listas longas: abaixo desta média de
+# postings por termo da consulta, pontuar tudo de uma vez é mais rápido.
+MAXSCORE_MIN_POSTINGS = 4 * BLOCK_SIZE
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+DEFAULT_QUERY_MODE = "idf"
+DEFAULT_QUERY_TERMS = 50
+# Sem consultas AND: a truncagem é sempre OR, com o nome do modo equivalente
+# de woosh_busca ("truncate" lá é o AND da linha de base).
+QUERY_MODES = ("idf", "truncate_or")
+
+
+def varint_sizes(values):
+    sizes = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        sizes += values >= (1 << shift)
+    return sizes
+
+
+def varint_encode(values):
+    # 7 bits por byte, byte menos significativo primeiro; o bit alto marca
+    # que o valor continua no byte seguinte.
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = varint_sizes(values)
+    owners = np.repeat(np.arange(len(values)), sizes)
+    positions = np.arange(len(owners)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    encoded = (values[owners] >> (7 * positions).astype(np.uint64)) & np.uint64(0x7F)
+    encoded |= (positions < sizes[owners] - 1).astype(np.uint64) << np.uint64(7)
+    return encoded.astype(np.uint8), sizes
+
+
+def varint_decode(data):
+    data = np.asarray(data)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.int64)
+    if data.max() < 0x80:
+        # Caso comum (lacunas pequenas e tfs baixos): um byte por valor.
+        return data.astype(np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    positions = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.int64) << (7 * positions)
+    return np.add.reduceat(parts, starts)
+
+
+def gather_ranges(data, starts, ends):
+    # Concatena data[starts[i]:ends[i]] para todos os i sem laço em Python.
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return data[:0]
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return data[np.arange(total) + shifts]
+
+
+def bm25_idf(doc_frequency, num_units):
+    return np.log1p((num_units - doc_frequency + 0.5) / (doc_frequency + 0.5))
+
+
+class IndexBuilder:
+    # Acumula (termo, tf) de cada unidade indexada (documento ou trecho) em
+    # arrays compactos; save() ordena tudo e grava o índice.
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.term_ids = array('I')
+        self.tfs = array('I')
+        self.unit_sizes = array('I')
+        self.unit_lengths = array('I')
+        self.unit_docs = array('i')
+
+    def add(self, doc_id, tokens):
+        counts = Counter(tokens)
+        vocabulary = self.vocabulary
+        self.term_ids.extend(vocabulary.setdefault(term, len(vocabulary)) for term in counts)
+        self.tfs.extend(counts.values())
+        self.unit_sizes.append(len(counts))
+        self.unit_lengths.append(len(tokens))
+        self.unit_docs.append(doc_id)
+
+    def save(self, index_dir, passages=False, k1=DEFAULT_K1, b=DEFAULT_B):
+        num_units = len(self.unit_sizes)
+        unit_lengths = np.frombuffer(self.unit_lengths, dtype=np.uint32)
+        units = np.repeat(np.arange(num_units, dtype=np.int64), np.frombuffer(self.unit_sizes, dtype=np.uint32))
+        tfs = np.frombuffer(self.tfs, dtype=np.uint32).astype(np.int64)
+
+        # IDs provisórios (ordem de chegada) -> posição no dicionário ordenado.
+        terms = sorted(self.vocabulary)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[np.fromiter((self.vocabulary[term] for term in terms), dtype=np.int64, count=len(terms))] = \
+            np.arange(len(terms))
+        term_ids = rank[np.frombuffer(self.term_ids, dtype=np.uint32)]
+        # As unidades já chegam em ordem crescente; a ordenação estável por
+        # termo deixa cada lista invertida ordenada por unidade.
+        order = np.argsort(term_ids, kind='stable')
+        term_ids, units, tfs = term_ids[order], units[order], tfs[order]
+
+        doc_freqs = np.bincount(term_ids, minlength=len(terms))
+        term_starts = np.concatenate(([0], np.cumsum(doc_freqs)))
+        blocks_per_term = (doc_freqs + BLOCK_SIZE - 1) // BLOCK_SIZE
+        term_blocks = np.concatenate(([0], np.cumsum(blocks_per_term)))
+        rank_in_term = np.arange(len(units)) - term_starts[term_ids]
+        posting_blocks = term_blocks[term_ids] + rank_in_term // BLOCK_SIZE
+        block_starts = np.flatnonzero(np.diff(posting_blocks, prepend=-1))
+
+        # Pontuação BM25 de cada posting (sem o peso da consulta), só para os
+        # limites superiores por bloco e por termo usados na parada antecipada.
+        average_length = unit_lengths.mean() if num_units else 1
+        norms = k1 * (1 - b + b * unit_lengths / (average_length or 1))
+        contributions = bm25_idf(doc_freqs, num_units)[term_ids] * tfs * (k1 + 1) / (tfs + norms[units])
+        block_max_scores = np.nextafter(np.maximum.reduceat(contributions, block_starts).astype(np.float32)
+                                        if len(units) else np.empty(0, dtype=np.float32), np.float32(np.inf))
+        term_max_scores = np.zeros(len(terms), dtype=np.float32)
+        if len(units):
+            term_max_scores[doc_freqs > 0] = np.maximum.reduceat(block_max_scores, term_blocks[:-1][doc_freqs > 0])
+
+        gaps = np.diff(units, prepend=0)
+        gaps[term_starts[:-1][doc_freqs > 0]] = units[term_starts[:-1][doc_freqs > 0]]
+        unit_postings, unit_bytes = varint_encode(gaps)
+        tf_postings, tf_bytes = varint_encode(tfs)
+
+        encoded_terms = [term.encode('utf-8') for term in terms]
+        arrays = {
+            "term_strings": np.frombuffer(b"".join(encoded_terms), dtype=np.uint8),
+            "term_offsets": np.concatenate(([0], np.cumsum([len(term) for term in encoded_terms],
+                                                           dtype=np.int64))).astype(np.uint64),
+            "doc_freqs": doc_freqs.astype(np.uint32),
+            "term_blocks": term_blocks.astype(np.uint64),
+            "term_max_scores": term_max_scores,
+            "block_last_unit": units[np.append(block_starts[1:], len(units)) - 1].astype(np.uint32)
+            if len(units) else np.empty(0, dtype=np.uint32),
+            "block_max_scores": block_max_scores,
+            "block_unit_offsets": np.concatenate(([0], np.cumsum(np.add.reduceat(unit_bytes, block_starts))
+                                                  if len(units) else [])).astype(np.uint64),
+            "block_tf_offsets": np.concatenate(([0], np.cumsum(np.add.reduceat(tf_bytes, block_starts))
+                                                if len(units) else [])).astype(np.uint64),
+            "unit_postings": unit_postings,
+            "tf_postings": tf_postings,
+            "unit_lengths": unit_lengths.copy(),
+            "unit_docs": np.frombuffer(self.unit_docs, dtype=np.int32).copy(),
+        }
+        os.makedirs(index_dir, exist_ok=True)
+        for name, values in arrays.items():
+            np.save(os.path.join(index_dir, name + ".npy"), values)
+        meta = {"version": FORMAT_VERSION, "k1": k1, "b": b, "passages": passages, "units": num_units,
+                "terms": len(terms), "postings": int(len(units)), "block_size": BLOCK_SIZE,
+                "average_length": float(average_length)}
+        with open(os.path.join(index_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return meta
+
+
+class NativeIndex:
+    # Leitura do índice: todos os arrays ficam em mmap, só os comprimentos
+    # normalizados do BM25 (8 bytes por unidade) são calculados na abertura.
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Índice nativo inválido: versão {self.meta.get('version')}. Reconstrua o índice.")
+        for name in INDEX_ARRAYS:
+            # view(np.ndarray): continua em mmap, sem o custo da subclasse
+            # memmap em cada fatia.
+            setattr(self, name, np.load(os.path.join(index_dir, name + ".npy"), mmap_mode='r').view(np.ndarray))
+        self.index_dir = index_dir
+        self.k1 = self.meta["k1"]
+        self.b = self.meta["b"]
+        self.passages = self.meta["passages"]
+        self.num_units = self.meta["units"]
+        self.norms = self.k1 * (1 - self.b + self.b * np.asarray(self.unit_lengths, dtype=np.float64)
+                                / (self.meta["average_length"] or 1))
+        self.registry = registro.DocRegistry.for_index(index_dir)
+        self._memo = {}
+
+    def _term_bytes(self, term_id):
+        return self.term_strings[self.term_offsets[term_id]:self.term_offsets[term_id + 1]].tobytes()
+
+    def term_id(self, term):
+        # Busca binária no dicionário ordenado (bytes UTF-8, mesma ordem do
+        # sorted() usado na indexação); None se o termo não existe.
+        if term in self._memo:
+            return self._memo[term]
+        target = term.encode('utf-8')
+        low, high = 0, len(self.doc_freqs)
+        while low < high:
+            middle = (low + high) // 2
+            if self._term_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        found = low if low < len(self.doc_freqs) and self._term_bytes(low) == target else None
+        self._memo[term] = found
+        return found
+
+    def doc_frequency(self, term):
+        term_id = self.term_id(term)
+        return 0 if term_id is None else int(self.doc_freqs[term_id])
+
+    def idf(self, term_id):
+        doc_frequency = int(self.doc_freqs[term_id])
+        return math.log1p((self.num_units - doc_frequency + 0.5) / (doc_frequency + 0.5))
+
+    def term_block_range(self, term_id):
+        return int(self.term_blocks[term_id]), int(self.term_blocks[term_id + 1])
+
+    def decode_blocks(self, term_id, blocks):
+        # (unidades, tfs) dos blocos pedidos (em ordem crescente) de um termo.
+        first, last = self.term_block_range(term_id)
+        blocks = np.asarray(blocks, dtype=np.int64)
+        counts = np.minimum(BLOCK_SIZE, int(self.doc_freqs[term_id]) - (blocks - first) * BLOCK_SIZE)
+        offsets = self.block_unit_offsets
+        gaps = varint_decode(gather_ranges(self.unit_postings, offsets[blocks].astype(np.int64),
+                                           offsets[blocks + 1].astype(np.int64)))
+        tfs = varint_decode(gather_ranges(self.tf_postings, self.block_tf_offsets[blocks].astype(np.int64),
+                                          self.block_tf_offsets[blocks + 1].astype(np.int64)))
+        # A primeira lacuna de cada bloco é relativa à última unidade do bloco
+        # anterior do mesmo termo (0 no primeiro bloco).
+        bases = np.where(blocks > first, self.block_last_unit[np.maximum(blocks - 1, 0)].astype(np.int64), 0)
+        totals = np.cumsum(gaps)
+        segment_starts = np.cumsum(counts) - counts
+        before = np.where(segment_starts > 0, totals[np.maximum(segment_starts - 1, 0)], 0)
+        units = totals - np.repeat(before - bases, counts)
+        return units, tfs
+
+    def postings(self, term_id):
+        # Lista inteira: as lacunas encadeiam os blocos, basta uma soma
+        # acumulada sobre o trecho contíguo dos arrays.
+        first, last = self.term_block_range(term_id)
+        units = np.cumsum(varint_decode(self.unit_postings[self.block_unit_offsets[first]:
+                                                           self.block_unit_offsets[last]]))
+        tfs = varint_decode(self.tf_postings[self.block_tf_offsets[first]:self.block_tf_offsets[last]])
+        return units, tfs
+
+    def decode_terms(self, term_ids):
+        # Listas inteiras de vários termos de uma vez: (unidades, tfs, posição
+        # do termo em term_ids para cada posting).
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        first = self.term_blocks[term_ids].astype(np.int64)
+        last = self.term_blocks[term_ids + 1].astype(np.int64)
+        counts = self.doc_freqs[term_ids].astype(np.int64)
+        gaps = varint_decode(gather_ranges(self.unit_postings, self.block_unit_offsets[first].astype(np.int64),
+                                           self.block_unit_offsets[last].astype(np.int64)))
+        tfs = varint_decode(gather_ranges(self.tf_postings, self.block_tf_offsets[first].astype(np.int64),
+                                          self.block_tf_offsets[last].astype(np.int64)))
+        totals = np.cumsum(gaps)
+        segment_starts = np.cumsum(counts) - counts
+        before = np.where(segment_starts > 0, totals[np.maximum(segment_starts - 1, 0)], 0)
+        return totals - np.repeat(before, counts), tfs, np.repeat(np.arange(len(term_ids)), counts)
+
+    def search_exhaustive(self, weighted_terms, top_n=5, allowed_docs=None):
+        # BM25 de todos os postings dos termos da consulta em poucas operações
+        # vetorizadas (sem laço por termo).
+        term_ids = [term_id for term_id, _ in weighted_terms]
+        units, tfs, owners = self.decode_terms(term_ids)
+        if allowed_docs is not None:
+            keep = np.isin(self.unit_docs[units], allowed_docs)
+            units, tfs, owners = units[keep], tfs[keep], owners[keep]
+        factors = np.array([weight * self.idf(term_id) for term_id, weight in weighted_terms])[owners]
+        contributions = factors * tfs * (self.k1 + 1) / (tfs + self.norms[units])
+        scores = np.bincount(units, weights=contributions, minlength=self.num_units)
+        return self.top_documents(scores, np.unique(units), top_n)
+
+    def score_postings(self, term_id, weight, units, tfs):
+        return weight * self.idf(term_id) * tfs * (self.k1 + 1) / (tfs + self.norms[units])
+
+    def update_top(self, top, values, ids, top_n):
+        # O top-k só pode mudar entre os IDs antigos do top-k e os que acabaram
+        # de ganhar pontos, então o limiar (menor pontuação do top-k, 0 se
+        # ainda não há top_n) sai de um conjunto pequeno a cada termo.
+        pool = np.union1d(top, ids)
+        if len(pool) <= top_n:
+            return pool, 0.0
+        top = pool[np.argpartition(-values[pool], top_n - 1)[:top_n]]
+        return top, float(values[top].min())
+
+    def search(self, weighted_terms, top_n=5, allowed_docs=None):
+        # weighted_terms: [(term_id, peso)]; devolve o array de (doc_id, score).
+        if not weighted_terms:
+            return registro.result_array(())
+        postings = sum(int(self.doc_freqs[term_id]) for term_id, _ in weighted_terms)
+        if postings < MAXSCORE_MIN_POSTINGS * len(weighted_terms):
+            return self.search_exhaustive(weighted_terms, top_n, allowed_docs)
+        return self.search_maxscore(weighted_terms, top_n, allowed_docs)
+
+    def search_maxscore(self, weighted_terms, top_n=5, allowed_docs=None):
+        # Os termos são processados do maior para o menor limite superior
+        # (peso x máximo do termo). Quando a soma dos limites dos termos
+        # restantes fica abaixo do limiar do top-k, nenhum documento ainda não
+        # visto pode entrar no resultado (MaxScore): a partir daí só os
+        # candidatos são pontuados, e só os blocos que os contêm são
+        # descomprimidos, descartando os candidatos cujo limite (parcial +
+        # máximo do bloco + restantes) não alcança o limiar. Num índice por
+        # trechos, o top-k e o limiar são por documento (melhor trecho de
+        # cada um), como no resultado final.
+        bounds = [weight * float(self.term_max_scores[term_id]) for term_id, weight in weighted_terms]
+        order = sorted(range(len(weighted_terms)), key=lambda i: -bounds[i])
+        # Soma dos limites dos termos depois de cada posição (0 exato no fim,
+        # sem o resíduo de subtrações sucessivas).
+        remaining_after = np.append(np.cumsum([bounds[i] for i in order][::-1])[::-1][1:], 0.0)
+        total = remaining_after[0] + bounds[order[0]]
+        allowed = np.isin(self.unit_docs, allowed_docs) if allowed_docs is not None else None
+
+        scores = np.zeros(self.num_units, dtype=np.float64)
+        best = np.zeros(len(self.registry), dtype=np.float64) if self.passages else None
+        top = np.empty(0, dtype=np.int64)
+        seen = []
+        pending = []
+        candidates = None
+        threshold = 0.0
+        skipped_blocks = 0
+
+        def add_scores(term_id, weight, units, tfs, remaining):
+            # O limiar nunca passa da soma dos limites já processados; antes
+            # disso, as unidades só se acumulam em pending.
+            nonlocal top, threshold, pending
+            scores[units] += self.score_postings(term_id, weight, units, tfs)
+            pending.append(units)
+            if remaining >= total - remaining:
+                return
+            units = np.concatenate(pending) if len(pending) > 1 else pending[0]
+            pending = []
+            if best is None:
+                top, threshold = self.update_top(top, scores, units, top_n)
+            else:
+                docs = self.unit_docs[units]
+                np.maximum.at(best, docs, scores[units])
+                top, threshold = self.update_top(top, best, docs, top_n)
+
+        for position, i in enumerate(order):
+            term_id, weight = weighted_terms[i]
+            remaining = remaining_after[position]
+            first, last = self.term_block_range(term_id)
+            if candidates is None:
+                units, tfs = self.postings(term_id)
+                if allowed is not None:
+                    keep = allowed[units]
+                    units, tfs = units[keep], tfs[keep]
+                add_scores(term_id, weight, units, tfs, remaining)
+                seen.append(units)
+                if threshold > 0 and remaining < threshold:
+                    seen = np.unique(np.concatenate(seen))
+                    candidates = seen[scores[seen] + remaining >= threshold]
+                continue
+
+            block_positions = first + np.searchsorted(self.block_last_unit[first:last], candidates)
+            in_term = block_positions < last
+            bound = scores[candidates] + remaining
+            bound[in_term] += weight * self.block_max_scores[block_positions[in_term]]
+            keep = bound >= threshold
+            candidates, block_positions, in_term = candidates[keep], block_positions[keep], in_term[keep]
+            blocks = np.unique(block_positions[in_term])
+            skipped_blocks += (last - first) - len(blocks)
+            if len(blocks):
+                units, tfs = self.decode_blocks(term_id, blocks)
+                positions = np.minimum(np.searchsorted(units, candidates), len(units) - 1)
+                matched = units[positions] == candidates
+                add_scores(term_id, weight, candidates[matched], tfs[positions[matched]], remaining)
+            candidates = candidates[scores[candidates] + remaining >= threshold]
+
+        instrumentacao.count("native_skipped_blocks", skipped_blocks)
+        pool = candidates if candidates is not None else np.unique(np.concatenate(seen))
+        return self.top_documents(scores, pool, top_n)
+
+    def top_documents(self, scores, units, top_n):
+        with timer("dedupe"):
+            ranked = units[np.argsort(-scores[units], kind='stable')]
+            docs = self.unit_docs[ranked]
+            if self.passages:
+                # Fica o trecho mais bem pontuado de cada documento.
+                _, first = np.unique(docs, return_index=True)
+                first.sort()
+                ranked, docs = ranked[first], docs[first]
+            return registro.result_array(zip(docs[:top_n].tolist(), scores[ranked[:top_n]].tolist()))
+
+
+def open_index(index_dir):
+    return NativeIndex(index_dir)
+
+
+def query_tokens(query_doc, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS):
+    # Mesmo caminho de woosh_busca.query_tokens (tokens, stopwords e
+    # sinônimos), seguido da lematização usada na indexação; no Whoosh, os
+    # dois lados passam pelo StemmingAnalyzer.
+    with timer("tokenize"):
+        tokens = preprocessamento.tokenize(query_doc)
+    with timer("stopword"):
+        tokens = preprocessamento.remove_stopwords(tokens)
+    with timer("expand"):
+        expanded = []
+        for token in tokens:
+            synonyms = sinonimos.get_synonyms(token)
+            expanded.extend(synonyms if synonyms else (token,))
+    if query_mode == "truncate_or":
+        expanded = expanded[:top_k]
+    elif query_mode != "idf":
+        raise ValueError("Modo de consulta inválido. Escolha 'idf' ou 'truncate_or'.")
+    with timer("lemmatize"):
+        return [preprocessamento.lemmatize(token) for token in expanded]
+
+
+def weighted_terms(index, tokens, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS):
+    # "idf": os top_k termos por tf x idf, com peso proporcional à pontuação
+    # (como woosh_busca.build_weighted_query); "truncate_or": todos os
+    # termos, com peso igual à frequência na consulta.
+    with timer("parse"):
+        frequencies = Counter(tokens)
+        terms = [(index.term_id(term), frequency) for term, frequency in frequencies.items()]
+        terms = [(term_id, frequency) for term_id, frequency in terms if term_id is not None]
+        if query_mode == "truncate_or":
+            return terms
+        selected = heapq.nlargest(top_k, ((frequency * index.idf(term_id), term_id) for term_id, frequency in terms))
+        if not selected:
+            return []
+        max_score = selected[0][0]
+        return [(term_id, score / max_score) for score, term_id in selected]
+
+
+def lsh_candidate_ids(lsh, registry, query_doc, max_candidates=100):
+    candidates = lsh.query(preprocessamento.preprocess_text(query_doc), max_candidates)
+    return [doc_id for doc_id in (registry.id_of(path) for path, _ in candidates) if doc_id is not None]
+
+
+def run_query(index, query_doc, top_n=5, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS, lsh=None,
+              max_candidates=100):
+    # Devolve um array registro.RESULT_DTYPE de (doc_id, score).
+    allowed_docs = None
+    if lsh is not None:
+        allowed_docs = lsh_candidate_ids(lsh, index.registry, query_doc, max_candidates)
+        if not allowed_docs:
+            return registro.result_array(())
+    terms = weighted_terms(index, query_tokens(query_doc, query_mode, top_k), query_mode, top_k)
+    with timer("search"):
+        hits = index.search(terms, top_n, allowed_docs)
+    instrumentacao.count("queries")
+    return hits
+
+
+def create_index(index_dir, docs_dir, num_workers=None, chunk_size=32, lemma_cache_path=None, lsh_dir=None,
+                 lsh_params=None, stream_params=None, k1=DEFAULT_K1, b=DEFAULT_B):
+    # Mesmo pré-processamento em processos do Whoosh (woosh_Indexacao,
+    # importado aqui para que a busca não carregue o Whoosh); este processo
+    # só conta os termos e, no final, ordena e comprime as listas.
+    from woosh_Indexacao import iter_files, preprocess_in_pool, print_cache_stats
+
+    registry = registro.DocRegistry(os.path.join(index_dir, registro.REGISTRY_FILE))
+    builder = IndexBuilder()
+    lsh = minhash.MinHashLSH(**(lsh_params or {})) if lsh_dir else None
+    total_preprocess_time = 0
+    total_indexing_time = 0
+    doc_count = 0
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.load(lemma_cache_path)
+
+    for processed, batch_metrics, cache_delta, signatures, _ in preprocess_in_pool(
+            iter_files(docs_dir), num_workers, chunk_size, lemma_cache_path, lsh.params() if lsh else None,
+            stream_params):
+        instrumentacao.merge(batch_metrics)
+        total_preprocess_time += instrumentacao.stage_total(batch_metrics, *PREPROCESS_STAGES)
+        doc_count += batch_metrics["counters"].get("documents", 0)
+        preprocessamento.lemma_cache.update(cache_delta["entries"])
+        start_indexing = time.perf_counter()
+        with timer("index"):
+            for file_path, passage, processed_content in processed:
+                builder.add(registry.register(file_path), processed_content.split())
+        total_indexing_time += time.perf_counter() - start_indexing
+        for file_path, band_hashes in signatures:
+            lsh.add(file_path, band_hashes)
+
+    start_merge = time.perf_counter()
+    with timer("merge"):
+        meta = builder.save(index_dir, bool((stream_params or {}).get("passage_size")), k1, b)
+    total_indexing_time += time.perf_counter() - start_merge
+    registry.save()
+    if lsh:
+        lsh.save(lsh_dir)
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.save(lemma_cache_path)
+    print_cache_stats(preprocessamento.cache_stats())
+    print(f"Termos: {meta['terms']}, postings: {meta['postings']}, unidades: {meta['units']}")
+    return total_preprocess_time, total_indexing_time, doc_count
+
+
+# Cada processo de trabalho abre o índice uma vez (arrays em mmap).
+worker_index = None
+worker_lsh = None
+
+
+def init_search_worker(index_dir, lsh_dir=None):
+    global worker_index, worker_lsh
+    instrumentacao.metrics.reset()
+    worker_index = open_index(index_dir)
+    worker_lsh = minhash.MinHashLSH.load(lsh_dir) if lsh_dir else None
+
+
+def search_file(doc_path, top_n=5, query_mode=DEFAULT_QUERY_MODE):
+    # Mesma tupla de woosh_busca.search_file: (arquivo, array de
+    # (doc_id, score), tempo, erro).
+    start_time = time.time()
+    try:
+        with open(doc_path, "r", encoding="utf-8") as f:
+            with timer("read"):
+                query_doc = f.read()
+        hits = run_query(worker_index, query_doc, top_n, query_mode, lsh=worker_lsh)
+        error = None
+    except Exception as e:
+        hits = registro.result_array(())
+        error = str(e)
+    return doc_path, hits, time.time() - start_time, error
+
+
+def search_file_in_worker(doc_path, top_n=5, query_mode=DEFAULT_QUERY_MODE):
+    return search_file(doc_path, top_n, query_mode), instrumentacao.drain()
+
+
+def search_documents_batch(index_dir, doc_paths, top_n=5, num_workers=None, query_mode=DEFAULT_QUERY_MODE,
+                           lsh_dir=None):
+    # Gerador, como woosh_busca.search_documents_batch.
+    num_workers = num_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=init_search_worker,
+                             initargs=(index_dir, lsh_dir)) as executor:
+        futures = [executor.submit(search_file_in_worker, doc_path, top_n, query_mode) for doc_path in doc_paths]
+        for future in as_completed(futures):
+            result, worker_metrics = future.result()
+            instrumentacao.merge(worker_metrics)
+            yield result
+
+
+def main_indexacao(index_dir, docs_dir, streaming=False, lsh_dir=None, lemma_cache_path=None):
+    stream_params = preprocessamento.STREAMING_PARAMS if streaming else None
+    print("Iniciando a indexação nativa...")
+    total_preprocess_time, total_indexing_time, doc_count = create_index(index_dir, docs_dir,
+                                                                       lemma_cache_path=lemma_cache_path,
+                                                                       lsh_dir=lsh_dir, stream_params=stream_params)
+    avg_preprocess_time = total_preprocess_time / doc_count if doc_count > 0 else 0
+    avg_indexing_time = total_indexing_time / doc_count if doc_count > 0 else 0
+    print(f"Documentos processados: {doc_count}")
+    print(f"Tempo médio de pré-processamento por documento: {avg_preprocess_time:.4f} segundos")
+    print(f"Tempo médio de indexação por documento: {avg_indexing_time:.4f} segundos")
+
+
+def main_busca(index_dir, doc_paths, top_n=5, query_mode=DEFAULT_QUERY_MODE, lsh_dir=None):
+    registry = registro.DocRegistry.for_index(index_dir)
+    for doc_path, hits, elapsed, error in search_documents_batch(index_dir, doc_paths, top_n, query_mode=query_mode,
+                                                                 lsh_dir=lsh_dir):
+        print(f"\nBusca para o arquivo {doc_path} concluída em {elapsed:.4f} segundos")
+        if error:
+            print(f"Erro ao processar {doc_path}: {error}")
+        for doc_id, score in hits:
+            print(f"Documento: {registry.path_of(doc_id)}, Similaridade: {score}")
+
+
+def main_consulta(query_path, index_dir, top_n=5, query_mode=DEFAULT_QUERY_MODE, lsh_dir=None):
+    init_search_worker(index_dir, lsh_dir)
+    doc_path, hits, elapsed, error = search_file(query_path, top_n, query_mode)
+    if error:
+        print(f"Erro ao processar {doc_path}: {error}")
+    for doc_id, score in hits:
+        print(f"Documento: {worker_index.registry.path_of(doc_id)}, Similaridade: {score}")
+    print(f"Busca concluída em {elapsed:.4f} segundos")
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Motor de busca nativo (índice invertido em arrays NumPy).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    indexar = subparsers.add_parser("indexar", help="constrói o índice a partir de um diretório de documentos")
+    indexar.add_argument("docs", help="diretório dos documentos-fonte")
+    indexar.add_argument("--index", default=os.path.join(os.getcwd(), "index-nativo"), help="diretório do índice")
+    indexar.add_argument("--streaming", action="store_true", help="lê em blocos e indexa trechos sobrepostos")
+    indexar.add_argument("--lsh", default=None, help="também gera o índice MinHash/LSH neste diretório")
+    indexar.add_argument("--lemma-cache", default=None, help="arquivo do cache de lemas")
+    buscar = subparsers.add_parser("buscar", help="busca um ou mais arquivos de consulta")
+    buscar.add_argument("consultas", nargs="+", help="arquivos de texto usados como consulta")
+    buscar.add_argument("--index", default=os.path.join(os.getcwd(), "index-nativo"), help="diretório do índice")
+    buscar.add_argument("--top", type=int, default=5, help="número de documentos devolvidos")
+    buscar.add_argument("--mode", choices=QUERY_MODES, default=DEFAULT_QUERY_MODE,
+                        help="seleção dos termos da consulta")
+    buscar.add_argument("--lsh", default=None, help="diretório do índice MinHash/LSH (opcional)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "indexar":
+        with instrumentacao.session("nativo_indexacao"):
+            main_indexacao(args.index, args.docs, args.streaming, args.lsh, args.lemma_cache)
+        sys.exit(0)
+    with instrumentacao.session("nativo_busca"):
+        if len(args.consultas) == 1:
+            # Uma consulta só: no próprio processo, sem pool.
+            main_consulta(args.consultas[0], args.index, args.top, args.mode, args.lsh)
+        else:
+            main_busca(args.index, args.consultas, args.top, args.mode, args.lsh)
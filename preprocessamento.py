@@ -0,0 +1,369 @@
+import functools
+import io
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+import instrumentacao
+from instrumentacao import timer
+
+
+DEFAULT_CACHE_SIZE = 200000
+# Tamanho, em caracteres, dos blocos lidos na leitura em fluxo.
+DEFAULT_READ_CHUNK_SIZE = 1024 * 1024
+# Leitura em fluxo com trechos de 1000 tokens. A sobreposição cobre um trecho
+# inteiro do MinHash (passage_size=100), então nenhuma janela do LSH se perde
+# na divisão.
+STREAMING_PARAMS = {
+    "read_chunk_size": DEFAULT_READ_CHUNK_SIZE,
+    "passage_size": 1000,
+    "passage_overlap": 100,
+}
+# Incrementar sempre que a saída de algum tokenizador mudar.
+TOKENIZER_VERSION = 2
+
+NON_ALPHA = re.compile(r'[^a-z\s]')
+
+# Contrações sem apóstrofo que o word_tokenize do NLTK separa em duas partes
+# (MacIntyreContractions.CONTRACTIONS2); as demais exigem apóstrofo.
+CONTRACTIONS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+# Recursos do NLTK usados pelo projeto (ver download_resources).
+NLTK_RESOURCES = ('punkt', 'stopwords', 'wordnet')
+
+# O NLTK só é importado no primeiro uso: o import sozinho leva mais de um
+# segundo, o que domina uma consulta isolada.
+lemmatizer = None
+english_stop_words = None
+
+
+def get_lemmatizer():
+    global lemmatizer
+    if lemmatizer is None:
+        from nltk.stem import WordNetLemmatizer
+        lemmatizer = WordNetLemmatizer()
+    return lemmatizer
+
+
+def nltk_data_dirs():
+    # Mesmos diretórios padrão de nltk.data.path, calculados sem importar o NLTK.
+    dirs = [data_dir for data_dir in os.environ.get("NLTK_DATA", "").split(os.pathsep) if data_dir]
+    dirs.append(os.path.join(os.path.expanduser("~"), "nltk_data"))
+    dirs += [os.path.join(sys.prefix, "nltk_data"), os.path.join(sys.prefix, "share", "nltk_data"),
+             os.path.join(sys.prefix, "lib", "nltk_data")]
+    if sys.platform.startswith("win"):
+        dirs += [os.path.join(os.environ.get("APPDATA", "C:\\"), "nltk_data"),
+                 r"C:\nltk_data", r"D:\nltk_data", r"E:\nltk_data"]
+    else:
+        dirs += ["/usr/share/nltk_data", "/usr/local/share/nltk_data",
+                 "/usr/lib/nltk_data", "/usr/local/lib/nltk_data"]
+    return dirs
+
+
+def load_stop_words(language='english'):
+    # Lê a lista de stopwords direto do arquivo do corpus. Se ela só existir
+    # compactada (.zip) ou em outro lugar, o NLTK faz a busca.
+    for data_dir in nltk_data_dirs():
+        path = os.path.join(data_dir, "corpora", "stopwords", language)
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return frozenset(line.strip() for line in f if line.strip())
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words(language))
+
+
+def get_stop_words():
+    global english_stop_words
+    if english_stop_words is None:
+        english_stop_words = load_stop_words()
+    return english_stop_words
+
+
+def download_resources():
+    # Antes feito no import de woosh_busca; agora é um passo de instalação:
+    # python preprocessamento.py --download
+    import nltk
+    for resource in NLTK_RESOURCES:
+        nltk.download(resource)
+
+
+class LemmaCache:
+    # Cache LRU de lemas por forma de superfície. Como o corpus segue a lei de
+    # Zipf, poucas milhares de palavras respondem pela maioria das chamadas.
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._new_entries = {}
+        self._lock = threading.Lock()
+
+    def lemmatize(self, word):
+        with self._lock:
+            lemma = self._entries.get(word)
+            if lemma is not None:
+                self._entries.move_to_end(word)
+                self.hits += 1
+                return lemma
+            self.misses += 1
+
+        lemma = get_lemmatizer().lemmatize(word)
+
+        with self._lock:
+            self._store(word, lemma)
+            self._new_entries[word] = lemma
+        return lemma
+
+    def _store(self, word, lemma):
+        self._entries[word] = lemma
+        self._entries.move_to_end(word)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def update(self, entries):
+        with self._lock:
+            for word, lemma in entries.items():
+                self._store(word, lemma)
+
+    def drain_new_entries(self):
+        # Lemas calculados desde a última chamada, para que um processo de
+        # trabalho possa devolvê-los ao processo principal.
+        with self._lock:
+            new_entries, self._new_entries = self._new_entries, {}
+        return new_entries
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def save(self, path):
+        with self._lock:
+            entries = dict(self._entries)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        self.update(entries)
+        return len(entries)
+
+
+lemma_cache = LemmaCache()
+
+
+def lemmatize(word):
+    return lemma_cache.lemmatize(word)
+
+
+def remove_stopwords(tokens):
+    stop_words = get_stop_words()
+    return [word for word in tokens if word not in stop_words]
+
+
+def simple_tokens(text):
+    return NON_ALPHA.sub('', text.lower()).split()
+
+
+def split_contractions(tokens):
+    result = []
+    for token in tokens:
+        parts = CONTRACTIONS.get(token)
+        if parts is None:
+            result.append(token)
+        else:
+            result.extend(parts)
+    return result
+
+
+def tokenize(text):
+    # Mesmos tokens que word_tokenize(re.sub(r'[^a-z\s]', '', text.lower())):
+    # sem pontuação, o word_tokenize só separa as contrações de CONTRACTIONS.
+    tokens = simple_tokens(text)
+    return split_contractions(tokens)
+
+
+# Trechos com pontuação que já passaram pelo word_tokenize. Como o corpus segue
+# a lei de Zipf, "the," e "it." se repetem o tempo todo.
+TREEBANK_CACHE_SIZE = 100000
+TRAILING_PUNCTUATION = frozenset(".,;:!?")
+
+
+def tokenize_alnum(text, stop_words=None):
+    # Equivale a [w for w in word_tokenize(text.lower()) if w.isalnum()]. As
+    # frases vêm do sent_tokenize do NLTK (o mesmo Punkt do word_tokenize) e a
+    # maioria dos trechos separados por espaço já é alfanumérica; só os demais
+    # passam pelo word_tokenize, um trecho por vez e com cache.
+    with timer("tokenize"):
+        tokens = tokenize_alnum_chunks(text)
+    if stop_words is not None:
+        with timer("stopword"):
+            tokens = [token for token in tokens if token not in stop_words]
+    return tokens
+
+
+@functools.lru_cache(maxsize=TREEBANK_CACHE_SIZE)
+def treebank_parts(chunk):
+    # preserve_line=True: só o tokenizador Treebank, sem dividir frases.
+    from nltk.tokenize import word_tokenize
+    return tuple(word_tokenize(chunk, preserve_line=True))
+
+
+def tokenize_alnum_chunks(text):
+    from nltk.tokenize import sent_tokenize
+
+    tokens = []
+    for sentence in sent_tokenize(text.lower()):
+        chunks = sentence.split()
+        last = len(chunks) - 1
+        for i, chunk in enumerate(chunks):
+            # O Treebank só separa o ponto final da frase; no meio dela ("mr.",
+            # "3.") o ponto fica unido à palavra e o isalnum descarta os dois.
+            period_inside = chunk[-1] == "." and i < last
+            if chunk[-1] in TRAILING_PUNCTUATION and chunk[:-1].isalnum():
+                if period_inside:
+                    continue
+                # "palavra." ou "palavra,": o Treebank só separa a pontuação.
+                chunk = chunk[:-1]
+            if chunk.isalnum():
+                parts = CONTRACTIONS.get(chunk)
+                if parts is None:
+                    tokens.append(chunk)
+                else:
+                    tokens.extend(parts)
+                continue
+            parts = treebank_parts(chunk)
+            if period_inside and len(parts) > 1 and parts[-1] == ".":
+                # O ponto só foi separado porque o trecho acabou.
+                parts = parts[:-2]
+            tokens.extend(token for token in parts if token.isalnum())
+    return tokens
+
+
+def preprocess_text(text):
+    with timer("tokenize"):
+        words = simple_tokens(text)
+    stop_words = get_stop_words()
+    with timer("stopword"):
+        words = [word for word in words if word not in stop_words]
+    with timer("lemmatize"):
+        return [lemmatize(word) for word in words]
+
+
+class HashingReader(io.RawIOBase):
+    # Arquivo binário que passa cada bloco lido por digest (hashlib): o hash
+    # do arquivo sai da mesma leitura usada para tokenizá-lo.
+
+    def __init__(self, raw, digest):
+        self.raw = raw
+        self.digest = digest
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = self.raw.readinto(buffer)
+        if size:
+            self.digest.update(memoryview(buffer)[:size])
+        return size
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def open_text(file_path, digest=None):
+    # O mesmo que open(file_path, 'r', encoding='utf-8', errors='ignore');
+    # com digest, os bytes lidos também entram no hash.
+    if digest is None:
+        return open(file_path, 'r', encoding='utf-8', errors='ignore')
+    return io.TextIOWrapper(io.BufferedReader(HashingReader(open(file_path, 'rb', buffering=0), digest)),
+                            encoding='utf-8', errors='ignore')
+
+
+def iter_text_chunks(file_path, chunk_size=DEFAULT_READ_CHUNK_SIZE, digest=None):
+    # Lê o arquivo em blocos de chunk_size caracteres. Cada bloco é cortado no
+    # último espaço em branco e o resto segue para o bloco seguinte, então
+    # nenhuma palavra é partida ao meio. Um bloco sem espaço algum é devolvido
+    # inteiro, para que a memória continue limitada.
+    remainder = ""
+    with open_text(file_path, digest) as f:
+        while True:
+            with timer("read"):
+                block = f.read(chunk_size)
+            if not block:
+                break
+            block = remainder + block
+            cut = len(block)
+            while cut > 0 and not block[cut - 1].isspace():
+                cut -= 1
+            if cut == 0:
+                remainder = ""
+                yield block
+            else:
+                remainder = block[cut:]
+                yield block[:cut]
+    if remainder:
+        yield remainder
+
+
+def stream_tokens(file_path, chunk_size=DEFAULT_READ_CHUNK_SIZE, preprocess=preprocess_text, digest=None):
+    # Mesmos tokens que preprocess(arquivo inteiro), sem manter o texto
+    # completo (nem suas cópias intermediárias) na memória.
+    for block in iter_text_chunks(file_path, chunk_size, digest):
+        yield from preprocess(block)
+
+
+def iter_passages(tokens, passage_size, overlap=0):
+    # Agrupa um fluxo de tokens em trechos de passage_size tokens; trechos
+    # vizinhos compartilham overlap tokens.
+    if not 0 <= overlap < passage_size:
+        raise ValueError("overlap inválido. Escolha um valor entre 0 e passage_size - 1.")
+    passage = []
+    pending = False
+    for token in tokens:
+        passage.append(token)
+        pending = True
+        if len(passage) == passage_size:
+            yield passage
+            passage = passage[passage_size - overlap:]
+            pending = False
+    if pending:
+        yield passage
+
+
+def cache_stats():
+    return lemma_cache.stats()
+
+
+def init_worker(cache_path=None):
+    # Inicializador para ProcessPoolExecutor: pré-carrega o cache persistido.
+    # Com fork, o filho herda as medições do pai; elas já foram contadas lá.
+    instrumentacao.metrics.reset()
+    if cache_path:
+        lemma_cache.load(cache_path)
+
+
+if __name__ == "__main__":
+    if "--download" in sys.argv:
+        download_resources()
@@ -0,0 +1,127 @@
+import os
+import threading
+import numpy as np
+
+
+REGISTRY_FILE = "docs.registry"
+# Presente no diretório de um índice mantido em shards (woosh_Indexacao com
+# combine_shards=False); fica aqui para que a busca o reconheça sem importar
+# o módulo de indexação.
+SHARDS_MANIFEST = "shards.json"
+MAGIC = b"DOCREG01"
+HEADER_SIZE = 16
+
+# Resultado de uma consulta: IDs e pontuações em arrays tipados (8 bytes por
+# documento), em vez de uma lista de dicts com o caminho completo.
+RESULT_DTYPE = np.dtype([("doc_id", "<i4"), ("score", "<f4")])
+
+
+class DocRegistry:
+    # Mapeia IDs inteiros (0..n-1, na ordem de registro) para caminhos de
+    # arquivo. Em disco é um arquivo só: cabeçalho (MAGIC + n), n + 1 offsets
+    # uint64 e os caminhos em UTF-8 concatenados. Na leitura, offsets e bytes
+    # ficam em mmap; o dicionário caminho -> ID só é montado se algo for
+    # registrado ou procurado pelo caminho.
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.offsets = np.zeros(1, dtype="<u8")
+        self.blob = np.zeros(0, dtype=np.uint8)
+        self.stored_count = 0
+        self.new_paths = []
+        self.ids = None
+
+    @classmethod
+    def load(cls, path):
+        registry = cls(path)
+        if not os.path.exists(path):
+            return registry
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(raw[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"Registro de documentos inválido: {path}")
+        count = int(raw[len(MAGIC):HEADER_SIZE].view("<u8")[0])
+        blob_start = HEADER_SIZE + 8 * (count + 1)
+        registry.offsets = raw[HEADER_SIZE:blob_start].view("<u8")
+        registry.blob = raw[blob_start:]
+        registry.stored_count = count
+        return registry
+
+    @classmethod
+    def for_index(cls, index_dir):
+        return cls.load(os.path.join(index_dir, REGISTRY_FILE))
+
+    def __len__(self):
+        return self.stored_count + len(self.new_paths)
+
+    def path_of(self, doc_id):
+        doc_id = int(doc_id)
+        if doc_id < self.stored_count:
+            return bytes(self.blob[self.offsets[doc_id]:self.offsets[doc_id + 1]]).decode('utf-8')
+        return self.new_paths[doc_id - self.stored_count]
+
+    def paths(self, doc_ids):
+        return [self.path_of(doc_id) for doc_id in doc_ids]
+
+    def build_ids(self):
+        if self.ids is None:
+            self.ids = {self.path_of(doc_id): doc_id for doc_id in range(len(self))}
+        return self.ids
+
+    def id_of(self, path):
+        # None se o caminho não foi registrado.
+        return self.build_ids().get(path)
+
+    def register(self, path):
+        # Devolve o ID do caminho, criando um novo se preciso. Seguro entre
+        # threads; os processos de trabalho não registram (o principal sim).
+        with self.lock:
+            ids = self.build_ids()
+            doc_id = ids.get(path)
+            if doc_id is None:
+                doc_id = ids[path] = len(self)
+                self.new_paths.append(path)
+            return doc_id
+
+    def save(self, path=None):
+        path = path or self.path
+        encoded = [bytes(self.blob[self.offsets[0]:self.offsets[-1]])]
+        encoded.extend(new_path.encode('utf-8') for new_path in self.new_paths)
+        lengths = [len(self.blob)] + [len(item) for item in encoded[1:]]
+        offsets = np.concatenate((np.asarray(self.offsets, dtype="<u8"),
+                                  self.offsets[-1] + np.cumsum(lengths[1:], dtype="<u8")))
+        count = len(offsets) - 1
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.array([count], dtype="<u8").tobytes())
+            f.write(offsets.astype("<u8").tobytes())
+            for item in encoded:
+                f.write(item)
+        # Solta o mmap antes de substituir o arquivo (exigido no Windows).
+        self.offsets = offsets
+        self.blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        self.stored_count = count
+        self.new_paths = []
+        os.replace(tmp_path, path)
+        self.path = path
+        return path
+
+
+def result_array(pairs):
+    # [(doc_id, score), ...] -> array com RESULT_DTYPE.
+    return np.array(list(pairs), dtype=RESULT_DTYPE)
+
+
+def top_results(results, top_n):
+    # Junta arrays de resultados e mantém os top_n por pontuação.
+    merged = np.concatenate(results) if results else np.empty(0, dtype=RESULT_DTYPE)
+    if len(merged) > top_n:
+        merged = merged[np.argpartition(-merged["score"], top_n - 1)[:top_n]]
+    return merged[np.argsort(-merged["score"], kind='stable')]
+
+
+def retrieved_documents(registry, results):
+    # Formato usado por avaliacao.evaluate e pelas saídas JSON.
+    return [{"filename": os.path.basename(registry.path_of(doc_id)), "score": float(score)}
+            for doc_id, score in results]
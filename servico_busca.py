@@ -0,0 +1,435 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from whoosh.index import open_dir
+import preprocessamento
+import sinonimos
+import minhash
+import instrumentacao
+import woosh_busca
+import elasticsearch_busca
+import registro
+
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 4096
+# Validade das entradas do cache. O Whoosh já entra na chave pela geração do
+# índice; o TTL cobre o Elasticsearch, cujo índice pode mudar sem aviso.
+DEFAULT_CACHE_TTL = 300
+# Intervalo mínimo entre verificações de mudança no índice Whoosh.
+REFRESH_INTERVAL = 1.0
+LATENCY_WINDOW = 1000
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class ResultCache:
+    # Cache LRU de resultados indexado pelos termos normalizados da consulta,
+    # e não pelo texto bruto: textos que geram os mesmos termos reaproveitam
+    # o resultado.
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or now - entry[1] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+class RequestMetrics:
+    # Contadores e latências por motor de busca; os percentis usam as últimas
+    # LATENCY_WINDOW requisições.
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.counts = Counter()
+        self.latencies = {}
+        self.window = window
+        self._lock = threading.Lock()
+
+    def record(self, engine, elapsed, cache_hit=False, error=False):
+        with self._lock:
+            self.counts[(engine, "requests")] += 1
+            if error:
+                self.counts[(engine, "errors")] += 1
+            elif cache_hit:
+                self.counts[(engine, "cache_hits")] += 1
+            self.latencies.setdefault(engine, deque(maxlen=self.window)).append(elapsed)
+
+    def summary(self):
+        with self._lock:
+            engines = {}
+            for engine, latencies in self.latencies.items():
+                values = np.array(latencies) * 1000
+                engines[engine] = {
+                    "requests": self.counts[(engine, "requests")],
+                    "errors": self.counts[(engine, "errors")],
+                    "cache_hits": self.counts[(engine, "cache_hits")],
+                    "mean_ms": float(values.mean()),
+                    "p50_ms": float(np.percentile(values, 50)),
+                    "p95_ms": float(np.percentile(values, 95)),
+                    "p99_ms": float(np.percentile(values, 99)),
+                }
+        return engines
+
+
+class WhooshSearchers:
+    # Um searcher aberto por thread de trabalho, reaproveitado entre as
+    # requisições. No máximo uma vez por REFRESH_INTERVAL, searcher.refresh()
+    # troca o searcher por um novo se o índice mudou. O registro de
+    # documentos (IDs -> caminhos) é recarregado quando o arquivo muda.
+    # Um índice mantido em shards passa por woosh_busca.ShardedIndex: cada
+    # consulta é repartida entre os shards num pool de processos, com as
+    # estatísticas globais. Os readers dos shards não são renovados; depois
+    # de reconstruir os shards, reinicie o serviço.
+
+    def __init__(self, index_dir, num_workers=None):
+        self.sharded = None
+        if woosh_busca.is_sharded(index_dir):
+            self.ix = None
+            self.sharded = woosh_busca.ShardedIndex(index_dir)
+            self.shard_pool = woosh_busca.open_shard_pool(self.sharded, num_workers)
+            self.query_parser = woosh_busca.content_query_parser(self.sharded.schema)
+        else:
+            self.ix = open_dir(index_dir)
+            self.query_parser = woosh_busca.content_query_parser(self.ix.schema)
+        self.refreshes = 0
+        self._local = threading.local()
+        self.registry_path = os.path.join(index_dir, registro.REGISTRY_FILE)
+        self._registry = None
+        self._registry_mtime = None
+        self._registry_lock = threading.Lock()
+
+    def registry(self):
+        mtime = os.path.getmtime(self.registry_path)
+        with self._registry_lock:
+            if mtime != self._registry_mtime:
+                self._registry = registro.DocRegistry.load(self.registry_path)
+                self._registry_mtime = mtime
+            return self._registry
+
+    def searcher(self):
+        local = self._local
+        now = time.monotonic()
+        if getattr(local, "searcher", None) is None:
+            local.searcher = self.ix.searcher()
+            local.checked = now
+        elif now - local.checked >= REFRESH_INTERVAL:
+            local.checked = now
+            searcher = local.searcher.refresh()
+            if searcher is not local.searcher:
+                local.searcher = searcher
+                self.refreshes += 1
+        return local.searcher
+
+    def generation(self, searcher):
+        if self.sharded is not None:
+            return tuple(reader.generation() for reader in self.sharded.readers)
+        return searcher.reader().generation()
+
+    def search(self, searcher, tokens, top_n, query_mode, top_k, search_filter=None):
+        # [(doc_id, score)], com ou sem shards.
+        if self.sharded is not None:
+            hits = woosh_busca.search_sharded_tokens(self.sharded, self.shard_pool, self.query_parser, tokens,
+                                                     top_n, query_mode, top_k, search_filter)
+            return [(int(doc_id), float(score)) for doc_id, score in hits]
+        hits = woosh_busca.search_tokens(searcher, self.query_parser, tokens, top_n, query_mode, top_k,
+                                         search_filter)
+        return [(hit['doc_id'], hit.score) for hit in hits]
+
+    def warm_up(self):
+        # Os processos dos shards sobem antes das threads do serviço.
+        if self.sharded is not None:
+            self.shard_pool.submit(os.getpid).result()
+
+    def close(self):
+        if self.sharded is not None:
+            self.shard_pool.shutdown(wait=False)
+            self.sharded.close()
+
+
+class SearchService:
+
+    def __init__(self, index_dir=None, es_index=None, lsh_dir=None, cache_size=DEFAULT_CACHE_SIZE,
+                 cache_ttl=DEFAULT_CACHE_TTL, num_workers=4):
+        self.whoosh = WhooshSearchers(index_dir) if index_dir else None
+        self.es_index = es_index
+        self.lsh_dir = lsh_dir
+        self.lsh = minhash.MinHashLSH.load(lsh_dir) if lsh_dir else None
+        self.cache = ResultCache(cache_size, cache_ttl)
+        self.metrics = RequestMetrics()
+        self.executor = ThreadPoolExecutor(max_workers=num_workers)
+        self.started = time.time()
+
+    def warm_up(self):
+        # Stopwords, tabela de sinônimos (ou WordNet) e cliente do
+        # Elasticsearch são carregados antes da primeira requisição. O
+        # cliente mantém um pool de conexões compartilhado pelas threads.
+        preprocessamento.get_stop_words()
+        sinonimos.get_synonyms("search")
+        if self.whoosh:
+            self.whoosh.warm_up()
+        if self.es_index:
+            elasticsearch_busca.get_es()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.whoosh:
+            self.whoosh.close()
+
+    def search_whoosh(self, text, request):
+        if self.whoosh is None:
+            raise ValueError("Índice Whoosh inválido. Inicie o serviço com --index.")
+        top_n = int(request.get("top_n", 5))
+        query_mode = request.get("mode", woosh_busca.DEFAULT_QUERY_MODE)
+        top_k = int(request.get("top_k", woosh_busca.DEFAULT_QUERY_TERMS))
+
+        candidates = None
+        if self.lsh is not None and request.get("lsh", True):
+            candidates = woosh_busca.lsh_candidates(self.lsh, text)
+            if not candidates:
+                return [], False
+
+        searcher = self.whoosh.searcher() if self.whoosh.sharded is None else None
+        tokens = woosh_busca.query_tokens(text, query_mode, top_k)
+        key = ("whoosh", self.whoosh.generation(searcher), query_mode, top_n, top_k,
+               tuple(sorted(Counter(tokens).items())),
+               tuple(sorted(candidates)) if candidates is not None else None)
+        results = self.cache.get(key)
+        if results is not None:
+            return results, True
+
+        registry = self.whoosh.registry()
+        search_filter = woosh_busca.candidate_ids_filter(registry, candidates) if candidates else None
+        if candidates and search_filter is None:
+            return [], False
+        hits = self.whoosh.search(searcher, tokens, top_n, query_mode, top_k, search_filter)
+        results = [{"filename": registry.path_of(doc_id), "score": score} for doc_id, score in hits]
+        self.cache.put(key, results)
+        return results, False
+
+    def search_elasticsearch(self, text, request):
+        index_name = request.get("index", self.es_index)
+        if not index_name:
+            raise ValueError("Índice do Elasticsearch inválido. Informe 'index' ou inicie com --es-index.")
+        approach = int(request.get("approach", 6))
+        top_n_terms = int(request.get("top_n_terms", 10))
+        size = int(request.get("top_n", 10))
+
+        candidates = None
+        if self.lsh_dir and request.get("lsh", True):
+            candidates = elasticsearch_busca.find_candidates(text, self.lsh_dir)
+            if not candidates:
+                return [], False
+
+        terms = elasticsearch_busca.query_terms(text, approach, top_n_terms, bool(request.get("lemmatize", False)))
+        key = ("elasticsearch", index_name, size, tuple(sorted(terms)),
+               tuple(sorted(candidates)) if candidates is not None else None)
+        results = self.cache.get(key)
+        if results is not None:
+            return results, True
+
+        body = elasticsearch_busca.build_query_body(terms, size, candidates,
+                                                    elasticsearch_busca.filename_field(index_name))
+        response = elasticsearch_busca.get_es().options(request_timeout=100).search(index=index_name, body=body)
+        results = elasticsearch_busca.parse_hits(response)
+        self.cache.put(key, results)
+        return results, False
+
+    def handle_search(self, request):
+        # Corpo da requisição: {"text": ...} ou {"path": ...}, mais "engine"
+        # ("whoosh" ou "elasticsearch") e os parâmetros de cada motor.
+        start_time = time.perf_counter()
+        engine = request.get("engine", "whoosh")
+        if engine not in ("whoosh", "elasticsearch"):
+            raise ValueError("Motor de busca inválido. Escolha 'whoosh' ou 'elasticsearch'.")
+        try:
+            text = request.get("text")
+            if text is None:
+                with open(request["path"], 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read()
+            if engine == "whoosh":
+                results, cache_hit = self.search_whoosh(text, request)
+            else:
+                results, cache_hit = self.search_elasticsearch(text, request)
+        except Exception:
+            self.metrics.record(engine, time.perf_counter() - start_time, error=True)
+            raise
+        elapsed = time.perf_counter() - start_time
+        self.metrics.record(engine, elapsed, cache_hit)
+        return {"results": results, "cache": "hit" if cache_hit else "miss", "took_ms": elapsed * 1000}
+
+    def snapshot(self):
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "engines": self.metrics.summary(),
+            "cache": self.cache.stats(),
+            "whoosh_refreshes": self.whoosh.refreshes if self.whoosh else 0,
+            "stages": instrumentacao.summarize(instrumentacao.snapshot())[0],
+        }
+
+
+async def dispatch(service, method, target, body):
+    path = target.split("?", 1)[0]
+    if method == "GET" and path == "/metrics":
+        return 200, service.snapshot()
+    if method == "GET" and path == "/health":
+        return 200, {"status": "ok"}
+    if method != "POST" or path != "/search":
+        return 404, {"error": f"Rota inválida: {method} {path}. Use POST /search ou GET /metrics."}
+
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError as e:
+        return 400, {"error": f"JSON inválido: {e}"}
+    loop = asyncio.get_running_loop()
+    try:
+        # A busca bloqueia (CPU e E/S), então roda nas threads de trabalho.
+        return 200, await loop.run_in_executor(service.executor, service.handle_search, request)
+    except (ValueError, KeyError, OSError) as e:
+        return 400, {"error": str(e)}
+    except Exception as e:
+        return 500, {"error": str(e)}
+
+
+async def handle_connection(service, reader, writer):
+    # HTTP/1.1 mínimo com keep-alive: um cliente interativo reaproveita a
+    # conexão entre consultas.
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode('latin-1').partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": f"Corpo maior que {MAX_BODY_BYTES} bytes."}
+                keep_alive = False
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await dispatch(service, method, target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+            writer.write(head.encode('latin-1') + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    except asyncio.CancelledError:
+        # Encerramento do serviço (stop_server). Terminar normalmente evita o
+        # erro do Python 3.11 ao consultar a exceção de uma tarefa cancelada.
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None):
+    def handler(reader, writer):
+        return handle_connection(service, reader, writer)
+
+    if unix_path:
+        return await asyncio.start_unix_server(handler, path=unix_path)
+    return await asyncio.start_server(handler, host, port)
+
+
+async def stop_server(server):
+    # Fecha o servidor e encerra as conexões ainda abertas.
+    server.close()
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def serve(service, host, port, unix_path=None):
+    server = await start_server(service, host, port, unix_path)
+    address = unix_path or f"http://{host}:{port}"
+    print(f"Serviço de busca ouvindo em {address} (POST /search, GET /metrics)")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço de busca persistente para o Whoosh e o Elasticsearch")
+    parser.add_argument("--index", default=None, help="diretório do índice Whoosh")
+    parser.add_argument("--es-index", default=None, help="nome do índice no Elasticsearch")
+    parser.add_argument("--lsh", default=None, help="diretório do índice MinHash/LSH (opcional)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, help="caminho de um socket Unix, no lugar de host e porta")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="0 desativa o cache")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL, help="validade do cache em segundos")
+    parser.add_argument("--workers", type=int, default=4, help="threads de busca")
+    return parser.parse_args(argv)
+
+
+def main_servico(argv=None):
+    args = parse_args(argv)
+    if not args.index and not args.es_index:
+        args.index = os.path.join(os.getcwd(), "index")
+    service = SearchService(args.index, args.es_index, args.lsh, args.cache_size, args.cache_ttl, args.workers)
+    service.warm_up()
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("Serviço encerrado.")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main_servico()
@@ -0,0 +1,245 @@
+import json
+import os
+import sys
+import time
+
+
+DEFAULT_MAX_SYNONYMS = 20
+# As tabelas ficam ao lado do módulo, e não no diretório atual: rodar os
+# scripts de outro lugar não pode cair, sem aviso, no WordNet ao vivo.
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNONYM_TABLE_PATH = os.environ.get("SYNONYM_TABLE", os.path.join(MODULE_DIR, "synonym_table"))
+# Uma tabela por motor. A do Whoosh só guarda sinônimos presentes no
+# vocabulário do índice Whoosh; a do Elasticsearch não é filtrada, para
+# reproduzir o WordNet ao vivo. As duas guardam as palavras sem sinônimos.
+SYNONYM_TABLE_PATHS = {
+    "whoosh": SYNONYM_TABLE_PATH,
+    "elasticsearch": os.environ.get("SYNONYM_TABLE_ES", os.path.join(MODULE_DIR, "synonym_table_es")),
+}
+
+TABLE_FILES = ("strings", "string_offsets", "keys", "synonym_offsets", "synonyms")
+
+
+def wordnet_synonyms(word):
+    from nltk.corpus import wordnet
+
+    synonyms = []
+    seen = set()
+    for syn in wordnet.synsets(word):
+        for lemma in syn.lemmas():
+            name = lemma.name()
+            if name not in seen:
+                seen.add(name)
+                synonyms.append(name)
+    return synonyms
+
+
+class SynonymTable:
+    # Tabela lema -> sinônimos em arrays NumPy abertos com mmap. As strings
+    # ficam num único bloco UTF-8 ordenado; a busca é binária sobre as chaves.
+
+    def __init__(self, path):
+        import numpy as np
+
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r') for name in TABLE_FILES}
+        self.strings = arrays["strings"]
+        self.string_offsets = arrays["string_offsets"]
+        self.keys = arrays["keys"]
+        self.synonym_offsets = arrays["synonym_offsets"]
+        self.synonyms = arrays["synonyms"]
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _string_bytes(self, string_id):
+        start = self.string_offsets[string_id]
+        end = self.string_offsets[string_id + 1]
+        return self.strings[start:end].tobytes()
+
+    def _find(self, word):
+        target = word.encode('utf-8')
+        low, high = 0, len(self.keys)
+        while low < high:
+            middle = (low + high) // 2
+            if self._string_bytes(self.keys[middle]) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.keys) and self._string_bytes(self.keys[low]) == target:
+            return low
+        return None
+
+    def get(self, word, default=()):
+        # default volta quando a palavra não é uma chave da tabela.
+        if word not in self._memo:
+            position = self._find(word)
+            if position is None:
+                self._memo[word] = None
+            else:
+                start = self.synonym_offsets[position]
+                end = self.synonym_offsets[position + 1]
+                self._memo[word] = tuple(self._string_bytes(string_id).decode('utf-8')
+                                         for string_id in self.synonyms[start:end])
+        synonyms = self._memo[word]
+        return default if synonyms is None else synonyms
+
+
+def whoosh_vocabulary(index_dir, fieldname="content"):
+    # Termos do índice já passaram pelo StemmingAnalyzer, então os sinônimos
+    # precisam ser normalizados pelo mesmo analisador antes da comparação.
+    from whoosh.index import open_dir
+
+    ix = open_dir(index_dir)
+    analyzer = ix.schema[fieldname].analyzer
+    with ix.reader() as reader:
+        vocabulary = set()
+        for term in reader.lexicon(fieldname):
+            vocabulary.add(term.decode('utf-8') if isinstance(term, bytes) else term)
+
+    def normalize(word):
+        return [token.text for token in analyzer(word.replace('_', ' '))]
+
+    return vocabulary, normalize
+
+
+def is_in_vocabulary(word, vocabulary, normalize=None):
+    terms = normalize(word) if normalize else [word]
+    return bool(terms) and all(term in vocabulary for term in terms)
+
+
+def build_synonym_table(output_path, words=None, vocabulary=None, normalize=None,
+                        max_synonyms=DEFAULT_MAX_SYNONYMS, keep_empty=False):
+    import numpy as np
+    from nltk.corpus import wordnet
+
+    if words is None:
+        words = wordnet.all_lemma_names()
+
+    table = {}
+    for word in set(words):
+        synonyms = wordnet_synonyms(word)
+        if vocabulary is not None:
+            synonyms = [
+                synonym for synonym in synonyms
+                if is_in_vocabulary(synonym, vocabulary, normalize)
+            ]
+        if synonyms or keep_empty:
+            table[word] = synonyms[:max_synonyms]
+
+    all_strings = set(table)
+    for synonyms in table.values():
+        all_strings.update(synonyms)
+    encoded = sorted(string.encode('utf-8') for string in all_strings)
+    string_ids = {string.decode('utf-8'): string_id for string_id, string in enumerate(encoded)}
+
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    string_offsets[1:] = np.cumsum([len(string) for string in encoded])
+    strings = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    # As chaves seguem a ordem dos bytes UTF-8, a mesma usada na busca binária.
+    keys = sorted(table, key=lambda word: word.encode('utf-8'))
+    synonym_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    synonym_offsets[1:] = np.cumsum([len(table[word]) for word in keys])
+    synonyms = np.array([string_ids[synonym] for word in keys for synonym in table[word]], dtype=np.int32)
+
+    os.makedirs(output_path, exist_ok=True)
+    arrays = {
+        "strings": strings,
+        "string_offsets": string_offsets,
+        "keys": np.array([string_ids[word] for word in keys], dtype=np.int32),
+        "synonym_offsets": synonym_offsets,
+        "synonyms": synonyms,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(output_path, name + ".npy"), array)
+    with open(os.path.join(output_path, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"terms": len(keys), "max_synonyms": max_synonyms, "keep_empty": keep_empty}, f)
+
+    return len(keys)
+
+
+# Tabelas abertas, por motor (None quando o motor não tem tabela).
+synonym_tables = {}
+# Palavras procuradas fora da tabela, por motor, contadas para o aviso.
+table_misses = {}
+
+
+def load_synonym_table(engine="whoosh", path=None):
+    path = path or SYNONYM_TABLE_PATHS[engine]
+    table = SynonymTable(path) if os.path.exists(os.path.join(path, "keys.npy")) else None
+    synonym_tables[engine] = table
+    return table
+
+
+def table_miss(word, engine):
+    # Uma palavra fora das chaves vai ao WordNet ao vivo, como sem tabela. O
+    # primeiro caso de cada motor é avisado; muitos indicam uma tabela
+    # construída sem as palavras das consultas.
+    if engine not in table_misses:
+        table_misses[engine] = 0
+        print(f"Aviso: '{word}' não está na tabela de sinônimos ({engine}); consultando o WordNet. "
+              f"Reconstrua a tabela com python sinonimos.py --engine {engine} se isso se repetir.",
+              file=sys.stderr)
+    table_misses[engine] += 1
+    return wordnet_synonyms(word)
+
+
+def get_synonyms(word, max_synonyms=None, engine="whoosh"):
+    # Usa a tabela pré-calculada do motor quando existe; sem ela, volta a
+    # consultar o WordNet. As duas tabelas guardam também as palavras sem
+    # sinônimos, então uma palavra fora das chaves nunca foi vista na
+    # construção e também vai ao WordNet (table_miss).
+    if engine not in synonym_tables:
+        load_synonym_table(engine)
+    table = synonym_tables[engine]
+    if table is None:
+        synonyms = wordnet_synonyms(word)
+    else:
+        synonyms = table.get(word, None)
+        if synonyms is None:
+            synonyms = table_miss(word, engine)
+    if max_synonyms is not None:
+        synonyms = synonyms[:max_synonyms]
+    return synonyms
+
+
+def main_sinonimos(engine="whoosh", index_dir=None, lemma_cache_path=None):
+    index_dir = index_dir or os.path.join(os.getcwd(), "index")
+    lemma_cache_path = lemma_cache_path or os.path.join(os.getcwd(), "lemma_cache.json")
+
+    words = None
+    if os.path.exists(lemma_cache_path):
+        # O cache de lemas guarda as formas de superfície vistas no corpus.
+        from nltk.corpus import wordnet
+        with open(lemma_cache_path, 'r', encoding='utf-8') as f:
+            words = set(json.load(f)) | set(wordnet.all_lemma_names())
+
+    print(f"Construindo a tabela de sinônimos ({engine})...")
+    if engine == "whoosh":
+        vocabulary, normalize = whoosh_vocabulary(index_dir)
+        term_count = build_synonym_table(SYNONYM_TABLE_PATHS[engine], words=words, vocabulary=vocabulary,
+                                         normalize=normalize, keep_empty=True)
+    else:
+        term_count = build_synonym_table(SYNONYM_TABLE_PATHS[engine], words=words, keep_empty=True)
+    print(f"Termos na tabela de sinônimos: {term_count}")
+
+    start_time = time.time()
+    load_synonym_table(engine)
+    print(f"Tempo de carregamento da tabela: {(time.time() - start_time) * 1000:.2f} ms")
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Constrói a tabela de sinônimos de um motor de busca.")
+    parser.add_argument("--engine", choices=sorted(SYNONYM_TABLE_PATHS), default="whoosh",
+                        help="whoosh: filtrada pelo vocabulário do índice; elasticsearch: WordNet sem filtro")
+    parser.add_argument("--index", default=None, help="índice Whoosh (padrão: ./index)")
+    parser.add_argument("--lemma-cache", default=None, help="cache de lemas com as palavras do corpus")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main_sinonimos(args.engine, args.index, args.lemma_cache)
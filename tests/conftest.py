@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório, fora de um pacote.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def es_stub(monkeypatch):
+    # Elasticsearch substituto (es_stub.py) num servidor local, com o cliente
+    # oficial dos dois módulos do Elasticsearch apontado para ele.
+    from elasticsearch import Elasticsearch
+    import elasticsearch_busca
+    import elasticsearch_indexacao
+    from es_stub import StubElasticsearch
+
+    stub = StubElasticsearch()
+    server, url = stub.serve()
+    client = Elasticsearch(url)
+    monkeypatch.setattr(elasticsearch_indexacao, "es", client)
+    monkeypatch.setattr(elasticsearch_busca, "es", client)
+    monkeypatch.setattr(elasticsearch_busca, "filename_fields", {})
+    yield stub
+    server.shutdown()
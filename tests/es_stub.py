@@ -0,0 +1,286 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Elasticsearch substituto para os testes: servidor HTTP local com um BM25
+# simples, sem separar os documentos por índice. Serve para conferir o
+# caminho de indexação e busca com o cliente oficial, não para medir
+# desempenho (o benchmark mede um cluster de verdade).
+
+
+class StubElasticsearch:
+    # Implementa apenas o necessário para os scripts deste repositório, para
+    # que o cliente oficial e os helpers de bulk rodem sem um cluster.
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = {}
+        self.postings = {}
+        self.total_length = 0
+        self.lock = threading.Lock()
+        # Índices (com as configurações index.* em formato plano), aliases e
+        # contagem das operações de manutenção. Os documentos não são
+        # separados por índice.
+        self.indices = {}
+        self.aliases = {}
+        self.templates = {}
+        self.operations = Counter()
+
+    @staticmethod
+    def analyze(text):
+        return re.findall(r'[a-z0-9]+', text.lower())
+
+    def index(self, doc_id, source):
+        tokens = Counter(self.analyze(source.get("content", "")))
+        length = sum(tokens.values())
+        with self.lock:
+            if doc_id in self.documents:
+                self.delete(doc_id)
+            self.documents[doc_id] = (source, length)
+            self.total_length += length
+            for term, tf in tokens.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def delete(self, doc_id):
+        source, length = self.documents.pop(doc_id)
+        self.total_length -= length
+        for term in set(self.analyze(source.get("content", ""))):
+            self.postings.get(term, {}).pop(doc_id, None)
+
+    def query_terms(self, query):
+        terms = []
+        for clause in query.get("bool", {}).get("should", []):
+            for value in clause.get("match", {}).values():
+                terms.extend(self.analyze(value if isinstance(value, str) else value.get("query", "")))
+        for clause in query.get("bool", {}).get("must", []):
+            if "more_like_this" in clause:
+                terms.extend(self.more_like_this_terms(clause["more_like_this"]))
+        return terms
+
+    def more_like_this_terms(self, params):
+        # Como no Lucene: os max_query_terms termos de maior tf x idf do texto
+        # (ou dos documentos indicados por _id), com tf >= min_term_freq e
+        # df >= min_doc_freq.
+        like = params.get("like", [])
+        texts = []
+        for item in like if isinstance(like, list) else [like]:
+            if isinstance(item, str):
+                texts.append(item)
+            elif item.get("_id") in self.documents:
+                texts.append(self.documents[item["_id"]][0].get("content", ""))
+        num_docs = len(self.documents)
+        scored = []
+        for term, tf in Counter(term for text in texts for term in self.analyze(text)).items():
+            doc_freq = len(self.postings.get(term, ()))
+            if tf >= params.get("min_term_freq", 2) and doc_freq and doc_freq >= params.get("min_doc_freq", 5):
+                scored.append((tf * (math.log(num_docs / (doc_freq + 1)) + 1), term))
+        scored.sort(reverse=True)
+        return [term for _, term in scored[:params.get("max_query_terms", 25)]]
+
+    def query_filter(self, query):
+        # Suporta apenas filtros "terms" sobre campos do _source.
+        allowed = None
+        for clause in query.get("bool", {}).get("filter", []):
+            for field, values in clause.get("terms", {}).items():
+                field = field[:-len(".keyword")] if field.endswith(".keyword") else field
+                matching = {doc_id for doc_id, (source, _) in self.documents.items()
+                            if source.get(field) in set(values)}
+                allowed = matching if allowed is None else allowed & matching
+        return allowed
+
+    def search(self, body):
+        start_time = time.time()
+        terms = self.query_terms(body.get("query", {}))
+        with self.lock:
+            allowed = self.query_filter(body.get("query", {}))
+            num_docs = len(self.documents) or 1
+            avg_length = self.total_length / num_docs or 1
+            scores = Counter()
+            for term in set(terms):
+                postings = self.postings.get(term, {})
+                idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    length = self.documents[doc_id][1]
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+            size = body.get("size", 10)
+            collapse_field = body.get("collapse", {}).get("field", "").replace(".keyword", "")
+            if collapse_field:
+                # collapse: só o documento mais bem pontuado de cada valor do campo.
+                ranked = []
+                seen_values = set()
+                for doc_id, score in scores.most_common():
+                    value = self.documents[doc_id][0].get(collapse_field)
+                    if value not in seen_values:
+                        seen_values.add(value)
+                        ranked.append((doc_id, score))
+                        if len(ranked) >= size:
+                            break
+            else:
+                ranked = scores.most_common(size)
+            source_fields = body.get("_source")
+            hits = [
+                {"_id": doc_id, "_score": score, "_source": self.source(doc_id, source_fields)}
+                for doc_id, score in ranked
+            ]
+        return {
+            "took": int((time.time() - start_time) * 1000),
+            "timed_out": False,
+            "hits": {"total": {"value": len(scores), "relation": "eq"}, "max_score": None, "hits": hits},
+        }
+
+    def source(self, doc_id, fields=None):
+        # Filtro de _source por lista de campos, como o do Elasticsearch.
+        source = self.documents[doc_id][0]
+        if isinstance(fields, list):
+            return {field: value for field, value in source.items() if field in fields}
+        return source
+
+    def put_settings(self, index_name, body):
+        settings = body.get("settings", body) if isinstance(body, dict) else {}
+        flat = {}
+        for name, value in settings.items():
+            if isinstance(value, dict):
+                flat.update({f"{name}.{key}": item for key, item in value.items()})
+            else:
+                flat[name if name.startswith("index.") else f"index.{name}"] = value
+        current = self.indices.setdefault(index_name, {})
+        for name, value in flat.items():
+            if value is None:
+                current.pop(name, None)
+            else:
+                current[name] = str(value)
+
+    def update_aliases(self, actions):
+        for action in actions:
+            (kind, params), = action.items()
+            if kind == "add":
+                self.aliases.setdefault(params["alias"], set()).add(params["index"])
+            elif kind == "remove":
+                self.aliases.get(params["alias"], set()).discard(params["index"])
+            elif kind == "remove_index":
+                self.indices.pop(params["index"], None)
+        self.aliases = {alias: indices for alias, indices in self.aliases.items() if indices}
+
+    def bulk(self, lines):
+        items = []
+        for i in range(0, len(lines), 2):
+            op_type, meta = next(iter(lines[i].items()))
+            if self.indices.get(meta.get("_index"), {}).get("index.refresh_interval") == "-1":
+                self.operations["bulk_without_refresh"] += 1
+            doc_id = meta.get("_id") or str(len(self.documents))
+            self.index(doc_id, lines[i + 1])
+            items.append({op_type: {"_index": meta.get("_index"), "_id": doc_id, "status": 201}})
+        return {"took": 0, "errors": False, "items": items}
+
+    def msearch(self, lines):
+        return {"took": 0, "responses": [dict(self.search(lines[i + 1]), status=200)
+                                         for i in range(0, len(lines), 2)]}
+
+    def make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, body, status=200):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def read_body(self):
+                length = int(self.headers.get("Content-Length", 0))
+                return self.rfile.read(length).decode('utf-8') if length else ""
+
+            def do_HEAD(self):
+                parts = self.path.split('?')[0].strip('/').split('/')
+                if parts[0] == "_alias":
+                    exists = parts[-1] in stub.aliases
+                elif len(parts) == 1:
+                    exists = parts[0] in stub.indices or parts[0] in stub.aliases
+                else:
+                    exists = True
+                self.send_json({}, 200 if exists else 404)
+
+            def do_GET(self):
+                self.do_POST()
+
+            def do_PUT(self):
+                self.do_POST()
+
+            def do_DELETE(self):
+                stub.indices.pop(self.path.split('?')[0].strip('/'), None)
+                self.send_json({"acknowledged": True})
+
+            def do_POST(self):
+                path = self.path.split('?')[0]
+                parts = path.strip('/').split('/')
+                raw_body = self.read_body()
+                if parts[0] == "_alias":
+                    alias = parts[-1]
+                    if alias not in stub.aliases:
+                        self.send_json({"error": f"alias [{alias}] missing", "status": 404}, 404)
+                    else:
+                        self.send_json({name: {"aliases": {alias: {}}} for name in stub.aliases[alias]})
+                elif parts[0] == "_aliases":
+                    stub.update_aliases(json.loads(raw_body)["actions"])
+                    self.send_json({"acknowledged": True})
+                elif parts[0] == "_index_template":
+                    stub.templates[parts[-1]] = json.loads(raw_body)
+                    self.send_json({"acknowledged": True})
+                elif parts[-1] == "_settings":
+                    if self.command == "PUT":
+                        stub.put_settings(parts[0], json.loads(raw_body))
+                        self.send_json({"acknowledged": True})
+                    else:
+                        self.send_json({parts[0]: {"settings": dict(stub.indices.get(parts[0], {}))}})
+                elif "_mapping" in parts:
+                    # Mapeamento explícito de create_index: filename é keyword.
+                    names = stub.aliases.get(parts[0], [parts[0]])
+                    self.send_json({name: {"mappings": {"filename": {
+                        "full_name": "filename", "mapping": {"filename": {"type": "keyword"}}}}}
+                        for name in names})
+                elif parts[-1] in ("_refresh", "_forcemerge"):
+                    stub.operations[parts[-1][1:]] += 1
+                    self.send_json({"_shards": {"total": 1, "successful": 1, "failed": 0}})
+                elif len(parts) == 1 and self.command == "PUT" and not parts[0].startswith("_"):
+                    body = json.loads(raw_body) if raw_body else {}
+                    stub.indices[parts[0]] = {}
+                    stub.put_settings(parts[0], {name: value for name, value in body.get("settings", {}).items()
+                                                 if name != "analysis"})
+                    self.send_json({"acknowledged": True, "index": parts[0]})
+                elif path.endswith("/_bulk"):
+                    lines = [json.loads(line) for line in raw_body.splitlines() if line.strip()]
+                    self.send_json(stub.bulk(lines))
+                elif path.endswith("/_msearch"):
+                    lines = [json.loads(line) for line in raw_body.splitlines() if line.strip()]
+                    self.send_json(stub.msearch(lines))
+                elif path.endswith("/_search"):
+                    self.send_json(stub.search(json.loads(raw_body) if raw_body else {}))
+                elif path.endswith("/_count"):
+                    self.send_json({"count": len(stub.documents)})
+                else:
+                    self.send_json({"acknowledged": True})
+
+        return Handler
+
+    def serve(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,73 @@
+import math
+import pytest
+import avaliacao
+
+# P@k, R@k, AP e nDCG@k comparados com valores calculados à mão.
+
+K_VALUES = [1, 2, 4]
+RELEVANT = [
+    {"filename": "suspicious-document00001.xml", "src_file": ["source-document00001.txt", "source-document00003.txt"]},
+    {"filename": "suspicious-document00002.xml", "src_file": ["source-document00002.txt"]},
+    {"filename": "suspicious-document00003.xml", "src_file": ["source-document00005.txt"]},
+    # Sem fonte no gabarito: fica fora das médias.
+    {"filename": "suspicious-document00004.xml", "src_file": []},
+]
+
+
+def hits(*names):
+    return [{"filename": name, "score": 1.0} for name in names]
+
+
+RETRIEVED = [
+    # Caminhos com diretório e extensão: a chave é só o nome do arquivo.
+    {"file": "part1/suspicious-document00001.txt",
+     "retrieved_documents": hits("part1/source-document00001.txt", "source-document00002.txt",
+                                 "part2/source-document00003.txt", "source-document00004.txt")},
+    {"file": "suspicious-document00002.txt",
+     "retrieved_documents": hits("source-document00004.txt", "source-document00002.txt")},
+    {"file": "suspicious-document00004.txt", "retrieved_documents": hits("source-document00001.txt")},
+]
+
+
+def evaluation():
+    return avaliacao.evaluate(RELEVANT, RETRIEVED, K_VALUES)
+
+
+def test_per_query_metrics():
+    result = evaluation()
+    per_query = result["per_query"]
+    position = {name: i for i, name in enumerate(result["queries"])}
+    first = position["suspicious-document00001"]
+    second = position["suspicious-document00002"]
+    missing = position["suspicious-document00003"]
+
+    # Relevantes nas posições 1 e 3 de 2.
+    assert per_query["precision"][first] == pytest.approx([1, 1 / 2, 2 / 4])
+    assert per_query["recall"][first] == pytest.approx([1 / 2, 1 / 2, 1])
+    assert per_query["average_precision"][first] == pytest.approx((1 / 1 + 2 / 3) / 2)
+    ideal = 1 + 1 / math.log2(3)
+    assert per_query["ndcg"][first] == pytest.approx([1, 1 / ideal, (1 + 1 / math.log2(4)) / ideal])
+
+    # Relevante na posição 2 de 1.
+    assert per_query["precision"][second] == pytest.approx([0, 1 / 2, 1 / 4])
+    assert per_query["recall"][second] == pytest.approx([0, 1, 1])
+    assert per_query["average_precision"][second] == pytest.approx(1 / 2)
+    assert per_query["ndcg"][second] == pytest.approx([0, 1 / math.log2(3), 1 / math.log2(3)])
+
+    # Consulta sem resultados.
+    assert list(per_query["precision"][missing]) == [0, 0, 0]
+    assert per_query["average_precision"][missing] == 0
+
+
+def test_macro_averages_skip_unjudged_queries():
+    macro = evaluation()["macro"]
+    assert macro["precision"] == pytest.approx([(1 + 0 + 0) / 3, (1 / 2 + 1 / 2) / 3, (2 / 4 + 1 / 4) / 3])
+    assert macro["recall"] == pytest.approx([(1 / 2) / 3, (1 / 2 + 1) / 3, (1 + 1) / 3])
+    assert macro["map"] == pytest.approx(((1 / 1 + 2 / 3) / 2 + 1 / 2) / 3)
+    ideal = 1 + 1 / math.log2(3)
+    assert macro["ndcg"][2] == pytest.approx(((1 + 1 / math.log2(4)) / ideal + 1 / math.log2(3)) / 3)
+
+
+def test_no_judged_queries():
+    macro = avaliacao.evaluate(RELEVANT[3:], RETRIEVED, K_VALUES)["macro"]
+    assert macro == {"precision": [0, 0, 0], "recall": [0, 0, 0], "ndcg": [0, 0, 0], "map": 0}
@@ -0,0 +1,32 @@
+import elasticsearch_busca
+
+# Expansão de consulta das abordagens 4 e 6 (e da varredura de experimentos).
+
+SYNONYMS = {
+    "car": ["auto", "automobile", "machine", "motorcar"],
+    "fast": ["quick", "rapid", "car"],
+    "road": [],
+}
+
+
+def fake_synonyms(term, max_synonyms):
+    return SYNONYMS.get(term, [])[:max_synonyms]
+
+
+def test_base_terms_are_kept():
+    # Os sinônimos do primeiro termo não podem tirar da consulta os demais
+    # termos escolhidos.
+    ranked = ["car", "fast", "road", "city"]
+    terms = elasticsearch_busca.expand_terms(ranked, 3, 5, fake_synonyms)
+    assert terms[:3] == ["car", "fast", "road"]
+    assert terms[3:] == ["auto", "automobile", "machine", "motorcar", "quick", "rapid"]
+    assert "city" not in terms
+
+
+def test_synonyms_budget_per_term():
+    terms = elasticsearch_busca.expand_terms(["car", "fast"], 2, 1, fake_synonyms)
+    assert terms == ["car", "fast", "auto", "quick"]
+
+
+def test_without_synonyms():
+    assert elasticsearch_busca.expand_terms(["car", "fast", "road"], 2, 0, fake_synonyms) == ["car", "fast"]
@@ -0,0 +1,42 @@
+import random
+import elasticsearch_busca
+import elasticsearch_indexacao
+
+# Caminho completo do Elasticsearch contra o servidor substituto (es_stub):
+# carga atrás do alias com o perfil de bulk e busca em lote com more_like_this.
+# Só confere o comportamento; os tempos medidos aqui não significam nada.
+
+
+def write_corpus(tmp_path):
+    rnd = random.Random(4)
+    vocabulary = [f"w{i}" for i in range(400)]
+    sources = {f"source-document{i:05d}.txt": " ".join(rnd.choice(vocabulary) for _ in range(200))
+               for i in range(1, 7)}
+    source_dir = tmp_path / "fontes"
+    source_dir.mkdir()
+    for name, text in sources.items():
+        (source_dir / name).write_text(text, encoding='utf-8')
+    suspicious_path = tmp_path / "suspicious-document00001.txt"
+    copied = sources["source-document00003.txt"].split()[40:160]
+    suspicious_path.write_text(" ".join(["z1", "z2"] + copied + ["z3"]), encoding='utf-8')
+    return str(source_dir), str(suspicious_path)
+
+
+def test_bulk_load_behind_alias_and_mlt_search(tmp_path, es_stub):
+    source_dir, suspicious_path = write_corpus(tmp_path)
+
+    elasticsearch_indexacao.index_documents(source_dir, "smoke", alias="smoke")
+    (index_name,) = es_stub.aliases["smoke"]
+    assert index_name.startswith("smoke-")
+    assert len(es_stub.documents) == 6
+    assert es_stub.operations["bulk_without_refresh"] == 6
+    assert es_stub.operations["forcemerge"] == 1
+    # As configurações da carga não ficam no índice.
+    assert es_stub.indices[index_name].get("index.refresh_interval") != "-1"
+
+    results = elasticsearch_busca.search_documents_batch(
+        [suspicious_path], "smoke", approaches=(elasticsearch_busca.MLT_APPROACH,), num_workers=1,
+        mlt_params={"min_doc_freq": 1, "min_term_freq": 1})
+    (result,) = results[elasticsearch_busca.MLT_APPROACH]
+    assert result["file"] == suspicious_path
+    assert result["retrieved_documents"][0]["filename"] == "source-document00003.txt"
@@ -0,0 +1,94 @@
+import json
+import os
+import gabarito
+
+# Gabarito do PAN (XML) e JSON, com o índice em cache: só arquivos novos ou
+# alterados voltam a ser analisados, e os removidos saem do índice.
+
+XML = """<document reference="suspicious-document{n:05d}.txt">
+  <feature name="plagiarism" this_offset="10" this_length="50" source_reference="source-document{n:05d}.txt"
+           source_offset="5" source_length="50" />
+  <feature name="plagiarism" this_offset="90" this_length="20" source_reference="source-document00099.txt"
+           source_offset="0" source_length="20" />
+  <feature name="about" authors="x" />
+</document>
+"""
+
+
+def write_xml(directory, n):
+    path = os.path.join(directory, f"suspicious-document{n:05d}.xml")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(XML.format(n=n))
+    return path
+
+
+def counting_parser(monkeypatch):
+    parsed = []
+    parse = gabarito.parse_annotation_file
+
+    def parse_annotation_file(file_path):
+        parsed.append(os.path.basename(file_path))
+        return parse(file_path)
+
+    monkeypatch.setattr(gabarito, "parse_annotation_file", parse_annotation_file)
+    return parsed
+
+
+def test_parse_xml_and_json(tmp_path):
+    entries = gabarito.parse_xml_annotations(write_xml(str(tmp_path), 1))
+    assert entries[0]["filename"] == "suspicious-document00001.xml"
+    assert entries[0]["src_file"] == ["source-document00001.txt", "source-document00099.txt"]
+    assert entries[0]["offsets"][0] == {"this_offset": 10, "this_length": 50, "source_offset": 5,
+                                        "source_length": 50, "source_reference": "source-document00001.txt"}
+
+    json_path = tmp_path / "suspicious-document00002.json"
+    json_path.write_text(json.dumps([{"type": "suspicious-document", "src_file": ["source-document00002.txt"]},
+                                     {"type": "other"}]), encoding='utf-8')
+    assert gabarito.parse_json_annotations(str(json_path)) == [
+        {"filename": "suspicious-document00002.json", "src_file": ["source-document00002.txt"], "offsets": []}]
+
+
+def test_index_reparses_only_changed_files(tmp_path, monkeypatch):
+    directory = str(tmp_path / "anotacoes")
+    os.makedirs(os.path.join(directory, "part1"))
+    write_xml(directory, 1)
+    write_xml(os.path.join(directory, "part1"), 2)
+    index_path = str(tmp_path / "gabarito.json.gz")
+    parsed = counting_parser(monkeypatch)
+
+    documents = gabarito.get_suspicious_documents(directory, index_path=index_path)
+    assert sorted(parsed) == ["suspicious-document00001.xml", "suspicious-document00002.xml"]
+    assert len(documents) == 2
+
+    parsed.clear()
+    assert gabarito.get_suspicious_documents(directory, index_path=index_path) == documents
+    assert parsed == []
+
+    write_xml(os.path.join(directory, "part1"), 3)
+    os.remove(os.path.join(directory, "suspicious-document00001.xml"))
+    documents = gabarito.get_suspicious_documents(directory, index_path=index_path)
+    assert parsed == ["suspicious-document00003.xml"]
+    assert sorted(doc["filename"] for doc in documents) == ["suspicious-document00002.xml",
+                                                            "suspicious-document00003.xml"]
+
+
+def test_rescan_catches_rewrite_in_place(tmp_path, monkeypatch):
+    directory = str(tmp_path / "anotacoes")
+    os.makedirs(directory)
+    path = write_xml(directory, 1)
+    index_path = str(tmp_path / "gabarito.json.gz")
+    gabarito.get_suspicious_documents(directory, index_path=index_path)
+
+    # Reescrever no lugar não muda o mtime do diretório.
+    directory_mtime = os.stat(directory).st_mtime
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<document reference="suspicious-document00001.txt">'
+                '<feature name="plagiarism" source_reference="source-document00007.txt" /></document>')
+    os.utime(directory, (directory_mtime, directory_mtime))
+    parsed = counting_parser(monkeypatch)
+
+    assert gabarito.get_suspicious_documents(directory, index_path=index_path)[0]["src_file"] == [
+        "source-document00001.txt", "source-document00099.txt"]
+    documents = gabarito.get_suspicious_documents(directory, index_path=index_path, rescan=True)
+    assert parsed == ["suspicious-document00001.xml"]
+    assert documents[0]["src_file"] == ["source-document00007.txt"]
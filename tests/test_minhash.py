@@ -0,0 +1,71 @@
+import random
+import pytest
+import minhash
+
+# Índice LSH: gravar e carregar não muda as consultas, e remove() tira só os
+# documentos pedidos, deixando o índice pronto para novos add().
+
+PARAMS = {"num_perm": 32, "bands": 16, "shingle_size": 3, "passage_size": 20}
+
+
+def random_documents(count=12, length=120, seed=3):
+    rnd = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(2000)]
+    return {f"doc{i}.txt": [rnd.choice(vocabulary) for _ in range(length)] for i in range(count)}
+
+
+def build(documents):
+    lsh = minhash.MinHashLSH(**PARAMS)
+    for doc_key, tokens in documents.items():
+        lsh.add(doc_key, lsh.band_hashes(tokens))
+    return lsh
+
+
+def top_candidate(lsh, tokens):
+    candidates = lsh.query(tokens)
+    return candidates[0][0] if candidates else None
+
+
+def test_query_finds_copied_passage():
+    documents = random_documents()
+    lsh = build(documents)
+    for doc_key, tokens in documents.items():
+        assert top_candidate(lsh, ["x"] * 10 + tokens[30:80] + ["y"] * 10) == doc_key
+
+
+def test_save_load_round_trip(tmp_path):
+    documents = random_documents()
+    lsh = build(documents)
+    lsh.save(str(tmp_path / "lsh"))
+    loaded = minhash.MinHashLSH.load(str(tmp_path / "lsh"))
+    assert loaded.params() == lsh.params()
+    assert loaded.doc_keys == lsh.doc_keys
+    for tokens in documents.values():
+        assert loaded.query(tokens[10:70]) == lsh.query(tokens[10:70])
+
+
+def test_remove_then_add_round_trip(tmp_path):
+    documents = random_documents()
+    build(documents).save(str(tmp_path / "lsh"))
+    lsh = minhash.MinHashLSH.load(str(tmp_path / "lsh"))
+
+    assert lsh.remove(["doc1.txt", "doc5.txt", "missing.txt"]) == 2
+    replacement = random_documents(count=1, seed=9)["doc0.txt"]
+    lsh.add("doc5.txt", lsh.band_hashes(replacement))
+    lsh.save(str(tmp_path / "lsh"))
+
+    reloaded = minhash.MinHashLSH.load(str(tmp_path / "lsh"))
+    assert sorted(reloaded.doc_keys) == sorted(set(documents) - {"doc1.txt"})
+    assert all(doc_key != "doc1.txt" for doc_key, _ in reloaded.query(documents["doc1.txt"]))
+    assert top_candidate(reloaded, documents["doc5.txt"]) != "doc5.txt"
+    assert top_candidate(reloaded, replacement[20:90]) == "doc5.txt"
+    for doc_key in ("doc0.txt", "doc7.txt", "doc11.txt"):
+        assert top_candidate(reloaded, documents[doc_key][20:90]) == doc_key
+
+
+def test_add_to_loaded_index_requires_remove(tmp_path):
+    build(random_documents()).save(str(tmp_path / "lsh"))
+    lsh = minhash.MinHashLSH.load(str(tmp_path / "lsh"))
+    lsh.add("new.txt", lsh.band_hashes(random_documents(count=1, seed=5)["doc0.txt"]))
+    with pytest.raises(ValueError):
+        lsh.finalize()
@@ -0,0 +1,72 @@
+import os
+import random
+import numpy as np
+import pytest
+import motor_nativo
+import registro
+import instrumentacao
+
+# A parada antecipada (MaxScore com máximos por bloco) tem de devolver o
+# mesmo top-k que pontuar todos os postings.
+
+NUM_DOCS = 1500
+VOCABULARY = [f"t{i}" for i in range(200)]
+
+
+def build_index(index_dir, passages, seed=7):
+    rnd = random.Random(seed)
+    # Zipf: os termos comuns têm listas de vários blocos.
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    registry = registro.DocRegistry(os.path.join(index_dir, registro.REGISTRY_FILE))
+    builder = motor_nativo.IndexBuilder()
+    for i in range(NUM_DOCS):
+        doc_id = registry.register(f"doc{i}.txt")
+        for _ in range(rnd.randint(1, 3) if passages else 1):
+            builder.add(doc_id, rnd.choices(VOCABULARY, weights, k=rnd.randint(5, 40)))
+    builder.save(index_dir, passages)
+    registry.save()
+    return motor_nativo.open_index(index_dir)
+
+
+def query_terms(index, rnd, size):
+    terms = rnd.sample(VOCABULARY[:60], size)
+    return [(index.term_id(term), rnd.uniform(0.2, 1.0)) for term in terms if index.term_id(term) is not None]
+
+
+@pytest.mark.parametrize("passages", [False, True])
+def test_maxscore_matches_exhaustive(tmp_path, passages):
+    index = build_index(str(tmp_path / "index"), passages)
+    rnd = random.Random(1)
+    instrumentacao.drain()
+    for _ in range(25):
+        terms = query_terms(index, rnd, rnd.randint(2, 12))
+        top_n = rnd.choice([1, 5, 10])
+        expected = index.search_exhaustive(terms, top_n)
+        found = index.search_maxscore(terms, top_n)
+        assert len(found) == len(expected)
+        assert np.allclose(found["score"], expected["score"], rtol=1e-5)
+        # Empates podem trocar a ordem; a pontuação de cada documento não.
+        everything = index.search_exhaustive(terms, len(index.registry))
+        true_scores = dict(zip(everything["doc_id"].tolist(), everything["score"].tolist()))
+        for doc_id, score in zip(found["doc_id"].tolist(), found["score"].tolist()):
+            assert true_scores[doc_id] == pytest.approx(score, rel=1e-5)
+    # Os blocos pulados mostram que a parada antecipada foi de fato usada.
+    assert instrumentacao.drain()["counters"]["native_skipped_blocks"] > 0
+
+
+def test_maxscore_respects_allowed_docs(tmp_path):
+    index = build_index(str(tmp_path / "index"), passages=False)
+    rnd = random.Random(2)
+    allowed_docs = np.array(sorted(rnd.sample(range(NUM_DOCS), 200)), dtype=np.int32)
+    terms = query_terms(index, rnd, 8)
+    expected = index.search_exhaustive(terms, 10, allowed_docs)
+    found = index.search_maxscore(terms, 10, allowed_docs)
+    assert set(found["doc_id"].tolist()) <= set(allowed_docs.tolist())
+    assert np.allclose(found["score"], expected["score"], rtol=1e-5)
+
+
+def test_search_uses_maxscore_on_long_lists(tmp_path):
+    index = build_index(str(tmp_path / "index"), passages=False)
+    terms = [(index.term_id(term), 1.0) for term in VOCABULARY[:3]]
+    assert sum(int(index.doc_freqs[term_id]) for term_id, _ in terms) >= motor_nativo.MAXSCORE_MIN_POSTINGS * 3
+    assert np.array_equal(index.search(terms, 5)["score"], index.search_maxscore(terms, 5)["score"])
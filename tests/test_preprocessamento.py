@@ -0,0 +1,88 @@
+import random
+import re
+import pytest
+import preprocessamento
+
+# Os tokenizadores rápidos de preprocessamento contra o caminho original
+# (word_tokenize do NLTK), em frases fixas com os casos que cada um trata à
+# parte: contrações, pontuação, Unicode e abreviações.
+
+TEXTS = [
+    "I cannot believe you're gonna do that, wanna bet? Gimme a break.",
+    "Don't, won't, can't, it's, we'll, they'd, O'Neil's and rock 'n' roll.",
+    "Hello, world! (Really?) Yes: \"quoted\"; 'single' -- dashes... [brackets] {braces} <tags> end.",
+    "Café, naïve résumé, straße, Ærøskøbing, ½ ² and 3.5 or 1,000 items.",
+    "Mr. Smith met Dr. Jones at 3 p.m. to talk about apples, pears, etc. and nothing else.",
+    "The list has 3. items and step 2. follows; chapter 3. The end.",
+    "He moved to the U.S. in 1999. It was cold. J. S. Bach wrote e.g. fugues, i.e. music.",
+    "Trailing abbreviation at the very end, etc.",
+]
+
+
+def reference_tokenize(text):
+    # woosh_busca.tokenize original.
+    from nltk.tokenize import word_tokenize
+    return word_tokenize(re.sub(r'[^a-z\s]', '', text.lower()))
+
+
+def reference_tokenize_alnum(text):
+    # elasticsearch_busca original: word_tokenize + isalnum.
+    from nltk.tokenize import word_tokenize
+    return [word for word in word_tokenize(text.lower()) if word.isalnum()]
+
+
+@pytest.fixture(scope="module")
+def punkt():
+    # O modelo punkt_tab é pré-requisito dos testes: sem ele não há como rodar
+    # o caminho original (nem tokenize_alnum, que usa o mesmo Punkt).
+    try:
+        reference_tokenize_alnum("punkt.")
+    except LookupError:
+        import nltk
+        if not nltk.download('punkt_tab', quiet=True):
+            pytest.fail("modelo punkt_tab do NLTK ausente e sem como baixá-lo "
+                        "(python -c \"import nltk; nltk.download('punkt_tab')\")")
+
+
+@pytest.mark.usefixtures("punkt")
+@pytest.mark.parametrize("text", TEXTS)
+def test_tokenize_matches_word_tokenize(text):
+    assert preprocessamento.tokenize(text) == reference_tokenize(text)
+
+
+@pytest.mark.usefixtures("punkt")
+@pytest.mark.parametrize("text", TEXTS)
+def test_tokenize_alnum_matches_word_tokenize(text):
+    assert preprocessamento.tokenize_alnum(text) == reference_tokenize_alnum(text)
+
+
+@pytest.mark.usefixtures("punkt")
+def test_abbreviations_stay_joined_mid_sentence():
+    # Abreviações no meio da frase continuam unidas ao ponto no word_tokenize
+    # e somem com o isalnum; no fim do texto o ponto é separado.
+    tokens = preprocessamento.tokenize_alnum("Mr. Smith left, etc. and came back at 3. the latest.")
+    assert tokens == reference_tokenize_alnum("Mr. Smith left, etc. and came back at 3. the latest.")
+    assert "smith" in tokens and "latest" in tokens
+    assert preprocessamento.tokenize_alnum("and so on, etc.")[-1] == "etc"
+
+
+@pytest.mark.usefixtures("punkt")
+def test_abbreviations_inserted_anywhere():
+    # Abreviações, números e iniciais espalhados pelo texto, cada um no
+    # meio ou no fim de uma frase.
+    rnd = random.Random(0)
+    words = " ".join(TEXTS).split()
+    extra = ["mr.", "3.", "a.", "etc.", "...", "x..", "(mr.", "25.", "e.g.", "\"end.", "j.", "no.", "U.S.", "x)."]
+    for _ in range(60):
+        words.insert(rnd.randrange(len(words) + 1), rnd.choice(extra))
+    text = " ".join(words)
+    assert preprocessamento.tokenize_alnum(text) == reference_tokenize_alnum(text)
+
+
+def test_contractions_without_apostrophe():
+    assert preprocessamento.tokenize("cannot gonna wanna") == ["can", "not", "gon", "na", "wan", "na"]
+
+
+@pytest.mark.usefixtures("punkt")
+def test_contractions_without_apostrophe_alnum():
+    assert preprocessamento.tokenize_alnum("Cannot. Gonna, wanna") == ["can", "not", "gon", "na", "wan", "na"]
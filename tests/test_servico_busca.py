@@ -0,0 +1,91 @@
+import json
+import os
+import pytest
+import servico_busca
+import sinonimos
+import woosh_Indexacao
+
+# Cache de resultados do serviço: validade (TTL), LRU e, no Whoosh, a troca
+# do searcher quando o índice muda, que também troca a chave do cache.
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(servico_busca.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = servico_busca.ResultCache(maxsize=4, ttl=10)
+    cache.put("q", ["a.txt"])
+    clock.now += 9.9
+    assert cache.get("q") == ["a.txt"]
+    clock.now += 0.1
+    assert cache.get("q") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 0, "maxsize": 4}
+
+    # Gravar de novo recomeça a contagem.
+    cache.put("q", ["b.txt"])
+    clock.now += 5
+    assert cache.get("q") == ["b.txt"]
+
+
+def test_no_ttl_and_lru_eviction(clock):
+    cache = servico_busca.ResultCache(maxsize=2, ttl=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    clock.now += 10 ** 6
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # "b" era o menos usado.
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    disabled = servico_busca.ResultCache(maxsize=0)
+    disabled.put("a", 1)
+    assert disabled.get("a") is None
+
+
+def test_whoosh_refresh_invalidates_cached_results(tmp_path, monkeypatch):
+    # Sem tabela de sinônimos e sem WordNet: as consultas não são expandidas.
+    monkeypatch.setattr(sinonimos, "synonym_tables", {"whoosh": None})
+    monkeypatch.setattr(sinonimos, "wordnet_synonyms", lambda word: [])
+    monkeypatch.setattr(servico_busca, "REFRESH_INTERVAL", 0)
+
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for name, text in {"a.txt": "alpha beta", "b.txt": "gamma delta"}.items():
+        (docs_dir / name).write_text(text, encoding='utf-8')
+    lemma_cache_path = str(tmp_path / "lemma_cache.json")
+    with open(lemma_cache_path, 'w', encoding='utf-8') as f:
+        json.dump({word: word for word in ("alpha", "beta", "gamma", "delta", "omega")}, f)
+    index_dir = str(tmp_path / "index")
+    woosh_Indexacao.create_index(index_dir, str(docs_dir), lemma_cache_path=lemma_cache_path)
+
+    service = servico_busca.SearchService(index_dir=index_dir, num_workers=1)
+    try:
+        request = {"text": "alpha", "mode": "truncate"}
+        first = service.handle_search(request)
+        assert first["cache"] == "miss"
+        assert [os.path.basename(hit["filename"]) for hit in first["results"]] == ["a.txt"]
+        assert service.handle_search(request)["cache"] == "hit"
+
+        (docs_dir / "d.txt").write_text("alpha omega", encoding='utf-8')
+        woosh_Indexacao.update_index(index_dir, str(docs_dir), num_workers=1, lemma_cache_path=lemma_cache_path)
+
+        refreshed = service.handle_search(request)
+        assert refreshed["cache"] == "miss"
+        assert service.whoosh.refreshes == 1
+        assert sorted(os.path.basename(hit["filename"]) for hit in refreshed["results"]) == ["a.txt", "d.txt"]
+        assert service.handle_search(request)["cache"] == "hit"
+    finally:
+        service.close()
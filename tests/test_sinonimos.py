@@ -0,0 +1,55 @@
+import pytest
+import sinonimos
+
+# Tabela do Whoosh: uma palavra fora das chaves (por exemplo, uma forma da
+# consulta que não entrou na construção) vai ao WordNet em vez de ficar sem
+# expansão.
+
+WORDNET = {
+    "car": ["car", "auto", "automobile", "machine"],
+    "idea": ["idea", "thought"],
+    "quickly": ["quickly", "rapidly", "speedily"],
+}
+
+
+@pytest.fixture
+def wordnet_calls(monkeypatch):
+    calls = []
+
+    def fake_wordnet_synonyms(word):
+        calls.append(word)
+        return list(WORDNET.get(word, []))
+
+    monkeypatch.setattr(sinonimos, "wordnet_synonyms", fake_wordnet_synonyms)
+    return calls
+
+
+@pytest.fixture
+def whoosh_table(tmp_path, monkeypatch, wordnet_calls):
+    path = str(tmp_path / "synonym_table")
+    sinonimos.build_synonym_table(path, words=["car", "idea"], vocabulary={"car", "auto"}, keep_empty=True)
+    monkeypatch.setitem(sinonimos.SYNONYM_TABLE_PATHS, "whoosh", path)
+    monkeypatch.setattr(sinonimos, "synonym_tables", {})
+    monkeypatch.setattr(sinonimos, "table_misses", {})
+    wordnet_calls.clear()
+    return path
+
+
+def test_table_hit_is_filtered_to_vocabulary(whoosh_table, wordnet_calls):
+    assert list(sinonimos.get_synonyms("car")) == ["car", "auto"]
+    assert wordnet_calls == []
+
+
+def test_word_without_synonyms_in_vocabulary_is_not_a_miss(whoosh_table, wordnet_calls):
+    assert list(sinonimos.get_synonyms("idea")) == []
+    assert wordnet_calls == []
+    assert sinonimos.table_misses == {}
+
+
+def test_miss_falls_back_to_wordnet(whoosh_table, wordnet_calls, capsys):
+    assert sinonimos.get_synonyms("quickly", max_synonyms=2) == ["quickly", "rapidly"]
+    assert sinonimos.get_synonyms("quickly") == WORDNET["quickly"]
+    assert wordnet_calls == ["quickly", "quickly"]
+    assert sinonimos.table_misses == {"whoosh": 2}
+    # O aviso sai uma vez por motor.
+    assert capsys.readouterr().err.count("quickly") == 1
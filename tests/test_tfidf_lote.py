@@ -0,0 +1,56 @@
+import numpy as np
+import tfidf_lote
+
+# Vizinhos em blocos: o tamanho de cada bloco conta também o produto esparso,
+# e blocos menores não mudam o resultado.
+
+SOURCES = [
+    "alpha beta gamma delta",
+    "beta gamma epsilon",
+    "zeta eta theta alpha",
+    "iota kappa lambda",
+    "gamma gamma delta mu",
+]
+SUSPICIOUS = [
+    "alpha beta gamma",
+    "kappa lambda nu",
+    "xi omicron",
+    "gamma delta theta zeta eta",
+]
+
+
+def matrices():
+    return tfidf_lote.build_matrices((text.split() for text in SOURCES), (text.split() for text in SUSPICIOUS))
+
+
+def test_product_nnz_bounds_the_product():
+    sources, queries = matrices()
+    sources_t = sources.T.tocsr()
+    estimate = tfidf_lote.product_nnz(queries, sources_t)
+    actual = np.diff((queries @ sources_t).indptr)
+    assert np.all(estimate >= actual)
+    assert estimate[2] == 0
+
+
+def test_chunk_bounds_cover_rows_within_budget():
+    sources, queries = matrices()
+    sources_t = sources.T.tocsr()
+    row_bytes = (tfidf_lote.DENSE_BYTES_PER_CELL * len(SOURCES)
+                 + tfidf_lote.SPARSE_BYTES_PER_NNZ * tfidf_lote.product_nnz(queries, sources_t))
+    max_chunk_mb = 2 * row_bytes.max() / (1024 * 1024)
+    bounds = list(tfidf_lote.chunk_bounds(queries, sources_t, max_chunk_mb))
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(SUSPICIOUS)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+    assert all(row_bytes[start:end].sum() <= max_chunk_mb * 1024 * 1024 for start, end in bounds)
+    # Um limite menor que uma linha ainda anda uma linha por bloco.
+    assert list(tfidf_lote.chunk_bounds(queries, sources_t, 0)) == [(i, i + 1) for i in range(len(SUSPICIOUS))]
+
+
+def test_chunked_neighbours_match_single_chunk():
+    sources, queries = matrices()
+    ids, scores = tfidf_lote.top_k_neighbours(queries, sources, top_n=3)
+    chunked_ids, chunked_scores = tfidf_lote.top_k_neighbours(queries, sources, top_n=3, max_chunk_mb=0)
+    assert np.array_equal(ids, chunked_ids)
+    assert np.allclose(scores, chunked_scores)
+    assert ids[0][0] == 0
+    assert list(ids[2]) == [-1, -1, -1]
@@ -0,0 +1,58 @@
+import json
+import os
+import woosh_busca
+import woosh_Indexacao
+import registro
+
+# O modo em lote (tfidf_lote) recebe só os arquivos ainda presentes no índice.
+
+
+def test_live_doc_ids_skip_removed_files(tmp_path):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for name, text in {"a.txt": "alpha beta", "b.txt": "gamma delta", "c.txt": "epsilon zeta"}.items():
+        (docs_dir / name).write_text(text, encoding='utf-8')
+    # Lemas de um cache já preenchido: o teste não depende do WordNet.
+    lemma_cache_path = str(tmp_path / "lemma_cache.json")
+    with open(lemma_cache_path, 'w', encoding='utf-8') as f:
+        json.dump({word: word for word in ("alpha", "beta", "gamma", "delta", "epsilon", "zeta")}, f)
+    index_dir = str(tmp_path / "index")
+    woosh_Indexacao.create_index(index_dir, str(docs_dir), lemma_cache_path=lemma_cache_path)
+
+    os.remove(docs_dir / "b.txt")
+    woosh_Indexacao.update_index(index_dir, str(docs_dir), num_workers=1, lemma_cache_path=lemma_cache_path)
+
+    registry = registro.DocRegistry.for_index(index_dir)
+    assert len(registry) == 3
+    live_paths = registry.paths(woosh_busca.live_doc_ids(index_dir))
+    assert sorted(os.path.basename(path) for path in live_paths) == ["a.txt", "c.txt"]
+
+
+def test_truncate_keeps_and_semantics(tmp_path):
+    # "truncate" é a linha de base com o AND do QueryParser; "truncate_or" é
+    # a variante OR, com os mesmos tokens.
+    from whoosh.index import open_dir
+
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for name, text in {"a.txt": "alpha beta", "b.txt": "alpha gamma", "c.txt": "delta"}.items():
+        (docs_dir / name).write_text(text, encoding='utf-8')
+    lemma_cache_path = str(tmp_path / "lemma_cache.json")
+    with open(lemma_cache_path, 'w', encoding='utf-8') as f:
+        json.dump({word: word for word in ("alpha", "beta", "gamma", "delta")}, f)
+    index_dir = str(tmp_path / "index")
+    woosh_Indexacao.create_index(index_dir, str(docs_dir), lemma_cache_path=lemma_cache_path)
+    registry = registro.DocRegistry.for_index(index_dir)
+
+    ix = open_dir(index_dir)
+    query_parser = woosh_busca.content_query_parser(ix.schema)
+    with ix.searcher() as searcher:
+        def found(tokens, query_mode):
+            query = woosh_busca.build_query_from_tokens(searcher, query_parser, tokens, query_mode)
+            doc_ids = [hit["doc_id"] for hit in searcher.search(query, limit=None)]
+            return sorted(os.path.basename(path) for path in registry.paths(doc_ids))
+
+        assert found(["alpha", "beta"], "truncate") == ["a.txt"]
+        assert found(["alpha", "beta"], "truncate_or") == ["a.txt", "b.txt"]
+        assert found(["beta", "gamma"], "truncate") == []
+        assert found(["delta"], "truncate_or") == ["c.txt"]
@@ -0,0 +1,88 @@
+import json
+import os
+import pytest
+import woosh_Indexacao
+
+# Manifesto da reindexação incremental: o build completo o grava com o hash
+# calculado na própria leitura, e um arquivo sem trechos não é reprocessado.
+
+DOCUMENTS = {
+    "a.txt": "alpha beta gamma delta epsilon zeta eta theta",
+    "b.txt": "beta gamma gamma delta iota kappa lambda",
+    # Só stopwords: nenhum trecho num índice por trechos.
+    "c.txt": "the and of",
+}
+PASSAGES = {"passage_size": 3}
+STREAMING = {"read_chunk_size": 7, "passage_size": 3}
+
+
+def write_documents(docs_dir, documents):
+    os.makedirs(docs_dir, exist_ok=True)
+    for name, text in documents.items():
+        with open(os.path.join(docs_dir, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    # Os lemas vêm de um cache já preenchido (como o lemma_cache.json dos
+    # scripts), então os testes não dependem do WordNet.
+    docs_dir = str(tmp_path / "docs")
+    write_documents(docs_dir, DOCUMENTS)
+    words = {word for text in DOCUMENTS.values() for word in text.split()} | {"mu", "nu", "xi"}
+    lemma_cache_path = str(tmp_path / "lemma_cache.json")
+    with open(lemma_cache_path, 'w', encoding='utf-8') as f:
+        json.dump({word: word for word in words}, f)
+    return docs_dir, str(tmp_path / "index"), lemma_cache_path
+
+
+def load_manifest(index_dir):
+    return woosh_Indexacao.load_manifest(woosh_Indexacao.manifest_path_for(index_dir))
+
+
+@pytest.mark.parametrize("mode", ["threads", "processes"])
+@pytest.mark.parametrize("stream_params", [PASSAGES, STREAMING])
+def test_full_build_seeds_manifest(corpus, mode, stream_params):
+    docs_dir, index_dir, lemma_cache_path = corpus
+    woosh_Indexacao.create_index(index_dir, docs_dir, mode=mode, num_workers=2, lemma_cache_path=lemma_cache_path,
+                                 stream_params=stream_params)
+    manifest = load_manifest(index_dir)
+    assert sorted(manifest) == sorted(os.path.join(docs_dir, name) for name in DOCUMENTS)
+    for file_path, entry in manifest.items():
+        assert entry["hash"] == woosh_Indexacao.file_hash(file_path)
+        assert entry["size"] == os.path.getsize(file_path)
+    assert manifest[os.path.join(docs_dir, "c.txt")]["passages"] == 0
+
+    stats = woosh_Indexacao.update_index(index_dir, docs_dir, num_workers=1, lemma_cache_path=lemma_cache_path,
+                                         stream_params=stream_params)
+    assert (stats["added"], stats["updated"], stats["deleted"], stats["unchanged"]) == (0, 0, 0, len(DOCUMENTS))
+
+
+def test_update_records_files_without_passages(corpus):
+    docs_dir, index_dir, lemma_cache_path = corpus
+    woosh_Indexacao.create_index(index_dir, docs_dir, lemma_cache_path=lemma_cache_path, stream_params=PASSAGES)
+    write_documents(docs_dir, {"d.txt": "of the", "e.txt": "mu nu xi mu"})
+
+    stats = woosh_Indexacao.update_index(index_dir, docs_dir, num_workers=1, lemma_cache_path=lemma_cache_path,
+                                         stream_params=PASSAGES)
+    assert stats["added"] == 2
+    manifest = load_manifest(index_dir)
+    assert manifest[os.path.join(docs_dir, "d.txt")]["passages"] == 0
+    assert manifest[os.path.join(docs_dir, "e.txt")]["passages"] == 2
+
+    stats = woosh_Indexacao.update_index(index_dir, docs_dir, num_workers=1, lemma_cache_path=lemma_cache_path,
+                                         stream_params=PASSAGES)
+    assert (stats["added"], stats["updated"], stats["unchanged"]) == (0, 0, len(DOCUMENTS) + 2)
+
+
+def test_combined_shards_rebuild_without_duplicates(corpus):
+    from whoosh.index import open_dir
+
+    docs_dir, index_dir, lemma_cache_path = corpus
+    for _ in range(2):
+        woosh_Indexacao.create_index(index_dir, docs_dir, mode="shards", num_shards=2,
+                                     lemma_cache_path=lemma_cache_path)
+        with open_dir(index_dir).searcher() as searcher:
+            doc_ids = [fields["doc_id"] for fields in searcher.all_stored_fields()]
+        assert len(doc_ids) == len(DOCUMENTS)
+        assert len(set(doc_ids)) == len(DOCUMENTS)
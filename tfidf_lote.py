@@ -0,0 +1,244 @@
+import glob
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+import numpy as np
+import preprocessamento
+import avaliacao
+import gabarito
+import registro
+import instrumentacao
+from instrumentacao import timer
+
+# Avaliação em lote: todos os documentos-fonte e todos os suspeitos viram
+# matrizes TF-IDF esparsas (CSR) com o mesmo vocabulário, e os vizinhos mais
+# próximos por cosseno saem de produtos de matrizes em blocos de linhas, em
+# vez de uma consulta por documento suspeito. O scipy só é importado aqui.
+
+DEFAULT_TOP_N = 10
+# Memória de trabalho de um bloco de suspeitos contra todas as fontes; o
+# número de linhas de cada bloco sai daí (chunk_bounds).
+DEFAULT_MAX_CHUNK_MB = 256
+# Bytes por célula da parte densa do bloco: a matriz de similaridades
+# (float32), a cópia negada para o argpartition e os índices int64 dele.
+DENSE_BYTES_PER_CELL = 4 + 4 + 8
+# Bytes por não-zero do produto esparso antes do toarray (valor float32 e
+# índice de coluna, int64 no pior caso).
+SPARSE_BYTES_PER_NNZ = 4 + 8
+
+
+def iter_tokens(file_paths, row_paths, num_workers=None, chunk_size=32, lemma_cache_path=None):
+    # Gerador: os tokens de cada arquivo assim que o seu lote sai do pool de
+    # processos da indexação do Whoosh (mesmo pré-processamento), sem guardar
+    # os lotes anteriores. Os lotes chegam na ordem em que terminam; o caminho
+    # de cada linha vai para row_paths, na mesma ordem.
+    from woosh_Indexacao import preprocess_in_pool
+
+    for processed, batch_metrics, cache_delta, _, _ in preprocess_in_pool(file_paths, num_workers, chunk_size,
+                                                                       lemma_cache_path):
+        instrumentacao.merge(batch_metrics)
+        preprocessamento.lemma_cache.update(cache_delta["entries"])
+        for file_path, _, content in processed:
+            row_paths.append(file_path)
+            yield content.split()
+
+
+def count_matrix(documents, vocabulary, grow=True):
+    # Matriz CSR de contagens (documentos x termos), montada documento a
+    # documento: só os buffers array('I') crescem. Com grow=False, termos fora
+    # do vocabulário são ignorados: eles só mudariam a norma do vetor da
+    # consulta, que não altera a ordem dos vizinhos.
+    from scipy import sparse
+
+    indices = array('I')
+    counts = array('I')
+    indptr = array('q', [0])
+    for tokens in documents:
+        with timer("index"):
+            term_counts = Counter(tokens)
+            if grow:
+                indices.extend(vocabulary.setdefault(term, len(vocabulary)) for term in term_counts)
+                counts.extend(term_counts.values())
+            else:
+                for term, count in term_counts.items():
+                    term_id = vocabulary.get(term)
+                    if term_id is not None:
+                        indices.append(term_id)
+                        counts.append(count)
+            indptr.append(len(indices))
+    matrix = sparse.csr_matrix((np.frombuffer(counts, dtype=np.uint32).astype(np.float32),
+                                np.frombuffer(indices, dtype=np.uint32).astype(np.int32),
+                                np.frombuffer(indptr, dtype=np.int64)),
+                               shape=(len(indptr) - 1, len(vocabulary)))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def smooth_idf(counts):
+    # idf = ln((1 + n) / (1 + df)) + 1, calculado só sobre as fontes.
+    doc_frequencies = np.bincount(counts.indices, minlength=counts.shape[1])
+    return (np.log((1 + counts.shape[0]) / (1 + doc_frequencies)) + 1).astype(np.float32)
+
+
+def tfidf(counts, idf, sublinear_tf=True):
+    # tf (1 + ln tf, com sublinear_tf) x idf, com as linhas normalizadas
+    # (norma L2): o produto de duas linhas é o cosseno.
+    matrix = counts.astype(np.float32, copy=True)
+    if sublinear_tf:
+        np.log(matrix.data, out=matrix.data)
+        matrix.data += 1
+    matrix.data *= idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    matrix.data /= np.repeat(np.where(norms > 0, norms, 1), np.diff(matrix.indptr)).astype(np.float32)
+    return matrix
+
+
+def build_matrices(source_tokens, suspicious_tokens, sublinear_tf=True):
+    # Vocabulário e idf vêm das fontes; devolve (fontes, suspeitos) em TF-IDF.
+    # Os suspeitos só são lidos depois de todas as fontes, com o vocabulário
+    # já fechado, então os dois podem ser geradores (iter_tokens).
+    vocabulary = {}
+    source_counts = count_matrix(source_tokens, vocabulary)
+    suspicious_counts = count_matrix(suspicious_tokens, vocabulary, grow=False)
+    with timer("index"):
+        suspicious_counts.resize((suspicious_counts.shape[0], len(vocabulary)))
+        idf = smooth_idf(source_counts)
+        return tfidf(source_counts, idf, sublinear_tf), tfidf(suspicious_counts, idf, sublinear_tf)
+
+
+def product_nnz(queries, sources_t):
+    # Limite superior dos não-zeros de cada linha de queries @ sources_t: a
+    # soma das frequências de documento dos termos da linha, até o número de
+    # fontes. Consultas longas com termos comuns chegam perto de uma linha
+    # densa também no produto esparso.
+    doc_frequencies = np.diff(sources_t.indptr).astype(np.float64)
+    pattern = queries.copy()
+    pattern.data = np.ones(len(pattern.data), dtype=np.float64)
+    return np.minimum(pattern @ doc_frequencies, sources_t.shape[1])
+
+
+def chunk_bounds(queries, sources_t, max_chunk_mb=DEFAULT_MAX_CHUNK_MB):
+    # Blocos (início, fim) de linhas consecutivas cujo custo estimado, parte
+    # densa mais o produto esparso, cabe em max_chunk_mb. Uma linha que sozinha
+    # passe do limite fica num bloco só dela.
+    row_bytes = DENSE_BYTES_PER_CELL * sources_t.shape[1] + SPARSE_BYTES_PER_NNZ * product_nnz(queries, sources_t)
+    cumulative = np.cumsum(row_bytes)
+    budget = max_chunk_mb * 1024 * 1024
+    start = 0
+    while start < len(cumulative):
+        used = cumulative[start - 1] if start else 0
+        end = max(start + 1, int(np.searchsorted(cumulative, used + budget, side='right')))
+        yield start, end
+        start = end
+
+
+def top_k_neighbours(queries, sources, top_n=DEFAULT_TOP_N, max_chunk_mb=DEFAULT_MAX_CHUNK_MB):
+    # Para cada linha de queries, os top_n índices de sources por cosseno.
+    # Cada bloco de linhas gera o produto esparso e a matriz densa (linhas x
+    # fontes), juntos em no máximo max_chunk_mb (chunk_bounds); devolve (ids,
+    # scores), ambos (consultas x top_n), com -1 e 0 onde não há vizinho com
+    # similaridade positiva.
+    sources_t = sources.T.tocsr()
+    num_queries, num_sources = queries.shape[0], sources.shape[0]
+    top_n = min(top_n, num_sources)
+    ids = np.full((num_queries, top_n), -1, dtype=np.int32)
+    scores = np.zeros((num_queries, top_n), dtype=np.float32)
+    for start, end in chunk_bounds(queries, sources_t, max_chunk_mb):
+        with timer("search"):
+            similarities = (queries[start:end] @ sources_t).toarray()
+        with timer("dedupe"):
+            if top_n < num_sources:
+                best = np.argpartition(-similarities, top_n - 1, axis=1)[:, :top_n]
+            else:
+                best = np.tile(np.arange(num_sources), (len(similarities), 1))
+            best_scores = np.take_along_axis(similarities, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            ids[start:start + len(best)] = np.where(best_scores > 0, best, -1)
+            scores[start:start + len(best)] = np.where(best_scores > 0, best_scores, 0)
+        instrumentacao.count("queries", len(best))
+    return ids, scores
+
+
+def search_all(source_paths, suspicious_paths, top_n=DEFAULT_TOP_N, num_workers=None, lemma_cache_path=None,
+               max_chunk_mb=DEFAULT_MAX_CHUNK_MB, sublinear_tf=True):
+    # Resultados no formato de calculate_precision_recall_at_k e de
+    # avaliacao.evaluate: [{'file': ..., 'retrieved_documents': [{'filename', 'score'}]}].
+    # Na ordem de suspicious_paths; arquivos ilegíveis ficam de fora.
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.load(lemma_cache_path)
+    source_rows = []
+    suspicious_rows = []
+    sources, queries = build_matrices(
+        iter_tokens(list(source_paths), source_rows, num_workers, lemma_cache_path=lemma_cache_path),
+        iter_tokens(list(suspicious_paths), suspicious_rows, num_workers, lemma_cache_path=lemma_cache_path),
+        sublinear_tf)
+    ids, scores = top_k_neighbours(queries, sources, top_n, max_chunk_mb)
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.save(lemma_cache_path)
+
+    # Registro em memória: o ID de cada fonte é a sua linha na matriz.
+    registry = registro.DocRegistry()
+    for path in source_rows:
+        registry.register(path)
+    results = []
+    for path, row_ids, row_scores in zip(suspicious_rows, ids, scores):
+        found = row_ids >= 0
+        results.append({
+            "file": path,
+            "retrieved_documents": registro.retrieved_documents(
+                registry, registro.result_array(zip(row_ids[found].tolist(), row_scores[found].tolist()))),
+        })
+    position = {path: i for i, path in enumerate(suspicious_paths)}
+    results.sort(key=lambda result: position[result["file"]])
+    return results
+
+
+def calculate_precision_recall_at_k(relevant_documents, retrieved_documents, k_values):
+    evaluation = avaliacao.evaluate(relevant_documents, retrieved_documents, k_values)
+    return evaluation["macro"]["precision"], evaluation["macro"]["recall"]
+
+
+def parse_args(argv=None):
+    import argparse
+
+    base_path = r"C:\Users\zin\Downloads\pan-plagiarism-corpus-2011"
+    parser = argparse.ArgumentParser(description="Vizinhos por cosseno TF-IDF de todos os documentos suspeitos "
+                                                 "contra todas as fontes, em lote.")
+    parser.add_argument("--sources", default=os.path.join(base_path, "external-detection-corpus",
+                                                          "source-document"), help="diretório das fontes")
+    parser.add_argument("--suspicious", default=os.path.join(base_path, "external-detection-corpus",
+                                                             "suspicious-document"),
+                        help="diretório dos documentos suspeitos")
+    parser.add_argument("--ground-truth", default=base_path, help="diretório com as anotações (gabarito)")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_N, help="vizinhos por documento suspeito")
+    parser.add_argument("--workers", type=int, default=None, help="processos de pré-processamento")
+    parser.add_argument("--max-chunk-mb", type=int, default=DEFAULT_MAX_CHUNK_MB,
+                        help="memória de trabalho de cada bloco (produto esparso e matriz densa)")
+    parser.add_argument("--lemma-cache", default=None, help="arquivo do cache de lemas")
+    return parser.parse_args(argv)
+
+
+def main_lote(args):
+    source_paths = sorted(glob.glob(os.path.join(args.sources, "**", "*.txt"), recursive=True))
+    suspicious_paths = sorted(glob.glob(os.path.join(args.suspicious, "**", "*.txt"), recursive=True))
+    print(f"Fontes: {len(source_paths)}, documentos suspeitos: {len(suspicious_paths)}")
+    start_time = time.time()
+    results = search_all(source_paths, suspicious_paths, args.top, args.workers, args.lemma_cache,
+                         args.max_chunk_mb)
+    print(f"Vizinhos calculados em {time.time() - start_time:.2f} segundos")
+
+    relevant_documents = gabarito.get_suspicious_documents(args.ground_truth)
+    k_values = [k for k in avaliacao.DEFAULT_K_VALUES if k <= args.top] or [args.top]
+    precision, recall = calculate_precision_recall_at_k(relevant_documents, results, k_values)
+    for k, p, r in zip(k_values, precision, recall):
+        print(f"P@{k} = {p:.4f}, R@{k} = {r:.4f}")
+
+
+if __name__ == "__main__":
+    with instrumentacao.session("tfidf_lote"):
+        main_lote(parse_args())
+    sys.exit(0)
@@ -1,87 +1,677 @@
 import os
 import time
-import re
-from concurrent.futures import ThreadPoolExecutor
-from whoosh.index import create_in, open_dir
-from whoosh.fields import Schema, TEXT, ID
+import json
+import hashlib
+import shutil
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from whoosh.index import create_in, open_dir, exists_in
+from whoosh.fields import Schema, TEXT, NUMERIC
 from whoosh.analysis import StemmingAnalyzer
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from whoosh.query import Every
+import preprocessamento
+import minhash
+import registro
+from registro import SHARDS_MANIFEST
+import instrumentacao
+from instrumentacao import timer, PREPROCESS_STAGES
+from preprocessamento import preprocess_text
 
 
 
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
+def create_schema(passages=False):
+    # O índice guarda só o ID inteiro do arquivo; o caminho fica no registro
+    # de documentos (registro.DocRegistry, em index_dir/docs.registry).
+    if passages:
+        # Cada trecho é um documento; a busca agrupa os trechos pelo doc_id,
+        # que por isso fica ordenável (coluna), e o número do trecho é guardado.
+        return Schema(
+            doc_id=NUMERIC(bits=32, stored=True, sortable=True),
+            passage=NUMERIC(stored=True),
+            content=TEXT(analyzer=StemmingAnalyzer(), stored=False),
+        )
+    return Schema(
+        doc_id=NUMERIC(bits=32, stored=True, unique=True),
+        content=TEXT(analyzer=StemmingAnalyzer(), stored=False),
+    )
 
 
-def preprocess_text(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z\s]', '', text)
-    words = text.split()
-    processed_words = [
-        lemmatizer.lemmatize(word) for word in words if word not in stop_words
-    ]
 
-    return processed_words
+def iter_files(docs_dir):
+    for root, _, files in os.walk(docs_dir):
+        for file in files:
+            yield os.path.join(root, file)
 
 
+def chunked(iterable, chunk_size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_passage_tokens(file_path, stream_params=None, digest=None):
+    # Gera (número do trecho, tokens) de um arquivo. stream_params aceita
+    # read_chunk_size (lê o arquivo em blocos em vez de f.read()) e
+    # passage_size/passage_overlap (divide o documento em trechos
+    # sobrepostos). Sem trechos, o documento inteiro sai com número None.
+    # Com digest, o hash do arquivo fica completo quando os trechos acabam.
+    stream_params = stream_params or {}
+    read_chunk_size = stream_params.get("read_chunk_size")
+    passage_size = stream_params.get("passage_size")
+    if read_chunk_size:
+        tokens = preprocessamento.stream_tokens(file_path, read_chunk_size, digest=digest)
+    else:
+        with preprocessamento.open_text(file_path, digest) as f:
+            with timer("read"):
+                content = f.read()
+        tokens = preprocess_text(content)
+        del content
+    if passage_size:
+        return enumerate(preprocessamento.iter_passages(tokens, passage_size,
+                                                        stream_params.get("passage_overlap", 0)))
+    return [(None, list(tokens))]
+
+
+def document_fields(doc_id, passage, content):
+    if passage is None:
+        return {"doc_id": doc_id, "content": content}
+    return {"doc_id": doc_id, "passage": passage, "content": content}
 
-def create_schema():
-    return Schema(
-        path=ID(stored=True, unique=True),
-        content=TEXT(analyzer=StemmingAnalyzer(), stored=False),
-    )
 
+def preprocess_files(file_paths, lsh_params=None, stream_params=None):
+    # Executado nos processos de trabalho: lê e lematiza um lote de arquivos
+    # e devolve os textos já unidos (um por trecho), junto com as medições do
+    # lote (instrumentacao.drain) e a entrada do manifesto de cada arquivo
+    # processado, mesmo sem trechos. Com lsh_params, também calcula as
+    # assinaturas MinHash de cada arquivo.
+    processed = []
+    signatures = []
+    entries = {}
+    stats_before = preprocessamento.cache_stats()
+    for file_path in file_paths:
+        try:
+            band_hash_parts = []
+            stat = os.stat(file_path)
+            digest = hashlib.sha1()
+            passages = 0
+            for passage, tokens in iter_passage_tokens(file_path, stream_params, digest):
+                processed.append((file_path, passage, " ".join(tokens)))
+                passages += 1
+                instrumentacao.count("passages")
+                if lsh_params is not None:
+                    band_hash_parts.append(minhash.compute_band_hashes(tokens, lsh_params))
+            entries[file_path] = manifest_entry(stat, digest, passages)
+            instrumentacao.count("documents")
+            if band_hash_parts:
+                signatures.append((file_path, np.concatenate(band_hash_parts)))
+        except Exception as e:
+            print(f"Erro ao processar o arquivo {file_path}: {e}")
+    stats_after = preprocessamento.cache_stats()
+    cache_delta = {
+        "entries": preprocessamento.lemma_cache.drain_new_entries(),
+        "hits": stats_after["hits"] - stats_before["hits"],
+        "misses": stats_after["misses"] - stats_before["misses"],
+    }
+    return processed, instrumentacao.drain(), cache_delta, signatures, entries
 
 
-def create_index(index_dir, docs_dir, num_threads=4):
+def open_or_create_index(index_dir, stream_params=None):
+    passages = bool((stream_params or {}).get("passage_size"))
     if not os.path.exists(index_dir):
         os.makedirs(index_dir)
-    if not os.listdir(index_dir):
-        idx = create_in(index_dir, create_schema())
+    if not exists_in(index_dir):
+        return create_in(index_dir, create_schema(passages))
+    idx = open_dir(index_dir)
+    if "doc_id" not in idx.schema:
+        raise ValueError("Índice inválido. Ele guarda o caminho completo de cada arquivo (formato antigo); "
+                         "recrie-o para usar o registro de documentos.")
+    if ("passage" in idx.schema) != passages:
+        raise ValueError("passage_size inválido. O índice existente foi criado "
+                         + ("com" if "passage" in idx.schema else "sem") + " trechos.")
+    return idx
+
+
+# Perfis do writer. limitmb é a memória de cada writer antes de despejar um
+# lote ordenado em disco; procs > 1 usa o MpWriter (um sub-writer por
+# processo, recebendo writer_batch documentos por vez) e, com multisegment,
+# cada sub-writer vira um segmento sem merge no commit. batch_size é o
+# número de arquivos por lote enviado aos processos de pré-processamento.
+# merge é o passo após o build: "none" mantém todos os segmentos (build
+# mais rápido, busca mais lenta), "tiered" junta só os segmentos pequenos
+# (política MERGE_SMALL do Whoosh) e "optimize" reescreve tudo num segmento.
+WRITER_PROFILES = {
+    "tiered": {"limitmb": 128, "procs": 1, "multisegment": False, "writer_batch": 100, "batch_size": 32,
+               "merge": "tiered"},
+    "multisegment": {"limitmb": 128, "procs": 4, "multisegment": True, "writer_batch": 100, "batch_size": 32,
+                     "merge": "none"},
+    "bulk": {"limitmb": 512, "procs": 4, "multisegment": True, "writer_batch": 500, "batch_size": 128,
+             "merge": "optimize"},
+    "low_memory": {"limitmb": 32, "procs": 1, "multisegment": False, "writer_batch": 100, "batch_size": 8,
+                   "merge": "tiered"},
+}
+DEFAULT_WRITER_PROFILE = "tiered"
+MERGE_POLICIES = ("none", "tiered", "optimize")
+
+
+def writer_profile(profile=None, **overrides):
+    # Aceita o nome de um perfil ou um dicionário parcial (completado com o
+    # perfil padrão). Overrides com valor None são ignorados.
+    if profile is None:
+        profile = DEFAULT_WRITER_PROFILE
+    if isinstance(profile, str):
+        if profile not in WRITER_PROFILES:
+            raise ValueError("Perfil de escrita inválido. Escolha " + ", ".join(WRITER_PROFILES) + ".")
+        profile = WRITER_PROFILES[profile]
+    resolved = dict(WRITER_PROFILES[DEFAULT_WRITER_PROFILE], **profile)
+    resolved.update({key: value for key, value in overrides.items() if value is not None})
+    if resolved["merge"] not in MERGE_POLICIES:
+        raise ValueError("Política de merge inválida. Escolha 'none', 'tiered' ou 'optimize'.")
+    return resolved
+
+
+def open_writer(idx, profile):
+    if profile["procs"] > 1:
+        return idx.writer(procs=profile["procs"], limitmb=profile["limitmb"],
+                          multisegment=profile["multisegment"], batchsize=profile["writer_batch"])
+    return idx.writer(limitmb=profile["limitmb"])
+
+
+def finish_index(idx, writer, profile):
+    # O commit do build nunca faz merge (com multisegment o MpWriter ignoraria
+    # os novos segmentos de qualquer forma); o merge é um passo à parte.
+    with timer("merge"):
+        writer.commit(merge=False)
+        merge_segments(idx, profile)
+
+
+def merge_segments(idx, profile):
+    if profile["merge"] == "none":
+        return
+    writer = idx.writer(limitmb=profile["limitmb"])
+    if profile["merge"] == "optimize":
+        writer.commit(optimize=True)
     else:
-        idx = open_dir(index_dir)
+        writer.commit(merge=True)
 
-    writer = idx.writer(procs=num_threads, multisegment=True)
 
-    total_preprocess_time = 0
-    total_indexing_time = 0
-    doc_count = 0
+def segment_count(idx):
+    with idx.reader() as reader:
+        return sum(1 for _ in reader.leaf_readers())
+
+
+def shard_for(file_path, num_shards):
+    # Partição estável pelo nome do arquivo (não depende do diretório).
+    digest = hashlib.md5(os.path.basename(file_path).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little') % num_shards
+
+
+def preprocess_in_pool(file_paths, num_workers=None, chunk_size=32, lemma_cache_path=None, lsh_params=None,
+                       stream_params=None):
+    # Gerador: devolve (processados, tempo, delta do cache, assinaturas,
+    # entradas do manifesto) para cada lote assim que ele termina.
+    num_workers = num_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=preprocessamento.init_worker,
+                             initargs=(lemma_cache_path,)) as executor:
+        pending = set()
+        for chunk in chunked(file_paths, chunk_size):
+            pending.add(executor.submit(preprocess_files, chunk, lsh_params, stream_params))
+            # Limita os lotes em andamento para não acumular o corpus na memória.
+            if len(pending) >= num_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def create_index(index_dir, docs_dir, num_threads=4, mode="threads", num_workers=None, chunk_size=None,
+                 lemma_cache_path=None, lsh_dir=None, lsh_params=None, stream_params=None, profile=None,
+                 num_shards=None, combine_shards=True):
+    # stream_params: ver iter_passage_tokens. Com read_chunk_size e
+    # passage_size, nenhum arquivo fica inteiro na memória, qualquer que seja
+    # o seu tamanho. profile: nome em WRITER_PROFILES ou dicionário parcial;
+    # chunk_size, se dado, substitui o batch_size do perfil.
+    profile = writer_profile(profile, batch_size=chunk_size)
+    if mode == "processes":
+        return create_index_multiprocess(index_dir, docs_dir, num_workers=num_workers,
+                                         lemma_cache_path=lemma_cache_path, lsh_dir=lsh_dir,
+                                         lsh_params=lsh_params, stream_params=stream_params, profile=profile)
+    if mode == "shards":
+        return create_index_sharded(index_dir, docs_dir, num_shards=num_shards or num_workers,
+                                    lemma_cache_path=lemma_cache_path, lsh_dir=lsh_dir, lsh_params=lsh_params,
+                                    stream_params=stream_params, profile=profile, combine=combine_shards)
+    if mode != "threads":
+        raise ValueError("Modo inválido. Escolha 'threads', 'processes' ou 'shards'.")
+
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.load(lemma_cache_path)
+
+    idx = open_or_create_index(index_dir, stream_params)
+    registry = registro.DocRegistry.for_index(index_dir)
+    writer = open_writer(idx, profile)
+    lsh = minhash.MinHashLSH(**(lsh_params or {})) if lsh_dir else None
+
+    # Tempos e contagem vêm da instrumentação (segura entre threads); a
+    # diferença entre os snapshots isola esta execução.
+    before = instrumentacao.snapshot()
+    lsh_lock = threading.Lock()
+    # Nem o SegmentWriter nem o MpWriter aceitam add_document concorrente
+    # (o buffer do MpWriter chegava a enviar o mesmo lote duas vezes); as
+    # threads paralelizam só a leitura e o pré-processamento.
+    writer_lock = threading.Lock()
+    manifest = {}
 
     def process_file(file_path):
-        nonlocal total_preprocess_time, total_indexing_time, doc_count
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                start_preprocess = time.time()
-                processed_content = preprocess_text(content)
-                end_preprocess = time.time()
-                total_preprocess_time += (end_preprocess - start_preprocess)
-                start_indexing = time.time()
-                writer.add_document(path=file_path, content=" ".join(processed_content))
-                end_indexing = time.time()
-                total_indexing_time += (end_indexing - start_indexing)
-                doc_count += 1
+            band_hash_parts = []
+            doc_id = registry.register(file_path)
+            stat = os.stat(file_path)
+            digest = hashlib.sha1()
+            passages = 0
+            for passage, tokens in iter_passage_tokens(file_path, stream_params, digest):
+                fields = document_fields(doc_id, passage, " ".join(tokens))
+                with writer_lock, timer("index"):
+                    writer.add_document(**fields)
+                passages += 1
+                instrumentacao.count("passages")
+                if lsh:
+                    band_hash_parts.append(lsh.band_hashes(tokens))
+            if band_hash_parts:
+                with lsh_lock:
+                    lsh.add(file_path, np.concatenate(band_hash_parts))
+            manifest[file_path] = manifest_entry(stat, digest, passages)
+            instrumentacao.count("documents")
         except Exception as e:
             print(f"Erro ao processar o arquivo {file_path}: {e}")
 
     with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        for root, _, files in os.walk(docs_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                executor.submit(process_file, file_path)
+        for file_path in iter_files(docs_dir):
+            executor.submit(process_file, file_path)
+
+    finish_index(idx, writer, profile)
+    registry.save()
+    save_manifest(manifest_path_for(index_dir), manifest)
+    if lsh:
+        lsh.save(lsh_dir)
+
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.save(lemma_cache_path)
+    print_cache_stats(preprocessamento.cache_stats())
+
+    run = instrumentacao.difference(instrumentacao.snapshot(), before)
+    return (instrumentacao.stage_total(run, *PREPROCESS_STAGES), instrumentacao.stage_total(run, "index", "merge"),
+            run["counters"].get("documents", 0))
+
+
+def print_cache_stats(stats):
+    print(f"Cache de lemas: {stats['hits']} acertos, {stats['misses']} falhas "
+          f"(taxa de acerto: {stats['hit_rate']:.2%})")
+
+
+def create_index_multiprocess(index_dir, docs_dir, num_workers=None, chunk_size=None, lemma_cache_path=None,
+                              lsh_dir=None, lsh_params=None, stream_params=None, profile=None):
+    # Os processos de trabalho fazem a leitura e a lematização em lotes; apenas
+    # este processo escreve no índice, então não há disputa pelo writer.
+    profile = writer_profile(profile, batch_size=chunk_size)
+    idx = open_or_create_index(index_dir, stream_params)
+    registry = registro.DocRegistry.for_index(index_dir)
+    writer = open_writer(idx, profile)
+    lsh = minhash.MinHashLSH(**(lsh_params or {})) if lsh_dir else None
+
+    total_preprocess_time = 0
+    total_indexing_time = 0
+    doc_count = 0
+    cache_hits = 0
+    cache_misses = 0
+    manifest = {}
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.load(lemma_cache_path)
+
+    def write_batch(processed, batch_metrics, cache_delta, signatures, entries):
+        nonlocal total_preprocess_time, total_indexing_time, doc_count, cache_hits, cache_misses
+        instrumentacao.merge(batch_metrics)
+        total_preprocess_time += instrumentacao.stage_total(batch_metrics, *PREPROCESS_STAGES)
+        doc_count += batch_metrics["counters"].get("documents", 0)
+        cache_hits += cache_delta["hits"]
+        cache_misses += cache_delta["misses"]
+        preprocessamento.lemma_cache.update(cache_delta["entries"])
+        start_indexing = time.perf_counter()
+        for file_path, passage, processed_content in processed:
+            with timer("index"):
+                writer.add_document(**document_fields(registry.register(file_path), passage, processed_content))
+        manifest.update(entries)
+        total_indexing_time += time.perf_counter() - start_indexing
+        for file_path, band_hashes in signatures:
+            lsh.add(file_path, band_hashes)
 
-    writer.commit()
+    try:
+        for batch in preprocess_in_pool(iter_files(docs_dir), num_workers, profile["batch_size"], lemma_cache_path,
+                                        lsh.params() if lsh else None, stream_params):
+            write_batch(*batch)
+    except BaseException:
+        writer.cancel()
+        raise
+
+    start_merge = time.perf_counter()
+    finish_index(idx, writer, profile)
+    total_indexing_time += time.perf_counter() - start_merge
+    registry.save()
+    save_manifest(manifest_path_for(index_dir), manifest)
+    if lsh:
+        lsh.save(lsh_dir)
+
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.save(lemma_cache_path)
+    total_lookups = cache_hits + cache_misses
+    print_cache_stats({
+        "hits": cache_hits,
+        "misses": cache_misses,
+        "hit_rate": cache_hits / total_lookups if total_lookups else 0,
+    })
 
     return total_preprocess_time, total_indexing_time, doc_count
 
 
-def main_indexacao():
+def build_shard(shard_dir, doc_ids, profile, lemma_cache_path=None, lsh_params=None, stream_params=None,
+                merge=False):
+    # Executado num processo por shard: pré-processa e indexa a sua parte dos
+    # arquivos num índice próprio. Sem merge, os segmentos ficam como estão
+    # (o merge é feito no índice final); com merge, o perfil é aplicado ao
+    # próprio shard. doc_ids mapeia cada arquivo do shard ao seu ID global.
+    # Devolve (diretório, entradas do manifesto, assinaturas MinHash, medições).
+    preprocessamento.init_worker(lemma_cache_path)
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    idx = open_or_create_index(shard_dir, stream_params)
+    writer = open_writer(idx, dict(profile, procs=1))
+    shard_signatures = []
+    manifest = {}
+    try:
+        for chunk in chunked(doc_ids, profile["batch_size"]):
+            processed, batch_metrics, _, signatures, entries = preprocess_files(chunk, lsh_params, stream_params)
+            instrumentacao.merge(batch_metrics)
+            shard_signatures.extend(signatures)
+            for file_path, passage, processed_content in processed:
+                with timer("index"):
+                    writer.add_document(**document_fields(doc_ids[file_path], passage, processed_content))
+            manifest.update(entries)
+    except BaseException:
+        writer.cancel()
+        raise
+    if merge:
+        finish_index(idx, writer, profile)
+    else:
+        with timer("index"):
+            writer.commit(merge=False)
+    return shard_dir, manifest, shard_signatures, instrumentacao.drain()
+
+
+def build_shards(shards_root, docs_dir, registry, num_shards=None, profile=None, lemma_cache_path=None,
+                 lsh_params=None, stream_params=None, merge=False):
+    # Divide os arquivos por hash do nome e constrói um índice por shard em
+    # paralelo, em shards_root/shard-NN. Os IDs são atribuídos aqui, no
+    # registro compartilhado, antes da divisão. Gerador: devolve o resultado
+    # de build_shard de cada shard assim que ele termina.
+    num_shards = num_shards or os.cpu_count() or 1
+    profile = writer_profile(profile)
+    groups = [{} for _ in range(num_shards)]
+    for file_path in iter_files(docs_dir):
+        groups[shard_for(file_path, num_shards)][file_path] = registry.register(file_path)
+    shard_dirs = [os.path.join(shards_root, f"shard-{shard:02d}") for shard in range(num_shards)]
+    with ProcessPoolExecutor(max_workers=num_shards) as executor:
+        futures = [executor.submit(build_shard, shard_dir, group, profile, lemma_cache_path, lsh_params,
+                                   stream_params, merge)
+                   for shard_dir, group in zip(shard_dirs, groups)]
+        for future in futures:
+            yield future.result()
+
+
+
+
+def create_index_sharded(index_dir, docs_dir, num_shards=None, lemma_cache_path=None, lsh_dir=None,
+                         lsh_params=None, stream_params=None, profile=None, combine=True):
+    # Constrói os shards em paralelo. Com combine, junta tudo em index_dir com
+    # writer.add_reader (cópia direta dos postings, sem reanalisar o texto) e
+    # o perfil decide o merge final. Sem combine, os shards ficam em
+    # index_dir/shard-NN, cada um com o merge do perfil, e index_dir/shards.json
+    # os lista para a busca scatter-gather (woosh_busca.ShardedIndex).
+    profile = writer_profile(profile)
+    shards_root = index_dir.rstrip(os.sep) + "-shards" if combine else index_dir
+    if combine:
+        idx = open_or_create_index(index_dir, stream_params)
+    elif exists_in(index_dir):
+        raise ValueError("index_dir inválido. Já existe um índice único neste diretório.")
+    else:
+        os.makedirs(index_dir, exist_ok=True)
+    registry = registro.DocRegistry.for_index(index_dir)
+    lsh = minhash.MinHashLSH(**(lsh_params or {})) if lsh_dir else None
+    before = instrumentacao.snapshot()
+
+    shard_dirs = []
+    manifest = {}
+    for shard_dir, shard_manifest, signatures, shard_metrics in build_shards(shards_root, docs_dir, registry, num_shards, profile,
+                                                             lemma_cache_path, lsh.params() if lsh else None,
+                                                             stream_params, merge=not combine):
+        instrumentacao.merge(shard_metrics)
+        shard_dirs.append(shard_dir)
+        manifest.update(shard_manifest)
+        for file_path, band_hashes in signatures:
+            lsh.add(file_path, band_hashes)
+
+    if combine:
+        writer = idx.writer(limitmb=profile["limitmb"])
+        try:
+            with timer("merge"):
+                # O add_reader só acrescenta: os documentos de um build
+                # anterior saem na mesma transação, então repetir o build não
+                # duplica nada e uma falha deixa o índice antigo intacto.
+                writer.delete_by_query(Every())
+                for shard_dir in shard_dirs:
+                    with open_dir(shard_dir).reader() as reader:
+                        writer.add_reader(reader)
+        except BaseException:
+            writer.cancel()
+            raise
+        finish_index(idx, writer, profile)
+        shutil.rmtree(shards_root, ignore_errors=True)
+        save_manifest(manifest_path_for(index_dir), manifest)
+    else:
+        save_manifest(os.path.join(index_dir, SHARDS_MANIFEST),
+                      {"shards": [os.path.basename(shard_dir) for shard_dir in shard_dirs]})
+    registry.save()
+    if lsh:
+        lsh.save(lsh_dir)
+
+    run = instrumentacao.difference(instrumentacao.snapshot(), before)
+    return (instrumentacao.stage_total(run, *PREPROCESS_STAGES), instrumentacao.stage_total(run, "index", "merge"),
+            run["counters"].get("documents", 0))
+
+
+def build_lsh_index(docs_dir, lsh_dir, num_workers=None, chunk_size=32, lemma_cache_path=None, lsh_params=None,
+                    stream_params=None):
+    # Gera só o índice MinHash/LSH, sem tocar no índice Whoosh (útil para um
+    # índice já existente ou para o caminho do Elasticsearch).
+    lsh = minhash.MinHashLSH(**(lsh_params or {}))
+    doc_count = 0
+    for _, batch_metrics, _, signatures, _ in preprocess_in_pool(iter_files(docs_dir), num_workers, chunk_size,
+                                                              lemma_cache_path, lsh.params(), stream_params):
+        instrumentacao.merge(batch_metrics)
+        for file_path, band_hashes in signatures:
+            lsh.add(file_path, band_hashes)
+            doc_count += 1
+    lsh.save(lsh_dir)
+    return doc_count
+
+
+def file_hash(file_path, block_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_path_for(index_dir):
+    return os.path.join(index_dir, "manifest.json")
+
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest_path, manifest):
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def manifest_entry(stat, digest, passages):
+    # Estado de um arquivo indexado: os.stat de antes da leitura, o hash
+    # calculado durante ela e quantos trechos (ou documentos) ele gerou. Um
+    # arquivo sem trechos também entra, com passages 0, para não ser tomado
+    # por novo a cada reindexação.
+    return {"mtime": stat.st_mtime, "size": stat.st_size, "hash": digest.hexdigest(), "passages": passages}
+
+
+def detect_changes(docs_dir, manifest):
+    # mtime e tamanho iguais bastam para considerar o arquivo inalterado; o
+    # hash só é calculado quando um deles mudou.
+    changed = {}
+    unchanged = {}
+    for file_path in iter_files(docs_dir):
+        stat = os.stat(file_path)
+        entry = manifest.get(file_path)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            unchanged[file_path] = entry
+            continue
+        new_entry = {"mtime": stat.st_mtime, "size": stat.st_size, "hash": file_hash(file_path)}
+        if entry and entry["hash"] == new_entry["hash"]:
+            unchanged[file_path] = dict(entry, **new_entry)
+        else:
+            changed[file_path] = new_entry
+    removed = [file_path for file_path in manifest if file_path not in changed and file_path not in unchanged]
+    return changed, unchanged, removed
+
+
+def update_index(index_dir, docs_dir, manifest_path=None, num_workers=None, chunk_size=None,
+                 lemma_cache_path=None, optimize=False, stream_params=None, profile=None, lsh_dir=None):
+    # Reindexação incremental: só arquivos novos ou alterados são processados,
+    # via update_document no campo único doc_id, e os removidos são apagados
+    # (o ID continua reservado no registro).
+    # Num índice por trechos, os trechos antigos do arquivo são apagados antes
+    # de os novos serem adicionados. O writer segue o perfil (com um processo
+    # só, por causa das remoções) e o merge final é o do perfil, ou optimize.
+    # Com lsh_dir, o índice MinHash/LSH existente perde os arquivos removidos
+    # ou alterados e ganha as assinaturas novas.
+    if os.path.exists(os.path.join(index_dir, SHARDS_MANIFEST)):
+        raise ValueError("Reindexação incremental inválida para um índice em shards. Reconstrua os shards.")
+    profile = writer_profile(profile, batch_size=chunk_size)
+    if optimize:
+        profile = dict(profile, merge="optimize")
+    lsh = None
+    if lsh_dir:
+        if not os.path.exists(os.path.join(lsh_dir, "meta.json")):
+            raise ValueError(f"lsh_dir inválido. Não há índice MinHash/LSH em {lsh_dir}; construa-o com o índice.")
+        lsh = minhash.MinHashLSH.load(lsh_dir)
+    manifest_path = manifest_path or manifest_path_for(index_dir)
+    manifest = load_manifest(manifest_path)
+    idx = open_or_create_index(index_dir, stream_params)
+    registry = registro.DocRegistry.for_index(index_dir)
+
+    changed, new_manifest, removed = detect_changes(docs_dir, manifest)
+    stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": len(new_manifest),
+             "preprocess_time": 0, "indexing_time": 0}
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.load(lemma_cache_path)
+
+    if lsh:
+        lsh.remove(list(removed) + list(changed))
+    writer = open_writer(idx, dict(profile, procs=1))
+    try:
+        for file_path in removed:
+            doc_id = registry.id_of(file_path)
+            if doc_id is not None:
+                writer.delete_by_term('doc_id', doc_id)
+            stats["deleted"] += 1
+        if "passage" in idx.schema:
+            for file_path in changed:
+                doc_id = registry.id_of(file_path)
+                if doc_id is not None:
+                    writer.delete_by_term('doc_id', doc_id)
+
+        for processed, batch_metrics, cache_delta, signatures, entries in preprocess_in_pool(
+                list(changed), num_workers, profile["batch_size"], lemma_cache_path,
+                lsh.params() if lsh else None, stream_params):
+            instrumentacao.merge(batch_metrics)
+            stats["preprocess_time"] += instrumentacao.stage_total(batch_metrics, *PREPROCESS_STAGES)
+            preprocessamento.lemma_cache.update(cache_delta["entries"])
+            start_indexing = time.time()
+            for file_path, passage, processed_content in processed:
+                doc_id = registry.register(file_path)
+                with timer("index"):
+                    if passage is None:
+                        writer.update_document(doc_id=doc_id, content=processed_content)
+                    else:
+                        writer.add_document(**document_fields(doc_id, passage, processed_content))
+            # Pelas entradas, e não pelos trechos: um arquivo sem trechos
+            # também fica no manifesto.
+            for file_path, entry in entries.items():
+                stats["updated" if file_path in manifest else "added"] += 1
+                new_manifest[file_path] = entry
+            stats["indexing_time"] += time.time() - start_indexing
+            for file_path, band_hashes in signatures:
+                lsh.add(file_path, band_hashes)
+    except BaseException:
+        writer.cancel()
+        raise
+
+    finish_index(idx, writer, profile)
+    # O manifesto só é gravado depois do commit, para não marcar como
+    # indexado algo que não chegou ao índice.
+    registry.save()
+    save_manifest(manifest_path, new_manifest)
+    if lsh:
+        lsh.save(lsh_dir)
+    if lemma_cache_path:
+        preprocessamento.lemma_cache.save(lemma_cache_path)
+
+    return stats
+
+
+
+def main_indexacao(incremental=False, streaming=False, profile=None, num_shards=None, combine_shards=True):
+    stream_params = preprocessamento.STREAMING_PARAMS if streaming else None
     index_dir = os.path.join(os.getcwd(), "index")
+    lemma_cache_path = os.path.join(os.getcwd(), "lemma_cache.json")
+    lsh_dir = os.path.join(os.getcwd(), "lsh")
     docs_dir = r'C:\Users\zin\Downloads\pan-plagiarism-corpus-2011\external-detection-corpus\source-document'
 
+    if incremental:
+        print("Iniciando a reindexação incremental...")
+        stats = update_index(index_dir, docs_dir, lemma_cache_path=lemma_cache_path, optimize=True,
+                             stream_params=stream_params, profile=profile,
+                             lsh_dir=lsh_dir if os.path.isdir(lsh_dir) else None)
+        print(f"Adicionados: {stats['added']}, atualizados: {stats['updated']}, "
+              f"removidos: {stats['deleted']}, inalterados: {stats['unchanged']}")
+        return
+
     print("Iniciando a indexação...")
-    total_preprocess_time, total_indexing_time, doc_count = create_index(index_dir, docs_dir, num_threads=4)
+    total_preprocess_time, total_indexing_time, doc_count = create_index(index_dir, docs_dir,
+                                                                       mode="shards" if num_shards else "processes",
+                                                                       lemma_cache_path=lemma_cache_path,
+                                                                       lsh_dir=lsh_dir,
+                                                                       stream_params=stream_params,
+                                                                       profile=profile, num_shards=num_shards,
+                                                                       combine_shards=combine_shards)
 
 
     avg_preprocess_time = total_preprocess_time / doc_count if doc_count > 0 else 0
@@ -92,9 +682,27 @@ def main_indexacao():
     print(f"Tempo médio de indexação por documento: {avg_indexing_time:.4f} segundos")
 
 
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Indexação do corpus PAN no Whoosh.")
+    parser.add_argument("--incremental", action="store_true", help="reindexa só os arquivos alterados")
+    parser.add_argument("--streaming", action="store_true", help="lê em blocos e indexa trechos sobrepostos")
+    parser.add_argument("--profile", choices=sorted(WRITER_PROFILES), default=DEFAULT_WRITER_PROFILE,
+                        help="perfil do writer (memória, processos, lotes e merge final)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="constrói N shards em paralelo e junta-os no índice final")
+    parser.add_argument("--keep-shards", action="store_true",
+                        help="com --shards, mantém os shards separados para a busca scatter-gather")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
     start_time = time.time()
-    main_indexacao()
+    with instrumentacao.session("indexacao"):
+        main_indexacao(incremental=args.incremental, streaming=args.streaming, profile=args.profile,
+                       num_shards=args.shards, combine_shards=not args.keep_shards)
     end_time = time.time()
 
     execution_time = end_time - start_time
@@ -1,70 +1,54 @@
-import json
 import os
+import sys
 import time
-import nltk
-import re
-import matplotlib.pyplot as plt
+import glob
+import heapq
+import json
+import math
+from whoosh import scoring
 from whoosh.index import open_dir
 from whoosh.qparser import QueryParser
-from nltk.corpus import stopwords, wordnet
-from nltk.tokenize import word_tokenize
+from whoosh.query import And, Or, Term
+from whoosh.searching import Searcher
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import preprocessamento
+from preprocessamento import lemmatize
+import sinonimos
+import registro
+from registro import SHARDS_MANIFEST
+import instrumentacao
+from instrumentacao import timer
 
+# Os recursos do NLTK não são baixados no import: rode uma vez
+# "python preprocessamento.py --download". O NLTK e o matplotlib só são
+# importados no primeiro uso, e a avaliação (avaliacao, gabarito) e o
+# MinHash/LSH só nas funções que os usam: uma consulta isolada não os carrega.
 
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
-
-
-def get_suspicious_documents(directory_path, limit=64):
-    relevant_documents = []
-    count = 0
-
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.json'):
-            file_path = os.path.join(directory_path, filename)
-
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    for item in data:
-                        if item.get('type') == "suspicious-document":
-                            src_file = item.get('src_file', [])
-                            relevant_documents.append({'filename': filename, 'src_file': src_file})
-                            count += 1
 
-                        if count >= limit:
-                            return relevant_documents
+def get_suspicious_documents(directory_path, limit=None):
+    # O gabarito é lido de um índice em disco, reconstruído apenas para os
+    # arquivos de anotação que mudaram.
+    import gabarito
 
-                elif isinstance(data, dict):
-                    if data.get('type') == "suspicious-document":
-                        src_file = data.get('src_file', [])
-                        relevant_documents.append({'filename': filename, 'src_file': src_file}) 
-                        count += 1
-                    if count >= limit:
-                        return relevant_documents
-
-    return relevant_documents
+    return gabarito.get_suspicious_documents(directory_path, limit=limit)
 
 
 def tokenize(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z\s]', '', text)
-    tokens = word_tokenize(text)
-    return tokens
+    return preprocessamento.tokenize(text)
 
 
 def remove_stopwords(tokens):
-    stop_words = set(stopwords.words('english'))
+    stop_words = preprocessamento.get_stop_words()
     return [word for word in tokens if word not in stop_words]
 
 
+def lemmatize_tokens(tokens):
+    return [lemmatize(word) for word in tokens]
+
+
 def get_synonyms(word):
-    synonyms = set()
-    for syn in wordnet.synsets(word):
-        for lemma in syn.lemmas():
-            synonyms.add(lemma.name())
-    return synonyms
+    return set(sinonimos.get_synonyms(word))
 
 
 def expand_with_synonyms(tokens):
@@ -98,38 +82,414 @@ def approach_6(text):
     return expanded_tokens, freq
 
 
-def preprocess_text(query_doc, remove_stopwords_flag=True, expand_synonyms_flag=True):
-    tokens = tokenize(query_doc)
+def preprocess_text(query_doc, remove_stopwords_flag=True, expand_synonyms_flag=True, lemmatize_flag=False,
+                    max_tokens=50):
+    with timer("tokenize"):
+        tokens = tokenize(query_doc)
 
     if remove_stopwords_flag:
-        tokens = remove_stopwords(tokens)
+        with timer("stopword"):
+            tokens = remove_stopwords(tokens)
+
+    if lemmatize_flag:
+        with timer("lemmatize"):
+            tokens = lemmatize_tokens(tokens)
 
     if expand_synonyms_flag:
-        tokens = expand_with_synonyms(tokens)
-    return tokens[:50]
+        with timer("expand"):
+            tokens = expand_with_synonyms(tokens)
+    if max_tokens is None:
+        return tokens
+    return tokens[:max_tokens]
 
 
-def search_document(searcher, query_parser, query_doc, top_n=5):
-    start_time = time.time()
-    tokens = preprocess_text(query_doc)
-    query_string = ' '.join(tokens)
-    q = query_parser.parse(query_string)
+# "idf" escolhe os termos mais discriminativos do documento inteiro;
+# "truncate" é o comportamento antigo (primeiros 50 tokens expandidos, com o
+# AND padrão do QueryParser) e fica como linha de base das comparações;
+# "truncate_or" usa os mesmos tokens numa consulta OR.
+DEFAULT_QUERY_MODE = "idf"
+DEFAULT_QUERY_TERMS = 50
+QUERY_MODES = ("idf", "truncate", "truncate_or")
+
+
+def content_query_parser(schema):
+    return QueryParser("content", schema)
+
+
+def build_weighted_query(searcher, tokens, top_k=DEFAULT_QUERY_TERMS, fieldname="content"):
+    # Pontua cada termo candidato por tf x idf usando as estatísticas do
+    # próprio índice e mantém os top_k, com boost proporcional à pontuação.
+    # Termos ausentes do índice são descartados sem consultar postings.
+    analyzer = searcher.schema[fieldname].analyzer
+    term_frequencies = Counter(token.text for token in analyzer(' '.join(tokens)))
+    doc_count = searcher.doc_count_all() or 1
+
+    candidates = []
+    for term, frequency in term_frequencies.items():
+        doc_frequency = searcher.doc_frequency(fieldname, term)
+        if doc_frequency == 0:
+            continue
+        idf = math.log(doc_count / doc_frequency) + 1
+        candidates.append((frequency * idf, term))
+
+    selected = heapq.nlargest(top_k, candidates)
+    if not selected:
+        return None
+    max_score = selected[0][0]
+    return Or([Term(fieldname, term, boost=score / max_score) for score, term in selected])
+
+
+def query_tokens(query_doc, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS):
+    # Termos normalizados da consulta; não dependem do índice.
+    if query_mode == "idf":
+        return preprocess_text(query_doc, max_tokens=None)
+    if query_mode in ("truncate", "truncate_or"):
+        return preprocess_text(query_doc, max_tokens=top_k)
+    raise ValueError("Modo de consulta inválido. Escolha 'idf', 'truncate' ou 'truncate_or'.")
+
+
+def build_query_from_tokens(searcher, query_parser, tokens, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS):
+    with timer("parse"):
+        if query_mode == "idf":
+            return build_weighted_query(searcher, tokens, top_k)
+        query = query_parser.parse(' '.join(tokens))
+        if query_mode == "truncate_or" and isinstance(query, And):
+            # Só o grupo de cima muda; é o que o OrGroup do parser faria.
+            query = Or(query.subqueries)
+        return query
+
+
+def build_query(searcher, query_parser, query_doc, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS):
+    tokens = query_tokens(query_doc, query_mode, top_k)
+    return build_query_from_tokens(searcher, query_parser, tokens, query_mode, top_k)
+
+
+def load_lsh(lsh_dir):
+    if not lsh_dir:
+        return None
+    import minhash
+
+    return minhash.MinHashLSH.load(lsh_dir)
+
+
+def lsh_candidates(lsh, query_doc, max_candidates=100):
+    # Documentos-fonte candidatos pelo MinHash/LSH, calculado sobre os mesmos
+    # tokens usados na indexação; o BM25 só ranqueia esses documentos.
+    return [path for path, _ in lsh.query(preprocessamento.preprocess_text(query_doc), max_candidates)]
+
+
+def candidate_ids_filter(registry, candidates):
+    # O LSH devolve caminhos; o índice só conhece os IDs do registro.
+    doc_ids = [doc_id for doc_id in map(registry.id_of, candidates) if doc_id is not None]
+    if not doc_ids:
+        return None
+    return Or([Term('doc_id', doc_id) for doc_id in doc_ids])
+
+
+def candidate_filter(lsh, query_doc, registry, max_candidates=100):
+    return candidate_ids_filter(registry, lsh_candidates(lsh, query_doc, max_candidates))
+
+
+def run_query(searcher, query_parser, query_doc, top_n=5, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS,
+              lsh=None, max_candidates=100, registry=None):
+    # Com lsh, registry (o registro de documentos do índice) é obrigatório.
+    search_filter = None
+    if lsh is not None:
+        search_filter = candidate_filter(lsh, query_doc, registry, max_candidates)
+        if search_filter is None:
+            return []
+    tokens = query_tokens(query_doc, query_mode, top_k)
+    return search_tokens(searcher, query_parser, tokens, top_n, query_mode, top_k, search_filter)
 
-    results = searcher.search(q, limit=top_n)
+
+def search_tokens(searcher, query_parser, tokens, top_n=5, query_mode=DEFAULT_QUERY_MODE, top_k=DEFAULT_QUERY_TERMS,
+                  search_filter=None):
+    q = build_query_from_tokens(searcher, query_parser, tokens, query_mode, top_k)
+    if q is None:
+        return []
+    unique_results = collapsed_search(searcher, q, top_n, search_filter)
+    instrumentacao.count("queries")
+    return unique_results
+
+
+def collapsed_search(searcher, q, top_n=5, search_filter=None):
+    # Num índice por trechos, fica só o trecho mais bem pontuado de cada
+    # arquivo, e o limite vale para arquivos distintos. O Whoosh ignora
+    # collapse quando há filter (o FilterCollector chama collect() direto no
+    # coletor de baixo), então nesse caso todos os trechos dos candidatos são
+    # coletados e o agrupamento fica só com o laço abaixo.
+    collapse = "doc_id" if "passage" in searcher.schema else None
+    limit = top_n
+    if collapse and search_filter is not None:
+        collapse = limit = None
+    with timer("search"):
+        results = searcher.search(q, limit=limit, filter=search_filter, collapse=collapse)
+
+    with timer("dedupe"):
+        unique_results = []
+        seen_ids = set()
+        for hit in results:
+            if hit['doc_id'] not in seen_ids:
+                unique_results.append(hit)
+                seen_ids.add(hit['doc_id'])
+                if len(unique_results) >= top_n:
+                    break
+    return unique_results
+
+
+def hits_array(hits):
+    return registro.result_array((hit['doc_id'], hit.score) for hit in hits)
+
+
+def search_document(searcher, query_parser, query_doc, top_n=5, query_mode=DEFAULT_QUERY_MODE):
+    start_time = time.time()
+    unique_results = run_query(searcher, query_parser, query_doc, top_n, query_mode)
     end_time = time.time()
 
     print(f"Busca concluída em {end_time - start_time:.2f} segundos")
 
-    unique_results = []
-    seen_paths = set()
-    for hit in results:
-        if hit['path'] not in seen_paths:
-            unique_results.append(hit)
-            seen_paths.add(hit['path'])
     return unique_results
 
 
-def main_busca():
+# Cada processo de trabalho mantém o seu próprio searcher somente leitura.
+worker_searcher = None
+worker_query_parser = None
+worker_lsh = None
+worker_registry = None
+
+
+def init_search_worker(index_dir, lsh_dir=None):
+    global worker_searcher, worker_query_parser, worker_lsh, worker_registry
+    instrumentacao.metrics.reset()
+    ix = open_dir(index_dir)
+    worker_searcher = ix.searcher()
+    worker_query_parser = content_query_parser(ix.schema)
+    worker_lsh = load_lsh(lsh_dir)
+    # Só o filtro do LSH precisa do registro aqui; os caminhos dos resultados
+    # são resolvidos no processo principal.
+    worker_registry = registro.DocRegistry.for_index(index_dir) if lsh_dir else None
+
+
+def search_file(doc_path, top_n=5, query_mode=DEFAULT_QUERY_MODE):
+    # Devolve uma tupla compacta: (arquivo, array de (doc_id, score) com
+    # registro.RESULT_DTYPE, tempo, erro).
+    start_time = time.time()
+    try:
+        with open(doc_path, "r", encoding="utf-8") as f:
+            with timer("read"):
+                query_doc = f.read()
+        hits = hits_array(run_query(worker_searcher, worker_query_parser, query_doc, top_n, query_mode,
+                                    lsh=worker_lsh, registry=worker_registry))
+        error = None
+    except Exception as e:
+        hits = registro.result_array(())
+        error = str(e)
+    return doc_path, hits, time.time() - start_time, error
+
+
+def search_file_in_worker(doc_path, top_n=5, query_mode=DEFAULT_QUERY_MODE):
+    # Junto com o resultado, devolve as medições do processo de trabalho
+    # desde a última consulta, para o processo principal agregar.
+    return search_file(doc_path, top_n, query_mode), instrumentacao.drain()
+
+
+def search_documents_batch(index_dir, doc_paths, top_n=5, num_workers=None, query_mode=DEFAULT_QUERY_MODE,
+                           lsh_dir=None):
+    # Gerador: os resultados são devolvidos à medida que ficam prontos, fora
+    # da ordem de doc_paths.
+    if is_sharded(index_dir):
+        yield from search_documents_batch_sharded(index_dir, doc_paths, top_n, num_workers, query_mode, lsh_dir)
+        return
+    num_workers = num_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=init_search_worker,
+                             initargs=(index_dir, lsh_dir)) as executor:
+        futures = [executor.submit(search_file_in_worker, doc_path, top_n, query_mode) for doc_path in doc_paths]
+        for future in as_completed(futures):
+            result, worker_metrics = future.result()
+            instrumentacao.merge(worker_metrics)
+            yield result
+
+
+class GlobalBM25FScorer(scoring.BM25FScorer):
+    # O BM25FScorer do Whoosh com idf e comprimento médio do campo vindos de
+    # stats (calculados sobre todos os shards) em vez do shard local, para que
+    # as pontuações de shards diferentes sejam comparáveis.
+
+    def __init__(self, searcher, fieldname, text, B, K1, qf, stats):
+        self.idf = stats["idf"].get((fieldname, text))
+        if self.idf is None:
+            self.idf = searcher.get_parent().idf(fieldname, text)
+        self.avgfl = stats["avgfl"].get(fieldname) or 1
+        self.B = B
+        self.K1 = K1
+        self.qf = qf
+        self.setup(searcher, fieldname, text)
+
+
+class GlobalBM25F(scoring.BM25F):
+
+    def __init__(self, stats, B=0.75, K1=1.2, **kwargs):
+        super().__init__(B, K1, **kwargs)
+        self.stats = stats
+
+    def scorer(self, searcher, fieldname, text, qf=1):
+        if not searcher.schema[fieldname].scorable:
+            return scoring.WeightScorer.for_(searcher, fieldname, text)
+        B = self._field_B.get(fieldname, self.B)
+        return GlobalBM25FScorer(searcher, fieldname, text, B, self.K1, qf, self.stats)
+
+
+def is_sharded(index_dir):
+    return os.path.exists(os.path.join(index_dir, SHARDS_MANIFEST))
+
+
+class ShardedIndex:
+    # Índice criado com create_index(mode="shards", combine_shards=False).
+    # Mantém um reader de cada shard para as estatísticas globais e expõe a
+    # parte da interface do Searcher usada por build_weighted_query.
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, SHARDS_MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.shard_dirs = [os.path.join(index_dir, name) for name in manifest["shards"]]
+        self.registry = registro.DocRegistry.for_index(index_dir)
+        self.readers = [open_dir(shard_dir).reader() for shard_dir in self.shard_dirs]
+        self.schema = self.readers[0].schema
+        self.doc_count = sum(reader.doc_count_all() for reader in self.readers)
+
+    def doc_count_all(self):
+        return self.doc_count
+
+    def doc_frequency(self, fieldname, text):
+        return sum(reader.doc_frequency(fieldname, text) for reader in self.readers)
+
+    def idf(self, fieldname, text):
+        # Mesma fórmula do WeightingModel.idf do Whoosh, com contagens globais.
+        return math.log(self.doc_count / (self.doc_frequency(fieldname, text) + 1)) + 1
+
+    def avg_field_length(self, fieldname):
+        return sum(reader.field_length(fieldname) for reader in self.readers) / (self.doc_count or 1)
+
+    def query_stats(self, q):
+        # Estatísticas globais só dos termos da consulta; é o que vai, junto
+        # com a consulta, para cada processo de trabalho.
+        idf = {}
+        avgfl = {}
+        for fieldname, text in q.iter_all_terms():
+            field = self.schema[fieldname]
+            if not field.scorable:
+                continue
+            idf[(fieldname, field.to_bytes(text))] = self.idf(fieldname, text)
+            if fieldname not in avgfl:
+                avgfl[fieldname] = self.avg_field_length(fieldname)
+        return {"idf": idf, "avgfl": avgfl}
+
+    def close(self):
+        for reader in self.readers:
+            reader.close()
+
+
+# Readers dos shards abertos neste processo de trabalho, por diretório.
+worker_shards = {}
+
+
+def init_shard_worker(shard_dirs):
+    instrumentacao.metrics.reset()
+    for shard_dir in shard_dirs:
+        worker_shards[shard_dir] = open_dir(shard_dir).reader()
+
+
+def search_shard(shard_dir, q, stats, top_n=5, search_filter=None):
+    # Executado nos processos de trabalho: busca num shard com as estatísticas
+    # globais e devolve o array de (doc_id, score) mais as medições do processo.
+    reader = worker_shards.get(shard_dir)
+    if reader is None:
+        reader = worker_shards[shard_dir] = open_dir(shard_dir).reader()
+    searcher = Searcher(reader, weighting=GlobalBM25F(stats), closereader=False)
+    return hits_array(collapsed_search(searcher, q, top_n, search_filter)), instrumentacao.drain()
+
+
+def search_sharded(sharded, executor, query_parser, query_doc, top_n=5, query_mode=DEFAULT_QUERY_MODE,
+                   top_k=DEFAULT_QUERY_TERMS, lsh=None, max_candidates=100):
+    # Scatter-gather: a consulta é montada uma vez, com as estatísticas
+    # globais, e cada shard é buscado em paralelo; cada arquivo está num único
+    # shard, então o resultado é o top_n das listas juntas.
+    search_filter = None
+    if lsh is not None:
+        search_filter = candidate_filter(lsh, query_doc, sharded.registry, max_candidates)
+        if search_filter is None:
+            return registro.result_array(())
+    tokens = query_tokens(query_doc, query_mode, top_k)
+    return search_sharded_tokens(sharded, executor, query_parser, tokens, top_n, query_mode, top_k, search_filter)
+
+
+def search_sharded_tokens(sharded, executor, query_parser, tokens, top_n=5, query_mode=DEFAULT_QUERY_MODE,
+                          top_k=DEFAULT_QUERY_TERMS, search_filter=None):
+    q = build_query_from_tokens(sharded, query_parser, tokens, query_mode, top_k)
+    if q is None:
+        return registro.result_array(())
+    stats = sharded.query_stats(q)
+    futures = [executor.submit(search_shard, shard_dir, q, stats, top_n, search_filter)
+               for shard_dir in sharded.shard_dirs]
+    shard_hits = []
+    for future in futures:
+        hits, worker_metrics = future.result()
+        instrumentacao.merge(worker_metrics)
+        shard_hits.append(hits)
+    with timer("dedupe"):
+        hits = registro.top_results(shard_hits, top_n)
+    instrumentacao.count("queries")
+    return hits
+
+
+def open_shard_pool(sharded, num_workers=None):
+    return ProcessPoolExecutor(max_workers=num_workers or min(len(sharded.shard_dirs), os.cpu_count() or 1),
+                               initializer=init_shard_worker, initargs=(sharded.shard_dirs,))
+
+
+def search_documents_batch_sharded(index_dir, doc_paths, top_n=5, num_workers=None, query_mode=DEFAULT_QUERY_MODE,
+                                   lsh_dir=None):
+    # Mesmo formato de search_documents_batch, na ordem de doc_paths: o
+    # paralelismo fica dentro de cada consulta (um shard por processo).
+    sharded = ShardedIndex(index_dir)
+    query_parser = content_query_parser(sharded.schema)
+    lsh = load_lsh(lsh_dir)
+    try:
+        with open_shard_pool(sharded, num_workers) as executor:
+            for doc_path in doc_paths:
+                start_time = time.time()
+                try:
+                    with open(doc_path, "r", encoding="utf-8") as f:
+                        with timer("read"):
+                            query_doc = f.read()
+                    hits = search_sharded(sharded, executor, query_parser, query_doc, top_n, query_mode, lsh=lsh)
+                    error = None
+                except Exception as e:
+                    hits = registro.result_array(())
+                    error = str(e)
+                yield doc_path, hits, time.time() - start_time, error
+    finally:
+        sharded.close()
+
+
+def live_doc_ids(index_dir):
+    # IDs dos documentos ainda presentes no índice (único ou em shards), em
+    # ordem. O registro guarda também os IDs de arquivos removidos, que
+    # continuam reservados, então len(registry) não serve para isso.
+    shards_path = os.path.join(index_dir, SHARDS_MANIFEST)
+    if os.path.exists(shards_path):
+        with open(shards_path, 'r', encoding='utf-8') as f:
+            index_dirs = [os.path.join(index_dir, name) for name in json.load(f)["shards"]]
+    else:
+        index_dirs = [index_dir]
+    doc_ids = set()
+    for directory in index_dirs:
+        with open_dir(directory).reader() as reader:
+            doc_ids.update(fields["doc_id"] for fields in reader.all_stored_fields())
+    return sorted(doc_ids)
+
+
+def main_busca(batch=False):
 
     index_dir = r"C:\Users\zin\PycharmProjects\PythonProject1\index"
     base_path = "C:\\Users\\zin\\Downloads\\pan-plagiarism-corpus-2011\\external-detection-corpus\\suspicious-document"
@@ -140,84 +500,94 @@ def main_busca():
         arquivos = glob.glob(os.path.join(part_dir, "suspicious-document*.txt"))
         documentos.extend(arquivos)
     
-    ix = open_dir(index_dir)
-    searcher = ix.searcher()
-    query_parser = QueryParser("content", ix.schema)
+    registry = registro.DocRegistry.for_index(index_dir)
+    if batch:
+        # Todos os suspeitos contra as fontes indexadas de uma vez, por
+        # cosseno TF-IDF em matrizes esparsas (tfidf_lote), sem o índice.
+        import tfidf_lote
+
+        for result in tfidf_lote.search_all(registry.paths(live_doc_ids(index_dir)), documentos):
+            print(f"\nBusca para o arquivo {result['file']}")
+            for hit in result["retrieved_documents"]:
+                print(f"Documento: {hit['filename']}, Similaridade: {hit['score']}")
+        return
+
+    for doc_path, hits, elapsed, error in search_documents_batch(index_dir, documentos):
+        print(f"\nBusca para o arquivo {doc_path} concluída em {elapsed:.2f} segundos")
+        if error:
+            print(f"Erro ao processar {doc_path}: {error}")
+        for doc_id, score in hits:
+            print(f"Documento: {registry.path_of(doc_id)}, Similaridade: {score}")
+
+def main_consulta(query_path, index_dir, top_n=5, query_mode=DEFAULT_QUERY_MODE, lsh_dir=None):
+    # Uma consulta no próprio processo, sem pool: é o caminho de início rápido.
+    # Um índice em shards é buscado com um processo por shard.
+    if is_sharded(index_dir):
+        doc_path, hits, elapsed, error = next(search_documents_batch_sharded(index_dir, [query_path], top_n,
+                                                                             query_mode=query_mode, lsh_dir=lsh_dir))
+    else:
+        init_search_worker(index_dir, lsh_dir)
+        doc_path, hits, elapsed, error = search_file(query_path, top_n, query_mode)
+    if error:
+        print(f"Erro ao processar {doc_path}: {error}")
+    registry = registro.DocRegistry.for_index(index_dir)
+    for doc_id, score in hits:
+        print(f"Documento: {registry.path_of(doc_id)}, Similaridade: {score}")
+    print(f"Busca concluída em {elapsed:.2f} segundos")
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Busca no índice Whoosh. Sem arquivo de consulta, "
+                                                 "executa a busca em lote no corpus PAN.")
+    parser.add_argument("consulta", nargs="?", help="arquivo de texto usado como consulta")
+    parser.add_argument("--index", default=os.path.join(os.getcwd(), "index"), help="diretório do índice")
+    parser.add_argument("--top", type=int, default=5, help="número de documentos devolvidos")
+    parser.add_argument("--mode", choices=QUERY_MODES, default=DEFAULT_QUERY_MODE,
+                        help="seleção dos termos da consulta")
+    parser.add_argument("--lsh", default=None, help="diretório do índice MinHash/LSH (opcional)")
+    parser.add_argument("--lote", action="store_true",
+                        help="busca em lote por cosseno TF-IDF (matrizes esparsas) em vez de uma consulta por arquivo")
+    return parser.parse_args(argv)
 
-    for doc_path in documentos:
-        print(f"\nIniciando a busca para o arquivo: {doc_path}...")
-        try:
-            with open(doc_path, "r", encoding="utf-8") as f:
-                query_doc = f.read()
-            results = search_document(searcher, query_parser, query_doc)
-            for hit in results:
-                print(f"Documento: {hit['path']}, Similaridade: {hit.score}")
-        except FileNotFoundError:
-            print(f"Erro: O arquivo {doc_path} não foi encontrado.")
-        except Exception as e:
-            print(f"Erro ao processar {doc_path}: {e}")
-    searcher.close()
 
 def calculate_precision_recall_at_k(relevant_documents, retrieved_documents, k_values):
-    relevant_files = []
-
-    for doc in relevant_documents:
-        relevant_files.extend(doc['src_file'])
+    # Média macro por consulta: cada documento suspeito é avaliado contra as
+    # suas próprias fontes no gabarito.
+    import avaliacao
 
-    precision_results = []
-    recall_results = []
+    evaluation = avaliacao.evaluate(relevant_documents, retrieved_documents, k_values)
+    return evaluation["macro"]["precision"], evaluation["macro"]["recall"]
 
-    for k in k_values:
-        retrieved_files_at_k = []
 
-        for doc in retrieved_documents:
-            retrieved_files_at_k.extend([doc['filename'] for doc in doc['retrieved_documents']][:k])
-
-        relevant_retrieved = set(relevant_files).intersection(set(retrieved_files_at_k))
-        relevant_retrieved_count = len(relevant_retrieved)
-
-        precision = relevant_retrieved_count / len(retrieved_files_at_k) if len(retrieved_files_at_k) > 0 else 0
-
-        recall = relevant_retrieved_count / len(relevant_files) if len(relevant_files) > 0 else 0
-
-        precision_results.append(precision)
-        recall_results.append(recall)
-
-    return precision_results, recall_results
-
-
-def calculoPrecision(relevant_documents, retrieved_documents_approach4, retrieved_documents_approach6):
+def calculoPrecision(relevant_documents, retrieved_documents_approach4, retrieved_documents_approach6,
+                     output_dir="graficos"):
+    import avaliacao
 
     k_values = [2, 4, 6, 8, 10]
 
-    precision_results_4, recall_results_4 = calculate_precision_recall_at_k(relevant_documents, retrieved_documents_approach4, k_values)
-
-    precision_results_6, recall_results_6 = calculate_precision_recall_at_k(relevant_documents, retrieved_documents_approach6, k_values)
+    evaluations = {
+        "Abordagem 4": avaliacao.evaluate(relevant_documents, retrieved_documents_approach4, k_values),
+        "Abordagem 6": avaliacao.evaluate(relevant_documents, retrieved_documents_approach6, k_values),
+    }
+    for name, evaluation in evaluations.items():
+        print(f"{name}: MAP = {evaluation['macro']['map']:.4f}")
 
-    plt.figure(figsize=(10, 6))
-    plt.plot(k_values, precision_results_4, marker='o', label='Abordagem 4', color='b')
-    plt.plot(k_values, precision_results_6, marker='o', label='Abordagem 6', color='g')
-    plt.xlabel('k')
-    plt.ylabel('Precision at k (P@k)')
-    plt.title('Precision at k (P@k) para as abordagens 4 e 6')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(k_values, recall_results_4, marker='o', label='Abordagem 4', color='b')
-    plt.plot(k_values, recall_results_6, marker='o', label='Abordagem 6', color='g')
-    plt.xlabel('k')
-    plt.ylabel('Recall at k (R@k)')
-    plt.title('Recall at k (R@k) para as abordagens 4 e 6')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+    for path in avaliacao.save_evaluation_plots(evaluations, output_dir, k_values):
+        print(f"Gráfico salvo em {path}")
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.consulta:
+        with instrumentacao.session("consulta"):
+            main_consulta(args.consulta, args.index, args.top, args.mode, args.lsh)
+        sys.exit(0)
+
     start_time = time.time()
-    main_busca()
+    with instrumentacao.session("busca"):
+        main_busca(args.lote)
     end_time = time.time()
 
     execution_time = end_time - start_time